@@ -2,3 +2,7 @@ from .company import router as company_router
 from .expense import router as expense_router
 from .policy import router as policy_router
 from .user import router as user_router
+
+from .imports import router as import_router
+from .metrics import router as metrics_router
+from .analytics import router as analytics_router
\ No newline at end of file
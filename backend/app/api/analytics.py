@@ -0,0 +1,41 @@
+from datetime import datetime
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+from app.schemas.analytics import SpendBucket, MonthlySpend, FlaggedRatioResponse
+from app.crud import get_company
+from app.crud.expense_rollup import get_spend_by, get_monthly_spend, get_flagged_ratio
+from app.api.dependencies import get_read_db
+
+router = APIRouter()
+
+# Served from the expense_rollups table; start_date and end_date select whole months
+
+def require_company(db: Session, company_id: int):
+    if not get_company(db, company_id):
+        raise HTTPException(status_code=404, detail="Company not found")
+
+@router.get("/companies/{id}/analytics/categories", response_model=list[SpendBucket])
+def get_spend_by_category_route(id: int, start_date: Optional[datetime] = None, end_date: Optional[datetime] = None, db: Session = Depends(get_read_db)):
+    require_company(db, id)
+    return get_spend_by(db, id, "category", start_date, end_date)
+
+@router.get("/companies/{id}/analytics/users", response_model=list[SpendBucket])
+def get_spend_by_user_route(id: int, start_date: Optional[datetime] = None, end_date: Optional[datetime] = None, limit: int = Query(100, ge=1, le=1000), db: Session = Depends(get_read_db)):
+    require_company(db, id)
+    return get_spend_by(db, id, "user", start_date, end_date, limit)
+
+@router.get("/companies/{id}/analytics/merchants", response_model=list[SpendBucket])
+def get_spend_by_merchant_route(id: int, start_date: Optional[datetime] = None, end_date: Optional[datetime] = None, limit: int = Query(100, ge=1, le=1000), db: Session = Depends(get_read_db)):
+    require_company(db, id)
+    return get_spend_by(db, id, "merchant", start_date, end_date, limit)
+
+@router.get("/companies/{id}/analytics/months", response_model=list[MonthlySpend])
+def get_spend_by_month_route(id: int, start_date: Optional[datetime] = None, end_date: Optional[datetime] = None, db: Session = Depends(get_read_db)):
+    require_company(db, id)
+    return get_monthly_spend(db, id, start_date, end_date)
+
+@router.get("/companies/{id}/analytics/flagged-ratio", response_model=FlaggedRatioResponse)
+def get_flagged_ratio_route(id: int, start_date: Optional[datetime] = None, end_date: Optional[datetime] = None, db: Session = Depends(get_read_db)):
+    require_company(db, id)
+    return get_flagged_ratio(db, id, start_date, end_date)
\ No newline at end of file
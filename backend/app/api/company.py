@@ -1,7 +1,10 @@
+from datetime import datetime
+from typing import Optional
 from fastapi import APIRouter, Depends, HTTPException, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError
-from app.core import SessionLocal
+from app.core import ReadSessionLocal, SessionLocal
 from app.models import Company
 from app.schemas import (
     CompanyCreate,
@@ -10,6 +13,11 @@ from app.schemas import (
     UserResponse,
     ExpenseResponse
 )
+from app.schemas.expense import CategoryEnum, ExpenseReauditResult, ExportFormat
+from app.crud.expense import reaudit_expenses
+from app.crud.company import COMPANY_ORDER, COMPANY_USER_ORDER, COMPANY_EXPENSE_ORDER, EXPORT_COLUMNS, stream_company_expenses
+from app.api.dependencies import get_db, get_read_db, get_cursor, page_response
+from app.utils.export import EXPORT_WRITERS, MEDIA_TYPES
 from app.crud import (
     create_company,
     get_companies,
@@ -23,13 +31,6 @@ from app.crud import (
 
 router = APIRouter()
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 @router.post("/companies", response_model=CompanyResponse)
 def create_company_route(data: CompanyCreate, db: Session = Depends(get_db)):
     try:
@@ -40,12 +41,12 @@ def create_company_route(data: CompanyCreate, db: Session = Depends(get_db)):
         raise HTTPException(status_code=409, detail="Company already exists")
 
 @router.get("/companies", response_model=list[CompanyResponse])
-def get_companies_route(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    companies = get_companies(db, skip, limit)
-    return companies
+def get_companies_route(skip: int = 0, limit: int = 100, cursor=Depends(get_cursor), db: Session = Depends(get_read_db)):
+    companies = get_companies(db, skip, limit, cursor)
+    return page_response(companies, COMPANY_ORDER, limit)
 
 @router.get("/companies/{id}", response_model=CompanyResponse)
-def get_company_route(id: int, db: Session = Depends(get_db)):
+def get_company_route(id: int, db: Session = Depends(get_read_db)):
     company = get_company(db, id)
     if not company:
         raise HTTPException(status_code=404, detail="Company not found")
@@ -59,16 +60,14 @@ def update_company_route(id: int, company_data: CompanyUpdate, current_user_id:
         if not user or user.role != "admin":
             raise HTTPException(status_code=403, detail="Only administrators can update company information")
 
-    db_company = get_company(db, id)
-    if not db_company:
-        raise HTTPException(status_code=404, detail="Company not found")
-
-    if company_data.name and company_data.name != db_company.name:
-        existing = get_company_by_name(db, company_data.name)
-        if existing:
-            raise HTTPException(status_code=400, detail="Company with this name already exists")
+    try:
+        company = update_company(db, id, company_data)
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=400, detail="Company with this name already exists")
 
-    company = update_company(db, id, company_data)
+    if not company:
+        raise HTTPException(status_code=404, detail="Company not found")
     return company
 
 @router.delete("/companies/{id}")
@@ -78,29 +77,102 @@ def delete_company_route(id: int, current_user_id: int = None, db: Session = Dep
         if not user or user.role != "admin":
             raise HTTPException(status_code=403, detail="Only administrators can delete company information")
 
-    company = get_company(db, id)
-    if not company:
-        return Response(status_code=204)
-
     success = delete_company(db, id)
     if not success:
-        raise HTTPException(status_code=500, detail="Failed to delete company")
+        return Response(status_code=204)
     return {"detail": "Company deleted"}
 
 @router.get("/companies/{id}/users", response_model=list[UserResponse])
-def get_company_users_route(id: int, skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+def get_company_users_route(id: int, skip: int = 0, limit: int = 100, cursor=Depends(get_cursor), db: Session = Depends(get_read_db)):
+    users = get_company_users(db, id, skip, limit, cursor)
+
+    # Only an empty page needs to tell a missing company apart from one without users
+    if not users and not get_company(db, id):
+        raise HTTPException(status_code=404, detail="Company not found")
+
+    return page_response(users, COMPANY_USER_ORDER, limit)
+
+@router.get("/companies/{id}/expenses", response_model=list[ExpenseResponse])
+def get_company_expenses_route(
+        id: int,
+        skip: int = 0,
+        limit: int = 100,
+        cursor=Depends(get_cursor),
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        category: Optional[CategoryEnum] = None,
+        is_flagged: Optional[bool] = None,
+        user_id: Optional[int] = None,
+        db: Session = Depends(get_read_db)
+):
+    expenses = get_company_expenses(
+        db,
+        id,
+        skip,
+        limit,
+        cursor,
+        start_date=start_date,
+        end_date=end_date,
+        category=category,
+        is_flagged=is_flagged,
+        user_id=user_id
+    )
+    if not expenses and not get_company(db, id):
+        raise HTTPException(status_code=404, detail="Company not found")
+
+    return page_response(expenses, COMPANY_EXPENSE_ORDER, limit)
+
+def export_batches(company_id: int, filters: dict):
+    # The request's session is closed before the body is streamed, so the export opens its own
+    db = (ReadSessionLocal or SessionLocal)()
+    try:
+        yield from stream_company_expenses(db, company_id, **filters)
+    finally:
+        db.close()
+
+@router.get("/companies/{id}/expenses/export")
+def export_company_expenses_route(
+        id: int,
+        format: ExportFormat = ExportFormat.CSV,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        category: Optional[CategoryEnum] = None,
+        is_flagged: Optional[bool] = None,
+        user_id: Optional[int] = None,
+        db: Session = Depends(get_read_db)
+):
     company = get_company(db, id)
     if not company:
         raise HTTPException(status_code=404, detail="Company not found")
 
-    users = get_company_users(db, id, skip, limit)
-    return users
+    filters = {
+        "start_date": start_date,
+        "end_date": end_date,
+        "category": category,
+        "is_flagged": is_flagged,
+        "user_id": user_id
+    }
+    return StreamingResponse(
+        EXPORT_WRITERS[format.value](EXPORT_COLUMNS, export_batches(id, filters)),
+        media_type=MEDIA_TYPES[format.value],
+        headers={"Content-Disposition": f'attachment; filename="company-{id}-expenses.{format.value}"'}
+    )
+
+@router.post("/companies/{id}/reaudit", response_model=ExpenseReauditResult)
+def reaudit_company_expenses_route(
+        id: int,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        current_user_id: int = None,
+        db: Session = Depends(get_db)
+):
+    if current_user_id:
+        user = get_user(db, current_user_id)
+        if not user or user.role != "admin":
+            raise HTTPException(status_code=403, detail="Only administrators can re-audit company expenses")
 
-@router.get("/companies/{id}/expenses", response_model=list[ExpenseResponse])
-def get_company_expenses_route(id: int, skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
     company = get_company(db, id)
     if not company:
         raise HTTPException(status_code=404, detail="Company not found")
 
-    expenses = get_company_expenses(db, id, skip, limit)
-    return expenses
\ No newline at end of file
+    return reaudit_expenses(db, id, start_date, end_date)
\ No newline at end of file
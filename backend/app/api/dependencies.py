@@ -0,0 +1,160 @@
+import hashlib
+import json
+from functools import lru_cache
+from typing import Optional
+from fastapi import Depends, Header, HTTPException, Request, Response
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+from sqlalchemy.orm import Session
+from app.core import SessionLocal, AsyncSessionLocal, ReadSessionLocal, AsyncReadSessionLocal
+from app.core.auth import AuthUnavailableError, InvalidTokenError, token_verifier
+from app.crud.idempotency_key import (
+    IdempotencyKeyInProgressError,
+    IdempotencyKeyReusedError,
+    claim_idempotency_key,
+    release_idempotency_key,
+    store_idempotent_response
+)
+from app.crud.user import get_user_identity
+from app.utils.pagination import InvalidCursorError, NEXT_CURSOR_HEADER, decode_cursor, next_cursor
+from app.utils.serialization import rows_json
+
+# Sessions are stored on request.state so every dependency in a request that asks for the same kind
+# of session gets the same one; only the dependency that opened it closes it.
+
+def request_session(request: Request, attribute: str, session_factory):
+    db = getattr(request.state, attribute, None)
+    if db is not None:
+        yield db
+        return
+
+    db = session_factory()
+    setattr(request.state, attribute, db)
+    try:
+        yield db
+    finally:
+        db.close()
+        setattr(request.state, attribute, None)
+
+async def async_request_session(request: Request, attribute: str, session_factory):
+    db = getattr(request.state, attribute, None)
+    if db is not None:
+        yield db
+        return
+
+    db = session_factory()
+    setattr(request.state, attribute, db)
+    try:
+        yield db
+    finally:
+        await db.close()
+        setattr(request.state, attribute, None)
+
+def get_db(request: Request):
+    yield from request_session(request, "db", SessionLocal)
+
+def get_read_db(request: Request):
+    # Served by DATABASE_REPLICA_URL when configured, otherwise shares the request's primary session
+    if ReadSessionLocal is None:
+        yield from get_db(request)
+    else:
+        yield from request_session(request, "read_db", ReadSessionLocal)
+
+async def get_async_db(request: Request):
+    async for db in async_request_session(request, "async_db", AsyncSessionLocal):
+        yield db
+
+async def get_async_read_db(request: Request):
+    if AsyncReadSessionLocal is None:
+        async for db in get_async_db(request):
+            yield db
+    else:
+        async for db in async_request_session(request, "async_read_db", AsyncReadSessionLocal):
+            yield db
+
+async def get_cursor(cursor: Optional[str] = None):
+    if not cursor:
+        return None
+    try:
+        return decode_cursor(cursor)
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def page_response(items, columns, limit: int):
+    # List routes select plain rows and skip per-row response_model validation; response_model
+    # stays on the route for the OpenAPI schema
+    response = Response(rows_json(items), media_type="application/json")
+    cursor = next_cursor(items, columns, limit)
+    if cursor:
+        response.headers[NEXT_CURSOR_HEADER] = cursor
+    return response
+
+def get_token_claims(request: Request):
+    scheme, _, token = request.headers.get("Authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        raise HTTPException(status_code=401, detail="Missing bearer token", headers={"WWW-Authenticate": "Bearer"})
+
+    try:
+        return token_verifier.verify(token)
+    except InvalidTokenError as e:
+        raise HTTPException(status_code=401, detail=str(e), headers={"WWW-Authenticate": "Bearer"})
+    except AuthUnavailableError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+def get_current_user(claims: dict = Depends(get_token_claims), db: Session = Depends(get_read_db)):
+    # Verified locally against cached signing keys and resolved from the identity cache, so a
+    # warm request touches neither Google nor the database
+    user = get_user_identity(db, claims["sub"])
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    return user
+
+def get_optional_current_user(request: Request, db: Session = Depends(get_read_db)):
+    # For routes anyone can call that do more for a verified caller; a token that is sent must be valid
+    if not request.headers.get("Authorization"):
+        return None
+    return get_current_user(get_token_claims(request), db)
+
+IDEMPOTENT_REPLAY_HEADER = "Idempotent-Replayed"
+
+def get_idempotency_key(idempotency_key: Optional[str] = Header(None, max_length=255)):
+    return idempotency_key or None
+
+def request_hash(*parts):
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part if isinstance(part, bytes) else json.dumps(part, sort_keys=True, default=str).encode("utf-8"))
+    return digest.hexdigest()
+
+@lru_cache(maxsize=None)
+def response_adapter(response_model):
+    return TypeAdapter(response_model)
+
+def run_idempotent(db, response: Response, scope: str, key: Optional[str], request_fingerprint: str, response_model, handler):
+    # Without a key the handler runs as usual. With one, the first request runs and its response is
+    # stored; retries with the same key and payload get that response back without running anything.
+    if not key:
+        return handler()
+
+    try:
+        stored = claim_idempotency_key(db, scope, key, request_fingerprint)
+    except IdempotencyKeyInProgressError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except IdempotencyKeyReusedError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+    if stored:
+        headers = {**(stored.response_headers or {}), IDEMPOTENT_REPLAY_HEADER: "true"}
+        return JSONResponse(stored.response_body, status_code=stored.status_code, headers=headers)
+
+    try:
+        adapter = response_adapter(response_model)
+        body = adapter.dump_python(adapter.validate_python(handler(), from_attributes=True), mode="json")
+    except BaseException:
+        release_idempotency_key(db, scope, key)
+        raise
+
+    status_code = response.status_code or 200
+    headers = dict(response.headers)
+    store_idempotent_response(db, scope, key, status_code, body, headers)
+    return JSONResponse(body, status_code=status_code, headers=headers)
\ No newline at end of file
@@ -1,75 +1,183 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
+import hashlib
+import io
+import shutil
+import time
+import uuid
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Response, Query
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from typing import List
-from app.core import SessionLocal
-from app.models import Expense, Policy, User
-from app.schemas.expense import ExpenseCreate, ExpenseUpdate, ExpenseResponse, ExpenseBulkUpdate, CSVUploadResponse
+from typing import List, Optional, Union
+from app.models import CategorizationStatus, Expense, Policy, User
+from app.schemas.expense import (
+    ExpenseCreate,
+    ExpenseUpdate,
+    ExpenseResponse,
+    ExpenseCategorizationResponse,
+    ExpenseBulkUpdate,
+    ExpenseBulkReview,
+    ExpenseBulkUpdateResult,
+    CSVUploadResponse
+)
+from app.crud import async_expense
 from app.crud.expense import (
     create_expense,
-    get_expenses,
-    get_user_expenses,
-    get_expense,
-    get_flagged_expenses,
     update_expense,
     bulk_update_expenses,
+    bulk_review_expenses,
     delete_expense,
     process_csv,
-    check_expense_against_policies
+    check_expense_against_policies,
+    EXPENSE_ORDER
+)
+from app.crud.import_job import create_import_job
+from app.crud.policy import get_compiled_policies
+from app.crud.merchant_rule import confirm_expense_categories, recategorized_expense_ids
+from app.schemas.import_job import ImportJobResponse
+from app.schemas.user import UserResponse
+from app.workers import ImportStorageUnavailableError, completion_waiters, enqueue_categorization, enqueue_import, import_file_path
+from app.api.dependencies import (
+    get_db,
+    get_async_db,
+    get_async_read_db,
+    get_cursor,
+    get_idempotency_key,
+    get_optional_current_user,
+    page_response,
+    request_hash,
+    run_idempotent
 )
-from app.crud.policy import get_policies
-from app.utils.ai import categorize_expense
+from app.utils.ai import categorize_expense, categorize_expenses
 
 router = APIRouter()
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+STATUS_MAX_WAIT_SECONDS = 30
+
+def category_confirmations(db: Session, expense_ids: list[int], update_dict: dict, current_user: Optional[UserResponse]):
+    # Only a verified administrator changing a category teaches the classifier, and only for their own company
+    if not update_dict.get("category") or current_user is None or current_user.role != "admin" or not current_user.company_id:
+        return []
+    return recategorized_expense_ids(db, current_user.company_id, expense_ids, update_dict["category"])
 
 @router.post("/expenses", response_model=ExpenseResponse)
-def create_expense_route(expense: ExpenseCreate, db: Session = Depends(get_db)):
-    policies = get_policies(db)
-    return create_expense(db, expense, policies=policies, categorize_func=categorize_expense)
+def create_expense_route(
+        expense: ExpenseCreate,
+        response: Response,
+        defer_categorization: bool = False,
+        idempotency_key: Optional[str] = Depends(get_idempotency_key),
+        db: Session = Depends(get_db)
+):
+    def handle():
+        # Deferred expenses are stored as pending and categorized in the background; GET /expenses/{id}/status reports completion
+        if defer_categorization and not expense.category:
+            db_expense = create_expense(db, expense, defer_categorization=True)
+            enqueue_categorization(db_expense.id)
+            response.status_code = 202
+            response.headers["Location"] = f"/api/expenses/{db_expense.id}/status"
+            return db_expense
+
+        policies = get_compiled_policies(db, expense.company_id)
+        return create_expense(db, expense, policies=policies, categorize_func=categorize_expense)
+
+    fingerprint = request_hash(expense.dict(), defer_categorization)
+    return run_idempotent(db, response, f"expenses:{expense.user_id}", idempotency_key, fingerprint, ExpenseResponse, handle)
 
 @router.get("/expenses", response_model=List[ExpenseResponse])
-def get_expenses_route(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    expenses = get_expenses(db, skip, limit)
-    return expenses
+async def get_expenses_route(skip: int = 0, limit: int = 100, cursor=Depends(get_cursor), db: AsyncSession = Depends(get_async_read_db)):
+    expenses = await async_expense.get_expenses(db, skip, limit, cursor)
+    return page_response(expenses, EXPENSE_ORDER, limit)
 
 @router.get("/users/{user_id}/expenses", response_model=List[ExpenseResponse])
-def get_user_expenses_route(user_id: int, skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    expenses = get_user_expenses(db, user_id, skip, limit)
-    return expenses
+async def get_user_expenses_route(user_id: int, skip: int = 0, limit: int = 100, cursor=Depends(get_cursor), db: AsyncSession = Depends(get_async_read_db)):
+    expenses = await async_expense.get_user_expenses(db, user_id, skip, limit, cursor)
+    return page_response(expenses, EXPENSE_ORDER, limit)
+
+# Registered before /expenses/{expense_id} so "flagged" is not parsed as an expense id
+@router.get("/expenses/flagged", response_model=List[ExpenseResponse])
+async def get_flagged_expenses_route(skip: int = 0, limit: int = 100, cursor=Depends(get_cursor), db: AsyncSession = Depends(get_async_read_db)):
+    expenses = await async_expense.get_flagged_expenses(db, skip=skip, limit=limit, cursor=cursor)
+    return page_response(expenses, EXPENSE_ORDER, limit)
 
 @router.get("/expenses/{expense_id}", response_model=ExpenseResponse)
-def get_expense_route(expense_id: int, db: Session = Depends(get_db)):
-    expense = get_expense(db, expense_id)
+async def get_expense_route(expense_id: int, db: AsyncSession = Depends(get_async_read_db)):
+    expense = await async_expense.get_expense(db, expense_id)
     if not expense:
         raise HTTPException(status_code=404, detail="Expense not found")
     return expense
 
-@router.get("/expenses/flagged", response_model=List[ExpenseResponse])
-def get_flagged_expenses_route(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    return get_flagged_expenses(db, skip=skip, limit=limit)
+@router.get("/expenses/{expense_id}/status", response_model=ExpenseCategorizationResponse)
+async def get_expense_status_route(
+        expense_id: int,
+        wait: float = Query(0, ge=0, le=STATUS_MAX_WAIT_SECONDS),
+        db: AsyncSession = Depends(get_async_db)
+):
+    # Reads the primary so a poll never lags behind the worker; with wait, a pending expense is
+    # held open until it is categorized or the wait runs out
+    deadline = time.monotonic() + wait
+    while True:
+        status = await async_expense.get_expense_categorization(db, expense_id)
+        if not status:
+            raise HTTPException(status_code=404, detail="Expense not found")
+
+        remaining = deadline - time.monotonic()
+        if status.categorization_status != CategorizationStatus.PENDING or remaining <= 0:
+            return status
+
+        # Workers in this process wake the wait early; the re-check catches the ones in other processes
+        await completion_waiters.wait(expense_id, min(remaining, 1.0))
 
 @router.get("/users/{user_id}/expenses/flagged", response_model=List[ExpenseResponse])
-def get_user_flagged_expenses_route(user_id: int, skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    return get_flagged_expenses(db, user_id=user_id, skip=skip, limit=limit)
+async def get_user_flagged_expenses_route(user_id: int, skip: int = 0, limit: int = 100, cursor=Depends(get_cursor), db: AsyncSession = Depends(get_async_read_db)):
+    expenses = await async_expense.get_flagged_expenses(db, user_id=user_id, skip=skip, limit=limit, cursor=cursor)
+    return page_response(expenses, EXPENSE_ORDER, limit)
+
+# Registered before /expenses/{expense_id} so "bulk" is not parsed as an expense id
+@router.patch("/expenses/bulk", response_model=Union[List[ExpenseResponse], ExpenseBulkUpdateResult])
+def bulk_update_expenses_route(
+        update_data: ExpenseBulkUpdate,
+        return_preference: str = Query("representation", alias="return", pattern="^(minimal|representation)$"),
+        current_user: Optional[UserResponse] = Depends(get_optional_current_user),
+        db: Session = Depends(get_db)
+):
+    update_dict = update_data.dict(exclude={"ids"}, exclude_unset=True)
+    confirmed_ids = category_confirmations(db, update_data.ids, update_dict, current_user)
+    if return_preference == "minimal":
+        result = ExpenseBulkUpdateResult(updated=bulk_update_expenses(db, update_data.ids, update_dict, return_rows=False))
+    else:
+        result = bulk_update_expenses(db, update_data.ids, update_dict)
+
+    if confirmed_ids:
+        confirm_expense_categories(db, current_user.company_id, confirmed_ids, update_dict["category"])
+    return result
+
+@router.patch("/expenses/bulk/review", response_model=Union[List[ExpenseResponse], ExpenseBulkUpdateResult])
+def bulk_review_expenses_route(
+        review_data: ExpenseBulkReview,
+        return_preference: str = Query("representation", alias="return", pattern="^(minimal|representation)$"),
+        db: Session = Depends(get_db)
+):
+    review_dict = review_data.dict(exclude={"ids"}, exclude_unset=True)
+    if return_preference == "minimal":
+        return ExpenseBulkUpdateResult(updated=bulk_review_expenses(db, review_data.ids, review_dict, return_rows=False))
+
+    return bulk_review_expenses(db, review_data.ids, review_dict)
 
 @router.patch("/expenses/{expense_id}", response_model=ExpenseResponse)
-def update_expense_route(expense_id: int, expense_data: ExpenseUpdate, db: Session = Depends(get_db)):
-    expense = update_expense(db, expense_id, expense_data.dict(exclude_unset=True))
+def update_expense_route(
+        expense_id: int,
+        expense_data: ExpenseUpdate,
+        current_user: Optional[UserResponse] = Depends(get_optional_current_user),
+        db: Session = Depends(get_db)
+):
+    update_dict = expense_data.dict(exclude_unset=True)
+    confirmed_ids = category_confirmations(db, [expense_id], update_dict, current_user)
+    expense = update_expense(db, expense_id, update_dict)
     if not expense:
         raise HTTPException(status_code=404, detail="Expense not found")
-    return expense
 
-@router.patch("/expenses/bulk", response_model=List[ExpenseResponse])
-def bulk_update_expenses_route(update_data: ExpenseBulkUpdate, db: Session = Depends(get_db)):
-    update_dict = update_data.dict(exclude={"ids"}, exclude_unset=True)
-    expenses = bulk_update_expenses(db, update_data.ids, update_dict)
-    return expenses
+    if confirmed_ids:
+        confirm_expense_categories(db, current_user.company_id, confirmed_ids, update_dict["category"])
+    return expense
 
 @router.delete("/expenses/{expense_id}")
 def delete_expense_route(expense_id: int, db: Session = Depends(get_db)):
@@ -79,15 +187,8 @@ def delete_expense_route(expense_id: int, db: Session = Depends(get_db)):
     return {"detail": "Expense deleted"}
 
 
-@router.post("/users/{user_id}/upload-expenses", response_model=CSVUploadResponse)
-async def upload_expenses_route(
-        user_id: int,
-        file: UploadFile = File(...),
-        db: Session = Depends(get_db)
-):
-    if not file.filename.endswith('.csv'):
-        raise HTTPException(status_code=400, detail="Only CSV files are supported")
-
+def import_expense_upload(db: Session, user_id: int, file: UploadFile, background: bool):
+    # Blocking DB, file and OpenAI work for an upload; the route runs it in the threadpool
     user = db.query(User).filter(User.id == user_id).first()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
@@ -96,11 +197,61 @@ async def upload_expenses_route(
     if not company_id:
         raise HTTPException(status_code=400, detail="User is not associated with a company")
 
-    content = await file.read()
-    content_str = content.decode('utf-8')
+    if background:
+        job_id = uuid.uuid4().hex
+        try:
+            file_path = import_file_path(job_id)
+        except ImportStorageUnavailableError as e:
+            raise HTTPException(status_code=503, detail=str(e))
+        with open(file_path, "wb") as destination:
+            shutil.copyfileobj(file.file, destination, 1024 * 1024)
+
+        job = create_import_job(db, user_id, company_id, file.filename, file_path, job_id=job_id)
+        enqueue_import(job.id)
+        return ImportJobResponse.model_validate(job)
 
-    policies = get_policies(db)
+    policies = get_compiled_policies(db, company_id)
+
+    # The upload is already spooled to a temp file, so rows are decoded and parsed as they are read
+    csv_stream = io.TextIOWrapper(file.file, encoding="utf-8", newline="")
+    try:
+        return process_csv(db, user_id, company_id, csv_stream, policies, categorize_expense, categorize_expenses)
+    finally:
+        csv_stream.detach()
+
+def upload_fingerprint(file: UploadFile, background: bool):
+    digest = hashlib.sha256()
+    for block in iter(lambda: file.file.read(1024 * 1024), b""):
+        digest.update(block)
+    file.file.seek(0)
+    return request_hash(digest.digest(), file.filename, background)
+
+@router.post("/users/{user_id}/upload-expenses", response_model=Union[CSVUploadResponse, ImportJobResponse])
+async def upload_expenses_route(
+        user_id: int,
+        response: Response,
+        file: UploadFile = File(...),
+        background: bool = False,
+        idempotency_key: Optional[str] = Depends(get_idempotency_key),
+        db: Session = Depends(get_db)
+):
+    if not file.filename.endswith('.csv'):
+        raise HTTPException(status_code=400, detail="Only CSV files are supported")
 
-    stats = process_csv(db, user_id, company_id, content_str, policies, categorize_expense)
+    def handle():
+        result = import_expense_upload(db, user_id, file, background)
+        if isinstance(result, ImportJobResponse):
+            response.status_code = 202
+        return result
 
-    return stats
\ No newline at end of file
+    fingerprint = await run_in_threadpool(upload_fingerprint, file, background) if idempotency_key else None
+    return await run_in_threadpool(
+        run_idempotent,
+        db,
+        response,
+        f"upload-expenses:{user_id}",
+        idempotency_key,
+        fingerprint,
+        Union[CSVUploadResponse, ImportJobResponse],
+        handle
+    )
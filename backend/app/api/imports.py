@@ -0,0 +1,14 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+from app.schemas.import_job import ImportJobResponse
+from app.crud.import_job import get_import_job
+from app.api.dependencies import get_db
+
+router = APIRouter()
+
+@router.get("/imports/{job_id}", response_model=ImportJobResponse)
+def get_import_job_route(job_id: str, db: Session = Depends(get_db)):
+    job = get_import_job(db, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Import job not found")
+    return job
\ No newline at end of file
@@ -0,0 +1,18 @@
+from fastapi import APIRouter
+from app.core.auth import identity_cache, token_verifier
+from app.core.pool import get_pool_metrics
+from app.utils.ai_client import ai_client
+from app.utils.category_cache import category_cache
+from app.utils.classifier import local_classifier
+
+router = APIRouter()
+
+@router.get("/metrics")
+def get_metrics_route():
+    return {
+        "database_pools": get_pool_metrics(),
+        "ai_client": ai_client.stats(),
+        "category_cache": category_cache.stats(),
+        "classifier": local_classifier.stats(),
+        "auth": {"tokens": token_verifier.stats(), "identity_cache": identity_cache.stats()}
+    }
\ No newline at end of file
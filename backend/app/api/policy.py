@@ -1,45 +1,56 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException
 from sqlalchemy.orm import Session
 from typing import List
-from app.core import SessionLocal
 from app.schemas.policy import PolicyCreate, PolicyUpdate, PolicyResponse
-from app.crud.policy import create_policy, get_policies, get_policy, update_policy, delete_policy
+from app.crud.policy import POLICY_ORDER, create_policy, get_policies, get_policy, update_policy, delete_policy
+from app.api.dependencies import get_db, get_read_db, get_cursor, page_response
+from app.workers import run_reaudit
 
 router = APIRouter()
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+# Changing any of these can change which expenses a policy flags
+REAUDIT_FIELDS = {"company_id", "category", "rule_type", "rule_value", "policy_type"}
 
 @router.post("/policies", response_model=PolicyResponse)
-def create_policy_route(policy: PolicyCreate, db: Session = Depends(get_db)):
-    return create_policy(db, policy)
+def create_policy_route(policy: PolicyCreate, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
+    db_policy = create_policy(db, policy)
+    background_tasks.add_task(run_reaudit, db_policy.company_id)
+    return db_policy
 
 @router.get("/policies", response_model=List[PolicyResponse])
-def get_policies_route(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    policies = get_policies(db, skip, limit)
-    return policies
+def get_policies_route(skip: int = 0, limit: int = 100, cursor=Depends(get_cursor), db: Session = Depends(get_read_db)):
+    policies = get_policies(db, skip, limit, cursor)
+    return page_response(policies, POLICY_ORDER, limit)
 
 @router.get("/policies/{policy_id}", response_model=PolicyResponse)
-def get_policy_route(policy_id: int, db: Session = Depends(get_db)):
+def get_policy_route(policy_id: int, db: Session = Depends(get_read_db)):
     policy = get_policy(db, policy_id)
     if not policy:
         raise HTTPException(status_code=404, detail="Policy not found")
     return policy
 
 @router.patch("/policies/{policy_id}", response_model=PolicyResponse)
-def update_policy_route(policy_id: int, policy_data: PolicyUpdate, db: Session = Depends(get_db)):
-    policy = update_policy(db, policy_id, policy_data.dict(exclude_unset=True))
+def update_policy_route(policy_id: int, policy_data: PolicyUpdate, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
+    policy = get_policy(db, policy_id)
     if not policy:
         raise HTTPException(status_code=404, detail="Policy not found")
+
+    previous_company_id = policy.company_id
+    update_dict = policy_data.dict(exclude_unset=True)
+    policy = update_policy(db, policy, update_dict)
+
+    # Existing expenses are re-checked against the new rules once the response is sent
+    if REAUDIT_FIELDS & set(update_dict):
+        background_tasks.add_task(run_reaudit, previous_company_id)
+        if policy.company_id != previous_company_id and previous_company_id is not None:
+            background_tasks.add_task(run_reaudit, policy.company_id)
     return policy
 
 @router.delete("/policies/{policy_id}")
-def delete_policy_route(policy_id: int, db: Session = Depends(get_db)):
-    success = delete_policy(db, policy_id)
-    if not success:
+def delete_policy_route(policy_id: int, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
+    deleted = delete_policy(db, policy_id)
+    if not deleted:
         raise HTTPException(status_code=404, detail="Policy not found")
+
+    background_tasks.add_task(run_reaudit, deleted.company_id)
     return {"detail": "Policy deleted"}
\ No newline at end of file
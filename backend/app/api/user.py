@@ -1,20 +1,14 @@
 from fastapi import APIRouter, Depends, HTTPException, Response
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError
-from app.core import SessionLocal
 from app.models import User
 from app.schemas import UserCreate, UserResponse, UserUpdate
-from app.crud import create_user, get_users, get_user, update_user, delete_user, get_user_by_firebase_id
+from app.crud.user import USER_ORDER
+from app.api.dependencies import get_db, get_read_db, get_cursor, get_current_user, page_response
+from app.crud import create_user, get_users, get_user, update_user, delete_user, get_user_by_firebase_id, get_user_identity
 
 router = APIRouter()
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 @router.post("/users", response_model=UserResponse)
 def create_user_route(data: UserCreate, db: Session = Depends(get_db)):
     try:
@@ -28,17 +22,21 @@ def create_user_route(data: UserCreate, db: Session = Depends(get_db)):
         raise HTTPException(status_code=409, detail="User already exists")
 
 @router.get("/users", response_model=list[UserResponse])
-def get_users_route(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    users = get_users(db, skip, limit)
+def get_users_route(skip: int = 0, limit: int = 100, cursor=Depends(get_cursor), db: Session = Depends(get_read_db)):
+    users = get_users(db, skip, limit, cursor)
 
     if not users:
         raise HTTPException(status_code=404, detail="There are no users")
 
-    return users
+    return page_response(users, USER_ORDER, limit)
+
+@router.get("/users/me", response_model=UserResponse)
+def get_current_user_route(user: UserResponse = Depends(get_current_user)):
+    return user
 
 @router.get("/users/firebase/{firebase_id}", response_model=UserResponse)
-def get_user_by_firebase_id_route(firebase_id: str, db: Session = Depends(get_db)):
-    user = get_user_by_firebase_id(db, firebase_id)
+def get_user_by_firebase_id_route(firebase_id: str, db: Session = Depends(get_read_db)):
+    user = get_user_identity(db, firebase_id)
 
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
@@ -46,7 +44,7 @@ def get_user_by_firebase_id_route(firebase_id: str, db: Session = Depends(get_db
     return user
 
 @router.get("/users/{id}", response_model=UserResponse)
-def get_user_route(id: int, db: Session = Depends(get_db)):
+def get_user_route(id: int, db: Session = Depends(get_read_db)):
     user = get_user(db, id)
 
     if not user:
@@ -65,13 +63,8 @@ def update_user_route(id: int, user_data: UserUpdate, db: Session = Depends(get_
 
 @router.delete("/users/{id}")
 def delete_user_route(id: int, db: Session = Depends(get_db)):
-    user = get_user(db, id)
-
-    if not user:
-        return Response(status_code=204)
-
-    success = delete_user(db, id, user.firebase_id)
+    success = delete_user(db, id)
     if not success:
-        raise HTTPException(status_code=404, detail="User not found")
+        return Response(status_code=204)
 
     return {"detail": "User deleted"}
\ No newline at end of file
@@ -1,2 +1,10 @@
-from .database import Base, SessionLocal, engine
-from .prompts import categorize_expense_prompt
\ No newline at end of file
+from .database import (
+    Base,
+    SessionLocal,
+    engine,
+    AsyncSessionLocal,
+    async_engine,
+    ReadSessionLocal,
+    AsyncReadSessionLocal
+)
+from .prompts import categorize_expense_prompt, categorize_expenses_batch_prompt
\ No newline at end of file
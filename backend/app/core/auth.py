@@ -0,0 +1,192 @@
+import os
+import re
+import threading
+import time
+import jwt
+import requests
+from cachetools import TTLCache
+from cryptography.x509 import load_pem_x509_certificate
+from dotenv import load_dotenv
+
+load_dotenv()
+
+FIREBASE_PROJECT_ID = os.getenv("FIREBASE_PROJECT_ID")  # defaults to the project of the initialized firebase_admin app
+FIREBASE_CERTS_URL = os.getenv(
+    "FIREBASE_CERTS_URL",
+    "https://www.googleapis.com/robot/v1/metadata/x509/securetoken@system.gserviceaccount.com"
+)
+AUTH_CERTS_MIN_REFRESH_SECONDS = int(os.getenv("AUTH_CERTS_MIN_REFRESH_SECONDS", "60"))
+AUTH_CLOCK_SKEW_SECONDS = int(os.getenv("AUTH_CLOCK_SKEW_SECONDS", "10"))
+AUTH_USER_CACHE_SIZE = int(os.getenv("AUTH_USER_CACHE_SIZE", "10000"))
+AUTH_USER_CACHE_TTL_SECONDS = int(os.getenv("AUTH_USER_CACHE_TTL_SECONDS", "300"))
+
+MAX_AGE_PATTERN = re.compile(r"max-age=(\d+)")
+
+class InvalidTokenError(Exception):
+    pass
+
+class AuthUnavailableError(Exception):
+    pass
+
+def firebase_project_id():
+    if FIREBASE_PROJECT_ID:
+        return FIREBASE_PROJECT_ID
+
+    import firebase_admin
+    try:
+        return firebase_admin.get_app().project_id
+    except ValueError:
+        raise AuthUnavailableError("Firebase is not initialized and FIREBASE_PROJECT_ID is not set")
+
+# Verifies Firebase ID tokens locally against Google's signing certificates. The certificates are
+# kept for as long as Google's Cache-Control allows, and fetched early when a token names a key id we
+# have not seen, which is how a key rotation shows up.
+class FirebaseTokenVerifier:
+    def __init__(self, certs_url=FIREBASE_CERTS_URL, project_id=None):
+        self.certs_url = certs_url
+        self.project_id = project_id
+        self._keys = {}
+        self._expires_at = 0.0
+        self._fetched_at = None
+        self._lock = threading.Lock()
+        self._counters = {"verified": 0, "rejected": 0, "key_fetches": 0}
+
+    def _count(self, name):
+        with self._lock:
+            self._counters[name] += 1
+
+    def stats(self):
+        with self._lock:
+            counters = dict(self._counters)
+            counters["keys"] = len(self._keys)
+        return counters
+
+    def _fetch_keys(self):
+        try:
+            response = requests.get(self.certs_url, timeout=5)
+            response.raise_for_status()
+            certificates = response.json()
+        except (requests.RequestException, ValueError) as e:
+            raise AuthUnavailableError(f"Could not fetch Firebase signing keys: {e}")
+
+        match = MAX_AGE_PATTERN.search(response.headers.get("Cache-Control", ""))
+        max_age = int(match.group(1)) if match else 3600
+
+        self._keys = {
+            key_id: load_pem_x509_certificate(certificate.encode("utf-8")).public_key()
+            for key_id, certificate in certificates.items()
+        }
+        self._fetched_at = time.monotonic()
+        self._expires_at = self._fetched_at + max_age
+        self._counters["key_fetches"] += 1
+
+    def public_key(self, key_id):
+        with self._lock:
+            now = time.monotonic()
+            expired = now >= self._expires_at
+            unknown = key_id not in self._keys
+            # Unknown key ids refetch at most every AUTH_CERTS_MIN_REFRESH_SECONDS so forged ids cannot hammer Google
+            if expired or (unknown and (self._fetched_at is None or now - self._fetched_at >= AUTH_CERTS_MIN_REFRESH_SECONDS)):
+                try:
+                    self._fetch_keys()
+                except AuthUnavailableError:
+                    if not self._keys:
+                        raise
+                    # Keep serving the previous keys while Google is unreachable
+            return self._keys.get(key_id)
+
+    def verify(self, token: str):
+        try:
+            header = jwt.get_unverified_header(token)
+        except jwt.PyJWTError as e:
+            self._count("rejected")
+            raise InvalidTokenError(f"Malformed token: {e}")
+
+        if header.get("alg") != "RS256":
+            self._count("rejected")
+            raise InvalidTokenError("Token is not signed with RS256")
+
+        key = self.public_key(header.get("kid"))
+        if key is None:
+            self._count("rejected")
+            raise InvalidTokenError("Token was signed with an unknown key")
+
+        project_id = self.project_id or firebase_project_id()
+        try:
+            claims = jwt.decode(
+                token,
+                key,
+                algorithms=["RS256"],
+                audience=project_id,
+                issuer=f"https://securetoken.google.com/{project_id}",
+                leeway=AUTH_CLOCK_SKEW_SECONDS,
+                options={"require": ["exp", "iat", "aud", "iss", "sub"]}
+            )
+        except jwt.PyJWTError as e:
+            self._count("rejected")
+            raise InvalidTokenError(f"Invalid token: {e}")
+
+        if not claims.get("sub") or claims.get("auth_time", 0) > time.time() + AUTH_CLOCK_SKEW_SECONDS:
+            self._count("rejected")
+            raise InvalidTokenError("Invalid token subject or auth time")
+
+        self._count("verified")
+        return claims
+
+# firebase_id -> UserResponse. Entries are versioned like the policy set cache, so a lookup that raced
+# with update_user/delete_user cannot put the stale user back after it was invalidated.
+class IdentityCache:
+    def __init__(self, maxsize=AUTH_USER_CACHE_SIZE, ttl=AUTH_USER_CACHE_TTL_SECONDS):
+        self._entries = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._versions = {}
+        self._generation = 0
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "misses": 0, "invalidations": 0}
+
+    def _version(self, firebase_id):
+        return (self._generation, self._versions.get(firebase_id, 0))
+
+    def stats(self):
+        with self._lock:
+            counters = dict(self._counters)
+            counters["size"] = len(self._entries)
+
+        lookups = counters["hits"] + counters["misses"]
+        counters["hit_rate"] = counters["hits"] / lookups if lookups else 0.0
+        return counters
+
+    def get(self, firebase_id, loader):
+        with self._lock:
+            version = self._version(firebase_id)
+            identity = self._entries.get(firebase_id)
+            if identity is not None:
+                self._counters["hits"] += 1
+                return identity
+            self._counters["misses"] += 1
+
+        identity = loader()
+        if identity is not None:
+            with self._lock:
+                if self._version(firebase_id) == version:
+                    self._entries[firebase_id] = identity
+
+        return identity
+
+    def invalidate(self, *firebase_ids):
+        with self._lock:
+            for firebase_id in firebase_ids:
+                if firebase_id is None:
+                    continue
+                self._versions[firebase_id] = self._versions.get(firebase_id, 0) + 1
+                self._entries.pop(firebase_id, None)
+                self._counters["invalidations"] += 1
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._versions.clear()
+            self._entries.clear()
+            self._counters["invalidations"] += 1
+
+token_verifier = FirebaseTokenVerifier()
+identity_cache = IdentityCache()
\ No newline at end of file
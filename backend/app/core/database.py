@@ -1,12 +1,103 @@
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 import os
 from dotenv import load_dotenv
+from app.core.pool import PoolMetrics, instrument_engine, pool_metrics, timed_pool_class
 
 load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL")
+DATABASE_REPLICA_URL = os.getenv("DATABASE_REPLICA_URL")
 
-engine = create_engine(DATABASE_URL, echo=True, future=True)
+def env_flag(name, default=False):
+    return os.getenv(name, str(default)).strip().lower() in ("1", "true", "yes", "on")
+
+DB_ECHO = env_flag("DB_ECHO")
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = env_flag("DB_POOL_PRE_PING", True)
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "0"))
+
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+def async_database_url(url):
+    # Derives the async URL from DATABASE_URL; asyncpg takes "ssl" instead of libpq's sslmode/channel_binding
+    url = make_url(url)
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No async driver configured for {backend}; set ASYNC_DATABASE_URL")
+
+    url = url.set(drivername=ASYNC_DRIVERS[backend])
+    if backend == "postgresql":
+        query = dict(url.query)
+        sslmode = query.pop("sslmode", None)
+        query.pop("channel_binding", None)
+        if sslmode:
+            query["ssl"] = sslmode
+        url = url.set(query=query)
+
+    return url
+
+def engine_options(url, name, is_async=False):
+    url = make_url(url)
+    metrics = pool_metrics[name] = PoolMetrics()
+    options = {
+        "echo": DB_ECHO,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+        "poolclass": timed_pool_class(AsyncAdaptedQueuePool if is_async else QueuePool, metrics),
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+    }
+
+    if DB_STATEMENT_TIMEOUT_MS and url.get_backend_name() == "postgresql":
+        if is_async:
+            options["connect_args"] = {"server_settings": {"statement_timeout": str(DB_STATEMENT_TIMEOUT_MS)}}
+        else:
+            options["connect_args"] = {"options": f"-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}"}
+
+    return options, metrics
+
+def build_engine(url, name):
+    options, metrics = engine_options(url, name)
+    return instrument_engine(create_engine(url, future=True, **options), metrics)
+
+def build_async_engine(url, name):
+    options, metrics = engine_options(url, name, is_async=True)
+    return instrument_engine(create_async_engine(url, **options), metrics)
+
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or async_database_url(DATABASE_URL)
+ASYNC_DATABASE_REPLICA_URL = os.getenv("ASYNC_DATABASE_REPLICA_URL") or (async_database_url(DATABASE_REPLICA_URL) if DATABASE_REPLICA_URL else None)
+
+engine = build_engine(DATABASE_URL, "primary")
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+async_engine = build_async_engine(ASYNC_DATABASE_URL, "primary_async")
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
+# Read-only routes use the replica when one is configured. Without one these stay None and callers fall
+# back to the primary (get_read_db shares the request's primary session instead of opening a second one)
+if DATABASE_REPLICA_URL:
+    replica_engine = build_engine(DATABASE_REPLICA_URL, "replica")
+    ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=replica_engine)
+else:
+    replica_engine = None
+    ReadSessionLocal = None
+
+if ASYNC_DATABASE_REPLICA_URL:
+    async_replica_engine = build_async_engine(ASYNC_DATABASE_REPLICA_URL, "replica_async")
+    AsyncReadSessionLocal = async_sessionmaker(async_replica_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+else:
+    async_replica_engine = None
+    AsyncReadSessionLocal = None
+
 Base = declarative_base()
\ No newline at end of file
@@ -0,0 +1,83 @@
+import threading
+import time
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool
+
+class PoolMetrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.engine = None
+        self.checkouts = 0
+        self.checkins = 0
+        self.connects = 0
+        self.invalidations = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    def record_wait(self, seconds, timed_out=False):
+        with self._lock:
+            self.wait_seconds_total += seconds
+            self.wait_seconds_max = max(self.wait_seconds_max, seconds)
+            if timed_out:
+                self.timeouts += 1
+
+    def increment(self, name):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def snapshot(self):
+        with self._lock:
+            snapshot = {
+                "checkouts": self.checkouts,
+                "checkins": self.checkins,
+                "connects": self.connects,
+                "invalidations": self.invalidations,
+                "timeouts": self.timeouts,
+                "wait_ms_total": round(self.wait_seconds_total * 1000, 3),
+                "wait_ms_max": round(self.wait_seconds_max * 1000, 3),
+                "wait_ms_avg": round(self.wait_seconds_total * 1000 / self.checkouts, 3) if self.checkouts else 0.0,
+            }
+
+        pool = getattr(self.engine, "sync_engine", self.engine).pool if self.engine is not None else None
+        if isinstance(pool, QueuePool):
+            snapshot.update({
+                "size": pool.size(),
+                "checked_in": pool.checkedin(),
+                "checked_out": pool.checkedout(),
+                "overflow": pool.overflow(),
+            })
+        return snapshot
+
+pool_metrics = {}
+
+def timed_pool_class(pool_class, metrics):
+    # Times how long callers wait for a connection, including time blocked on an exhausted pool.
+    # A subclass per engine so the metrics survive pool.recreate() after a dispose.
+    class TimedPool(pool_class):
+        def _do_get(self):
+            start = time.perf_counter()
+            try:
+                connection = super()._do_get()
+            except PoolTimeoutError:
+                metrics.record_wait(time.perf_counter() - start, timed_out=True)
+                raise
+            metrics.record_wait(time.perf_counter() - start)
+            return connection
+
+    TimedPool.__name__ = f"Timed{pool_class.__name__}"
+    return TimedPool
+
+def instrument_engine(engine, metrics):
+    metrics.engine = engine
+    target = engine.sync_engine if hasattr(engine, "sync_engine") else engine
+
+    event.listen(target, "checkout", lambda *args: metrics.increment("checkouts"))
+    event.listen(target, "checkin", lambda *args: metrics.increment("checkins"))
+    event.listen(target, "connect", lambda *args: metrics.increment("connects"))
+    event.listen(target, "invalidate", lambda *args: metrics.increment("invalidations"))
+    return engine
+
+def get_pool_metrics():
+    return {name: metrics.snapshot() for name, metrics in pool_metrics.items()}
@@ -1,25 +1,77 @@
-def categorize_expense_prompt(expense_data):
-    return f"""
-    Categorize the following expense into one of these categories:
+CATEGORY_DESCRIPTIONS = """
     - general: Common business expenses like subscriptions, memberships, fees, or professional services
     - travel: General travel expenses not specifically food, lodging, or transportation
     - food: Meals, restaurants, catering, grocery purchases for business purposes
     - lodging: Hotels, accommodations, rentals for business stays
     - transportation: Flights, taxis, trains, car rentals, fuel for business travel
     - supplies: Office supplies, equipment, software, subscriptions
-    - other: Any expense that doesn't clearly fit the above categories
+    - other: Any expense that doesn't clearly fit the above categories"""
+
+CATEGORY_EXAMPLES = """
+    - "Uber from airport to hotel" → transportation
+    - "Hilton Hotel 3 nights" → lodging
+    - "Business dinner with clients" → food
+    - "Office paper and pens" → supplies
+    - "Conference registration fee" → general"""
+
+# Merchant and description keywords the local classifier maps straight to a category without asking
+# the model; grows the examples above into the brands and words that show up most on receipts
+CATEGORY_KEYWORDS = {
+    "lodging": [
+        "hilton", "marriott", "hyatt", "sheraton", "westin", "holiday inn", "hampton inn", "best western",
+        "radisson", "wyndham", "four seasons", "ritz carlton", "courtyard", "doubletree", "airbnb", "vrbo",
+        "hotel", "hotels", "motel", "hostel", "inn", "resort", "suites", "lodging"
+    ],
+    "transportation": [
+        "uber", "lyft", "taxi", "cab", "amtrak", "greyhound", "delta air", "united airlines", "american airlines",
+        "southwest", "jetblue", "alaska airlines", "spirit airlines", "airline", "airlines", "flight", "airfare",
+        "hertz", "avis", "enterprise rent", "budget rent", "national car", "sixt", "car rental",
+        "shell", "chevron", "exxon", "mobil", "texaco", "fuel", "gas station", "parking", "toll", "train", "rail"
+    ],
+    "food": [
+        "uber eats", "doordash", "grubhub", "postmates", "starbucks", "dunkin", "mcdonald's", "chipotle", "subway",
+        "panera", "pizza", "restaurant", "cafe", "coffee", "bistro", "grill", "bakery", "diner", "catering",
+        "dinner", "lunch", "breakfast", "meal", "meals", "groceries", "grocery", "whole foods", "trader joe's"
+    ],
+    "supplies": [
+        "staples", "office depot", "officemax", "best buy", "paper", "pens", "printer", "toner", "ink",
+        "office supplies", "stationery", "laptop", "monitor", "keyboard"
+    ],
+    "general": [
+        "registration fee", "conference", "membership", "dues", "notary", "consulting", "legal fees", "bank fee"
+    ],
+    "travel": [
+        "expedia", "booking.com", "kayak", "priceline", "travel agency", "visa fee", "travel insurance"
+    ],
+}
+
+def categorize_expense_prompt(expense_data):
+    return f"""
+    Categorize the following expense into one of these categories:{CATEGORY_DESCRIPTIONS}
 
     Expense details:
     Merchant: {expense_data['merchant']}
     Amount: ${expense_data['amount']}
     Description: {expense_data['description']}
 
-    Examples:
-    - "Uber from airport to hotel" → transportation
-    - "Hilton Hotel 3 nights" → lodging
-    - "Business dinner with clients" → food
-    - "Office paper and pens" → supplies
-    - "Conference registration fee" → general
+    Examples:{CATEGORY_EXAMPLES}
 
     Respond with only one word from the available categories: general, travel, food, lodging, transportation, supplies, or other.
-    """
\ No newline at end of file
+    """
+
+def categorize_expenses_batch_prompt(expenses_data):
+    expense_lines = "\n".join(
+        f"    {index}. Merchant: {expense['merchant']} | Amount: ${expense['amount']} | Description: {expense['description']}"
+        for index, expense in enumerate(expenses_data, start=1)
+    )
+
+    return f"""
+    Categorize each of the following expenses into one of these categories:{CATEGORY_DESCRIPTIONS}
+
+    Expenses:
+{expense_lines}
+
+    Examples:{CATEGORY_EXAMPLES}
+
+    Respond with exactly one line per expense in the form "<number>: <category>", using only the available categories: general, travel, food, lodging, transportation, supplies, or other.
+    """
@@ -1,2 +1,2 @@
 from .company import create_company, get_companies, get_company, get_company_by_name, update_company, delete_company, get_company_users, get_company_expenses
-from .user import create_user, get_users, get_user, get_user_by_firebase_id, update_user, delete_user
+from .user import create_user, get_users, get_user, get_user_by_firebase_id, get_user_identity, update_user, delete_user
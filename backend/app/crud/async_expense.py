@@ -0,0 +1,44 @@
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.crud.expense import EXPENSE_ORDER, EXPENSE_RESPONSE_COLUMNS
+from app.models import Expense
+from app.utils.pagination import paginate
+
+# Async variants of the expense reads in app/crud/expense.py, for routes served on the event loop.
+# Listings return plain rows of EXPENSE_RESPONSE_COLUMNS for page_response
+
+async def get_expenses(db: AsyncSession, skip: int = 0, limit: int = 100, cursor=None):
+    statement = paginate(select(*EXPENSE_RESPONSE_COLUMNS), EXPENSE_ORDER, skip, limit, cursor, descending=True)
+    return (await db.execute(statement)).all()
+
+async def get_user_expenses(db: AsyncSession, user_id: int, skip: int = 0, limit: int = 100, cursor=None):
+    statement = select(*EXPENSE_RESPONSE_COLUMNS).where(Expense.user_id == user_id)
+    statement = paginate(statement, EXPENSE_ORDER, skip, limit, cursor, descending=True)
+    return (await db.execute(statement)).all()
+
+async def get_expense(db: AsyncSession, expense_id: int):
+    return await db.get(Expense, expense_id)
+
+async def get_flagged_expenses(db: AsyncSession, user_id: int = None, skip: int = 0, limit: int = 100, cursor=None):
+    statement = select(*EXPENSE_RESPONSE_COLUMNS).where(Expense.is_flagged == True)
+
+    if user_id is not None:
+        statement = statement.where(Expense.user_id == user_id)
+
+    statement = paginate(statement, EXPENSE_ORDER, skip, limit, cursor, descending=True)
+    return (await db.execute(statement)).all()
+
+async def get_expense_categorization(db: AsyncSession, expense_id: int):
+    # Plain columns rather than the entity, so a poll never sees a value cached in the session
+    statement = select(
+        Expense.id,
+        Expense.categorization_status,
+        Expense.category,
+        Expense.is_approved,
+        Expense.is_flagged,
+        Expense.flag_reason
+    ).where(Expense.id == expense_id)
+    row = (await db.execute(statement)).first()
+    # Hand the connection back to the pool between polls
+    await db.rollback()
+    return row
\ No newline at end of file
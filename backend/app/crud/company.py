@@ -1,16 +1,36 @@
+import os
+from datetime import datetime
+from sqlalchemy import delete, insert, select, update
 from sqlalchemy.orm import Session
-from app.models import Company
+from app.core.auth import identity_cache
+from app.models import Company, Expense, ImportJob, MerchantRule, Policy, User
 from app.schemas import CompanyCreate, CompanyUpdate
+from app.utils.pagination import paginate
+from app.crud.expense import EXPENSE_RESPONSE_COLUMNS
+from app.crud.expense_rollup import delete_company_rollups
+from app.crud.expense_stat import delete_company_stats
+from app.crud.user import USER_COLUMNS
+from app.utils.policy_engine import policy_set_cache
+
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "5000"))
+
+COMPANY_ORDER = (Company.id,)
+COMPANY_USER_ORDER = (User.id,)
+COMPANY_EXPENSE_ORDER = (Expense.date, Expense.id)
+
+# Writes return these columns straight from INSERT/UPDATE ... RETURNING and listings select them;
+# the rows serialize like the model
+COMPANY_COLUMNS = tuple(Company.__table__.c)
+
+EXPORT_COLUMNS = tuple(Expense.__table__.c)
 
 def create_company(db: Session, company: CompanyCreate):
-    db_company = Company(**company.dict())
-    db.add(db_company)
+    db_company = db.execute(insert(Company).values(**company.dict()).returning(*COMPANY_COLUMNS)).first()
     db.commit()
-    db.refresh(db_company)
     return db_company
 
-def get_companies(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(Company).offset(skip).limit(limit).all()
+def get_companies(db: Session, skip: int = 0, limit: int = 100, cursor=None):
+    return paginate(db.query(*COMPANY_COLUMNS), COMPANY_ORDER, skip, limit, cursor).all()
 
 def get_company(db: Session, id: int):
     return db.query(Company).filter(Company.id == id).first()
@@ -19,29 +39,84 @@ def get_company_by_name(db: Session, name: str):
     return db.query(Company).filter(Company.name == name).first()
 
 def update_company(db: Session, id: int, company_data: CompanyUpdate):
-    db_company = db.query(Company).filter(Company.id == id).first()
-    if not db_company:
-        return None
-
-    for field, value in company_data.dict(exclude_unset=True).items():
-        if hasattr(db_company, field):
-            setattr(db_company, field, value)
+    values = {field: value for field, value in company_data.dict(exclude_unset=True).items() if hasattr(Company, field)}
+    if not values:
+        return db.query(*COMPANY_COLUMNS).filter(Company.id == id).first()
 
+    db_company = db.execute(update(Company).where(Company.id == id).values(**values).returning(*COMPANY_COLUMNS)).first()
     db.commit()
-    db.refresh(db_company)
     return db_company
 
 def delete_company(db: Session, id: int):
-    db_company = db.query(Company).filter(Company.id == id).first()
-    if not db_company:
+    # Users, expenses and import jobs keep their rows and lose the company, as with the ORM cascade, without
+    # loading every child. Policies are deleted: a NULL company_id would make them apply to every company.
+    # The company's merchant rules go with it.
+    delete_company_rollups(db, id)
+    delete_company_stats(db, id)
+    db.execute(update(User).where(User.company_id == id).values(company_id=None))
+    db.execute(update(Expense).where(Expense.company_id == id).values(company_id=None))
+    db.execute(update(ImportJob).where(ImportJob.company_id == id).values(company_id=None))
+    db.execute(delete(Policy).where(Policy.company_id == id))
+    db.execute(delete(MerchantRule).where(MerchantRule.company_id == id))
+
+    deleted = db.execute(delete(Company).where(Company.id == id).returning(Company.id)).first()
+    if not deleted:
+        db.rollback()
         return False
 
-    db.delete(db_company)
     db.commit()
+    identity_cache.clear()
+    policy_set_cache.invalidate(id)
     return True
 
-def get_company_users(db: Session, company_id: int, skip: int = 0, limit: int = 100):
-    return db.query(Company).filter(Company.id == company_id).first().users[skip:skip + limit]
+def get_company_users(db: Session, company_id: int, skip: int = 0, limit: int = 100, cursor=None):
+    query = db.query(*USER_COLUMNS).filter(User.company_id == company_id)
+    return paginate(query, COMPANY_USER_ORDER, skip, limit, cursor).all()
+
+def filter_company_expenses(
+        statement,
+        company_id: int,
+        start_date: datetime = None,
+        end_date: datetime = None,
+        category: str = None,
+        is_flagged: bool = None,
+        user_id: int = None
+):
+    statement = statement.where(Expense.company_id == company_id)
+
+    if start_date is not None:
+        statement = statement.where(Expense.date >= start_date)
+    if end_date is not None:
+        statement = statement.where(Expense.date <= end_date)
+    if category is not None:
+        statement = statement.where(Expense.category == category)
+    if is_flagged is not None:
+        statement = statement.where(Expense.is_flagged == is_flagged)
+    if user_id is not None:
+        statement = statement.where(Expense.user_id == user_id)
+
+    return statement
+
+def get_company_expenses(
+        db: Session,
+        company_id: int,
+        skip: int = 0,
+        limit: int = 100,
+        cursor=None,
+        start_date: datetime = None,
+        end_date: datetime = None,
+        category: str = None,
+        is_flagged: bool = None,
+        user_id: int = None
+):
+    query = filter_company_expenses(db.query(*EXPENSE_RESPONSE_COLUMNS), company_id, start_date, end_date, category, is_flagged, user_id)
+    return paginate(query, COMPANY_EXPENSE_ORDER, skip, limit, cursor, descending=True).all()
 
-def get_company_expenses(db: Session, company_id: int, skip: int = 0, limit: int = 100):
-    return db.query(Company).filter(Company.id == company_id).first().expenses[skip:skip + limit]
\ No newline at end of file
+def stream_company_expenses(db: Session, company_id: int, batch_size: int = EXPORT_BATCH_SIZE, **filters):
+    # Plain rows in batches from a server-side cursor, oldest first; memory stays at one batch however many rows match
+    statement = filter_company_expenses(select(*EXPORT_COLUMNS), company_id, **filters).order_by(*COMPANY_EXPENSE_ORDER)
+    result = db.execute(statement.execution_options(yield_per=batch_size))
+    try:
+        yield from result.partitions()
+    finally:
+        result.close()
\ No newline at end of file
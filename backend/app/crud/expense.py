@@ -1,159 +1,421 @@
 import csv
+import os
+from collections import defaultdict
 from io import StringIO
+from itertools import islice
+import numpy as np
+from sqlalchemy import and_, insert, null, or_, select, update
 from sqlalchemy.orm import Session
-from app.models import Expense
-from app.schemas.expense import ExpenseCreate, ExpenseUpdate
-from datetime import datetime
-
-def create_expense(db: Session, expense: ExpenseCreate, policies=None, categorize_func=None):
+from app.models import Expense, CategorizationStatus
+from app.crud.expense_rollup import ROLLUP_FIELDS, record_expense_rollups, rollup_snapshot
+from app.crud.expense_stat import STAT_FIELDS, apply_expense_stats, expense_baseline, load_expense_stats, record_expense_stats, save_expense_stats, stat_snapshot
+from app.schemas.expense import ExpenseCreate, ExpenseResponse, ExpenseUpdate
+from app.utils.pagination import paginate
+from app.crud.policy import get_compiled_policies
+from app.utils.duplicates import DUPLICATE_REASON_PREFIX, DuplicateDetector, expense_fingerprint, find_duplicate, fingerprint_of
+from app.utils.policy_engine import compile_policies, enum_value, is_anomaly_reason, is_policy_reason
+from app.utils.serialization import response_columns
+from datetime import datetime, timedelta, timezone
+
+CSV_CHUNK_SIZE = int(os.getenv("CSV_CHUNK_SIZE", "500"))
+CSV_MAX_REPORTED_ERRORS = 100
+BULK_UPDATE_CHUNK_SIZE = int(os.getenv("BULK_UPDATE_CHUNK_SIZE", "5000"))
+REAUDIT_CHUNK_SIZE = int(os.getenv("REAUDIT_CHUNK_SIZE", "20000"))
+# A pending expense claimed this long ago without being categorized is presumed abandoned and can be claimed again
+CATEGORIZATION_LEASE_SECONDS = int(os.getenv("CATEGORIZATION_LEASE_SECONDS", "120"))
+
+# Expense listings are newest first; id breaks ties between expenses on the same date
+EXPENSE_ORDER = (Expense.date, Expense.id)
+EXPENSE_RESPONSE_COLUMNS = response_columns(Expense, ExpenseResponse)
+
+# Changing any of these changes an expense's duplicate fingerprint
+FINGERPRINT_FIELDS = {"user_id", "merchant", "amount", "date"}
+
+def create_expense(db: Session, expense: ExpenseCreate, policies=None, categorize_func=None, defer_categorization: bool = False):
     expense_data = expense.dict()
 
-    if not expense_data.get("category") and categorize_func:
+    # Deferred expenses are stored uncategorized and unchecked; a categorization worker fills both in
+    if defer_categorization and not expense_data.get("category"):
+        expense_data["categorization_status"] = CategorizationStatus.PENDING
+        expense_data["category"] = null()  # stored as NULL rather than the column default until categorized
+        policies = None
+    elif not expense_data.get("category") and categorize_func:
         expense_data["category"] = categorize_func(expense_data)
 
+    stats = None
     if policies:
-        is_flagged, flag_reason, is_approved = check_expense_against_policies(expense_data, policies)
+        # Scored against the stats as they were before this expense, then the expense is added to them
+        stats = load_expense_stats(db, [expense_data])
+        is_flagged, flag_reason, is_approved = check_expense_against_policies(expense_data, policies, expense_baseline(stats, expense_data))
         expense_data["is_flagged"] = is_flagged
         expense_data["flag_reason"] = flag_reason
         expense_data["is_approved"] = not is_flagged if is_approved is None else is_approved
 
+    # A manual submission matching an existing expense is kept but flagged for review
+    expense_data["fingerprint"] = fingerprint_of(expense_data)
+    duplicate_id = find_duplicate(db, expense_data)
+    if duplicate_id and not expense_data.get("is_flagged"):
+        expense_data["is_flagged"] = True
+        expense_data["flag_reason"] = f"{DUPLICATE_REASON_PREFIX}{duplicate_id}"
+        expense_data["is_approved"] = False
+
     db_expense = Expense(**expense_data)
     db.add(db_expense)
+    db.flush()
+    record_expense_rollups(db, added=[db_expense])
+    record_expense_stats(db, added=[db_expense], stats=stats)
     db.commit()
     db.refresh(db_expense)
     return db_expense
 
-def get_expenses(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(Expense).offset(skip).limit(limit).all()
+def get_expenses(db: Session, skip: int = 0, limit: int = 100, cursor=None):
+    return paginate(db.query(Expense), EXPENSE_ORDER, skip, limit, cursor, descending=True).all()
 
-def get_user_expenses(db: Session, user_id: int, skip: int = 0, limit: int = 100):
-    return db.query(Expense).filter(Expense.user_id == user_id).offset(skip).limit(limit).all()
+def get_user_expenses(db: Session, user_id: int, skip: int = 0, limit: int = 100, cursor=None):
+    query = db.query(Expense).filter(Expense.user_id == user_id)
+    return paginate(query, EXPENSE_ORDER, skip, limit, cursor, descending=True).all()
 
 def get_expense(db: Session, expense_id: int):
     return db.query(Expense).filter(Expense.id == expense_id).first()
 
-def get_flagged_expenses(db: Session, user_id: int = None, skip: int = 0, limit: int = 100):
+def get_flagged_expenses(db: Session, user_id: int = None, skip: int = 0, limit: int = 100, cursor=None):
     query = db.query(Expense).filter(Expense.is_flagged == True)
 
     if user_id is not None:
         query = query.filter(Expense.user_id == user_id)
 
-    return query.offset(skip).limit(limit).all()
+    return paginate(query, EXPENSE_ORDER, skip, limit, cursor, descending=True).all()
+
+def claimable_categorization(now: datetime):
+    return and_(
+        Expense.categorization_status == CategorizationStatus.PENDING,
+        or_(
+            Expense.categorization_claimed_at.is_(None),
+            Expense.categorization_claimed_at < now - timedelta(seconds=CATEGORIZATION_LEASE_SECONDS)
+        )
+    )
+
+def get_pending_expense_ids(db: Session):
+    # Pending expenses no live worker holds a claim on
+    return [
+        expense_id
+        for (expense_id,) in db.query(Expense.id)
+        .filter(claimable_categorization(datetime.now(timezone.utc)))
+        .order_by(Expense.id)
+    ]
+
+def claim_categorization(db: Session, expense_id: int):
+    # A single conditional UPDATE, so of several processes queueing the same expense only one categorizes it
+    now = datetime.now(timezone.utc)
+    claimed = db.execute(
+        update(Expense)
+        .where(Expense.id == expense_id, claimable_categorization(now))
+        .values(categorization_claimed_at=now)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    db.commit()
+    return bool(claimed)
 
 def update_expense(db: Session, expense_id: int, expense_data: dict):
     db_expense = db.query(Expense).filter(Expense.id == expense_id).first()
     if not db_expense:
         return None
 
+    previous = rollup_snapshot(db_expense)
     for field, value in expense_data.items():
         if hasattr(db_expense, field):
             setattr(db_expense, field, value)
 
+    if FINGERPRINT_FIELDS & set(expense_data):
+        db_expense.fingerprint = expense_fingerprint(db_expense.user_id, db_expense.merchant, db_expense.amount, db_expense.date)
+
+    db.flush()
+    record_expense_rollups(db, added=[db_expense], removed=[previous])
+    if stat_snapshot(previous) != stat_snapshot(db_expense):
+        record_expense_stats(db, added=[db_expense], removed=[previous])
     db.commit()
     db.refresh(db_expense)
     return db_expense
 
-def bulk_update_expenses(db: Session, expense_ids: list[int], expense_data: dict):
-    updated_expenses = []
+def bulk_update_expenses(db: Session, expense_ids: list[int], expense_data: dict, return_rows: bool = True):
+    values = {field: value for field, value in expense_data.items() if hasattr(Expense, field) and value is not None}
+    return bulk_update_expense_values(db, expense_ids, values, return_rows)
+
+def bulk_review_expenses(db: Session, expense_ids: list[int], review_data: dict, return_rows: bool = True):
+    values = {field: value for field, value in review_data.items() if field in ("is_approved", "is_flagged", "flag_reason")}
+    if values.get("is_flagged") is False:
+        values["flag_reason"] = None
+    return bulk_update_expense_values(db, expense_ids, values, return_rows)
+
+def bulk_update_expense_values(db: Session, expense_ids: list[int], values: dict, return_rows: bool = True):
+    # One set-based UPDATE per chunk of ids. Returns plain rows (or just the match count when
+    # return_rows is False) so nothing has to be refreshed after the commit.
+    ids = list(dict.fromkeys(expense_ids))
+    columns = list(Expense.__table__.columns)
+
+    if not ids:
+        return [] if return_rows else 0
+
+    use_returning = bool(values) and return_rows and db.get_bind().dialect.update_returning
+    rows = []
+    updated = 0
+
+    # Rollups only need adjusting when a field they are keyed or summed on changes
+    rollup_columns = [getattr(Expense, field) for field in ROLLUP_FIELDS] if set(values) & set(ROLLUP_FIELDS) else None
+
+    if values:
+        for chunk_ids in iter_chunks(ids, BULK_UPDATE_CHUNK_SIZE):
+            if rollup_columns:
+                previous = db.execute(select(*rollup_columns).where(Expense.id.in_(chunk_ids)).with_for_update()).all()
+                record_expense_rollups(
+                    db,
+                    added=[{**row._mapping, **values} for row in previous],
+                    removed=[row._mapping for row in previous]
+                )
+                if set(values) & set(STAT_FIELDS):
+                    record_expense_stats(
+                        db,
+                        added=[{**row._mapping, **values} for row in previous],
+                        removed=[row._mapping for row in previous]
+                    )
+
+            if FINGERPRINT_FIELDS & set(values):
+                refresh_fingerprints(db, chunk_ids, values)
+
+            statement = update(Expense.__table__).where(Expense.id.in_(chunk_ids)).values(**values)
+            if use_returning:
+                rows.extend(db.execute(statement.returning(*columns)).all())
+            else:
+                updated += db.execute(statement).rowcount
+        db.commit()
 
-    for expense_id in expense_ids:
-        db_expense = db.query(Expense).filter(Expense.id == expense_id).first()
-        if db_expense:
-            for field, value in expense_data.items():
-                if hasattr(db_expense, field) and value is not None:
-                    setattr(db_expense, field, value)
-            updated_expenses.append(db_expense)
+    if not return_rows:
+        return updated
 
-    db.commit()
-    for expense in updated_expenses:
-        db.refresh(expense)
+    if not use_returning:
+        for chunk_ids in iter_chunks(ids, BULK_UPDATE_CHUNK_SIZE):
+            rows.extend(db.execute(select(*columns).where(Expense.id.in_(chunk_ids))).all())
+
+    positions = {expense_id: position for position, expense_id in enumerate(ids)}
+    return sorted(rows, key=lambda row: positions[row.id])
 
-    return updated_expenses
+def refresh_fingerprints(db: Session, expense_ids: list[int], values: dict):
+    # Fingerprints of the given expenses as they will be once values is applied
+    fields = [Expense.id, *(getattr(Expense, field) for field in sorted(FINGERPRINT_FIELDS))]
+    rows = db.execute(select(*fields).where(Expense.id.in_(expense_ids))).all()
+    if not rows:
+        return
+
+    db.execute(update(Expense), [
+        {"id": row.id, "fingerprint": fingerprint_of({**row._mapping, **values})}
+        for row in rows
+    ])
 
 def delete_expense(db: Session, expense_id: int):
     db_expense = db.query(Expense).filter(Expense.id == expense_id).first()
     if not db_expense:
         return False
 
+    record_expense_rollups(db, removed=[db_expense])
+    record_expense_stats(db, removed=[db_expense])
     db.delete(db_expense)
     db.commit()
     return True
 
-def process_csv(db: Session, user_id: int, company_id: int, file_content: str, policies, categorize_func):
-    csv_file = StringIO(file_content)
+def iter_csv_rows(file_content, user_id: int, company_id: int):
+    csv_file = StringIO(file_content) if isinstance(file_content, str) else file_content
     reader = csv.DictReader(csv_file)
 
-    stats = {"total_processed": 0, "successful": 0, "flagged": 0}
-
     for row in reader:
         try:
-            expense_data = {
+            yield reader.line_num, {
                 "company_id": company_id,
                 "user_id": user_id,
                 "merchant": row.get("merchant", ""),
                 "amount": float(row.get("amount", 0)),
                 "date": datetime.strptime(row.get("date", ""), "%Y-%m-%d"),
                 "description": row.get("description", "")
-            }
-
-            # Categorize using AI
-            category = categorize_func(expense_data)
-            expense_data["category"] = category
-
-            is_flagged, flag_reason, is_approved = check_expense_against_policies(expense_data, policies)
-            expense_data["is_flagged"] = is_flagged
-            expense_data["flag_reason"] = flag_reason
-            expense_data["is_approved"] = not is_flagged if is_approved is None else is_approved
-
-            db_expense = Expense(**expense_data)
-            db.add(db_expense)
-
-            stats["total_processed"] += 1
+            }, None
+        except Exception as e:
+            yield reader.line_num, None, str(e)
+
+def iter_chunks(items, chunk_size: int):
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def process_csv_chunk(db: Session, expenses_data: list[dict], policies, categorize_func, batch_categorize_func=None):
+    # Categorize using AI, batching many rows per request when supported
+    if batch_categorize_func:
+        categories = batch_categorize_func(expenses_data)
+    else:
+        categories = [categorize_func(expense_data) for expense_data in expenses_data]
+
+    for expense_data, category in zip(expenses_data, categories):
+        expense_data["category"] = category
+
+    # Rows are scored in file order, each against the stats including the rows before it
+    stats = load_expense_stats(db, expenses_data)
+    flagged = 0
+    for expense_data in expenses_data:
+        is_flagged, flag_reason, is_approved = check_expense_against_policies(expense_data, policies, expense_baseline(stats, expense_data))
+        apply_expense_stats(stats, added=[expense_data])
+        expense_data["is_flagged"] = is_flagged
+        expense_data["flag_reason"] = flag_reason
+        expense_data["is_approved"] = not is_flagged if is_approved is None else is_approved
 
-            if is_flagged:
-                stats["flagged"] += 1
+        if is_flagged:
+            flagged += 1
+
+    db.execute(insert(Expense), expenses_data)
+    record_expense_rollups(db, added=expenses_data)
+    save_expense_stats(db, stats)
+    return flagged
+
+def process_csv(db: Session, user_id: int, company_id: int, file_content, policies, categorize_func, batch_categorize_func=None, chunk_size: int = None, on_chunk=None, skip_rows: int = 0, first_chunk: int = 1):
+    # file_content may be a string or a text stream; rows are read, categorized and committed one chunk at a time.
+    # on_chunk runs before each chunk's commit, so anything it writes lands in the same transaction as the rows.
+    chunk_size = chunk_size or CSV_CHUNK_SIZE
+    policies = compile_policies(policies)
+
+    stats = {"total_processed": 0, "successful": 0, "flagged": 0, "failed": 0, "duplicates": 0, "chunks": [], "errors": []}
+    # Rows the user already has are skipped before categorization, so re-uploading a statement costs no AI calls
+    duplicates = DuplicateDetector(db, user_id)
+
+    def record_error(line_number, error):
+        stats["failed"] += 1
+        if len(stats["errors"]) < CSV_MAX_REPORTED_ERRORS:
+            stats["errors"].append({"row": line_number, "error": error})
+
+    rows = islice(iter_csv_rows(file_content, user_id, company_id), skip_rows, None)
+    for chunk_number, chunk in enumerate(iter_chunks(rows, chunk_size), start=first_chunk):
+        progress = {"chunk": chunk_number, "rows": len(chunk), "inserted": 0, "flagged": 0, "failed": 0, "duplicates": 0}
+
+        expenses_data = []
+        for line_number, expense_data, error in chunk:
+            if error:
+                print(f"Error processing CSV row {line_number}: {error}")
+                record_error(line_number, error)
+                progress["failed"] += 1
             else:
-                stats["successful"] += 1
+                expenses_data.append(expense_data)
 
-        except Exception as e:
-            print(f"Error processing CSV row: {e}")
-            # Optionally add error tracking to stats
-            # stats["errors"] += 1
-            continue
-
-    db.commit()
-    return stats
+        expenses_data, duplicate_rows = duplicates.split(expenses_data)
+        progress["duplicates"] = len(duplicate_rows)
+        stats["duplicates"] += len(duplicate_rows)
 
-def check_expense_against_policies(expense_data, policies):
-    is_flagged = False
-    flag_reason = None
-    is_approved = None
+        if expenses_data:
+            try:
+                flagged = process_csv_chunk(db, expenses_data, policies, categorize_func, batch_categorize_func)
+                progress["inserted"] = len(expenses_data)
+                progress["flagged"] = flagged
+                stats["total_processed"] += len(expenses_data)
+                stats["flagged"] += flagged
+                stats["successful"] += len(expenses_data) - flagged
+            except Exception as e:
+                # Only this chunk is lost; earlier chunks are already committed
+                db.rollback()
+                print(f"Error committing CSV chunk {chunk_number}: {e}")
+                for line_number, expense_data, error in chunk:
+                    if not error:
+                        record_error(line_number, f"Chunk {chunk_number} failed: {e}")
+                progress["failed"] += len(expenses_data)
+
+        stats["chunks"].append(progress)
+        if on_chunk:
+            on_chunk(progress)
+        db.commit()
 
-    for policy in policies:
-        if policy.category != expense_data["category"]:
-            continue
+    return stats
 
-        rule_type = policy.rule_type
-        rule_value = policy.rule_value
+def check_expense_against_policies(expense_data, policies, baseline=None):
+    return compile_policies(policies).evaluate(expense_data, baseline)
+
+
+def reaudit_expenses(db: Session, company_id: int = None, start_date: datetime = None, end_date: datetime = None, chunk_size: int = None):
+    # Re-checks stored expenses against the current policies (every company when company_id is None).
+    # Expenses are read in id-ordered chunks as columns and only rows whose outcome changed are written back.
+    chunk_size = chunk_size or REAUDIT_CHUNK_SIZE
+    stats = {"scanned": 0, "changed": 0, "flagged": 0, "cleared": 0, "chunks": 0}
+
+    query = (
+        select(Expense.id, Expense.company_id, Expense.amount, Expense.category, Expense.merchant, Expense.is_flagged, Expense.flag_reason, Expense.is_approved)
+        .order_by(Expense.id)
+        .limit(chunk_size)
+    )
+    if company_id is not None:
+        query = query.where(Expense.company_id == company_id)
+    if start_date:
+        query = query.where(Expense.date >= start_date)
+    if end_date:
+        query = query.where(Expense.date <= end_date)
+
+    last_id = None
+    while True:
+        rows = db.execute(query if last_id is None else query.where(Expense.id > last_id)).all()
+        if not rows:
+            break
 
-        if rule_type == "amount_max":
-            try:
-                max_value = float(rule_value)
-            except (TypeError, ValueError):
-                continue
-            if expense_data["amount"] > max_value:
-                is_flagged = True
-                flag_reason = f"Amount exceeds maximum of {max_value}"
-                is_approved = False if policy.policy_type == "hard" else None
-
-        elif rule_type == "merchant_blacklist" and expense_data["merchant"].lower() in [m.lower() for m in rule_value]:
-            is_flagged = True
-            flag_reason = f"Merchant is blacklisted"
-            is_approved = False if policy.policy_type == "hard" else None
-
-        # Add more rule types as needed
-
-        if is_flagged and policy.policy_type == "hard":
+        last_id = rows[-1].id
+        stats["chunks"] += 1
+        stats["scanned"] += len(rows)
+
+        # One set-based UPDATE per distinct outcome instead of one per row. Approval follows the same rule as
+        # create_expense: a hard violation is never approved, otherwise an expense is approved unless flagged.
+        for (is_flagged, flag_reason, is_hard), expense_ids in reaudit_changes(db, rows).items():
+            is_approved = False if is_hard else not is_flagged
+            bulk_update_expense_values(
+                db, expense_ids, {"is_flagged": is_flagged, "flag_reason": flag_reason, "is_approved": is_approved}, return_rows=False
+            )
+            stats["changed"] += len(expense_ids)
+            stats["flagged" if is_flagged else "cleared"] += len(expense_ids)
+
+        if len(rows) < chunk_size:
             break
 
-    return is_flagged, flag_reason, is_approved
\ No newline at end of file
+    return stats
+
+def reaudit_changes(db: Session, rows):
+    count = len(rows)
+    ids = np.fromiter((row.id for row in rows), dtype=np.int64, count=count)
+    company_ids = np.fromiter((-1 if row.company_id is None else row.company_id for row in rows), dtype=np.int64, count=count)
+    amounts = np.fromiter((np.nan if row.amount is None else row.amount for row in rows), dtype=np.float64, count=count)
+    categories = np.array([enum_value(row.category) or "" for row in rows], dtype=str)
+    merchants = np.array([row.merchant or "" for row in rows], dtype=str)
+    current_flagged = np.fromiter((bool(row.is_flagged) for row in rows), dtype=bool, count=count)
+    current_reasons = np.array([row.flag_reason or "" for row in rows], dtype=str)
+    current_approved = np.fromiter((bool(row.is_approved) for row in rows), dtype=bool, count=count)
+
+    # Flags a reviewer set by hand (with their own reason) are left alone
+    reviewer_flagged = current_flagged & ~is_policy_reason(current_reasons)
+    anomaly_flagged = is_anomaly_reason(current_reasons)
+
+    changes = defaultdict(list)
+    for company_value in np.unique(company_ids):
+        expense_company_id = None if company_value < 0 else int(company_value)
+        in_company = company_ids == company_value
+
+        policies = get_compiled_policies(db, expense_company_id)
+        outcome, outcomes = policies.evaluate_many(expense_company_id, amounts[in_company], categories[in_company], merchants[in_company])
+
+        reasons = np.array([""] + [reason for reason, _ in outcomes], dtype=str)[outcome + 1]
+        hard = np.array([False] + [is_hard for _, is_hard in outcomes], dtype=bool)[outcome + 1]
+        # A reviewer may approve a soft flag, but an approved expense that now breaks a hard rule is rewritten
+        changed = ((outcome >= 0) != current_flagged[in_company]) | (reasons != current_reasons[in_company]) | (hard & current_approved[in_company])
+        changed &= ~reviewer_flagged[in_company]
+
+        # Anomaly flags were scored against the stats at write time and cannot be re-scored here. They stand
+        # while the category still has an anomaly rule, unless a hard rule now fires; without one they are cleared.
+        changed &= ~(anomaly_flagged[in_company] & policies.anomaly_rule_mask(expense_company_id, categories[in_company]) & ~hard)
+
+        company_expense_ids = ids[in_company]
+        for code in np.unique(outcome[changed]):
+            key = (True, *outcomes[code]) if code >= 0 else (False, None, False)
+            changes[key].extend(company_expense_ids[changed & (outcome == code)].tolist())
+
+    return changes
\ No newline at end of file
@@ -0,0 +1,206 @@
+from collections import defaultdict
+from collections.abc import Mapping
+from datetime import date
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from app.models import Expense, ExpenseRollup
+from app.utils.policy_engine import enum_value, normalize_merchant
+
+# Every expense is counted once per dimension, so summing any one dimension gives the company totals
+ROLLUP_DIMENSIONS = ("category", "user", "merchant")
+ROLLUP_FIELDS = ("company_id", "user_id", "merchant", "amount", "date", "category", "is_flagged")
+ROLLUP_COUNTERS = ("expense_count", "total_amount", "flagged_count", "flagged_amount")
+ROLLUP_KEY = ("company_id", "dimension", "month", "dim_key")
+ROLLUP_WRITE_CHUNK_SIZE = 1000
+ROLLUP_REBUILD_BATCH_SIZE = 5000
+UNKNOWN_KEY = "unknown"
+
+def rollup_snapshot(expense):
+    # Works for ORM objects, result rows and the plain dicts the CSV import inserts
+    if isinstance(expense, Mapping):
+        return {field: expense.get(field) for field in ROLLUP_FIELDS}
+    return {field: getattr(expense, field, None) for field in ROLLUP_FIELDS}
+
+def month_of(value):
+    return date(value.year, value.month, 1)
+
+def dimension_keys(snapshot):
+    return (
+        ("category", enum_value(snapshot["category"]) or UNKNOWN_KEY),
+        ("user", str(snapshot["user_id"]) if snapshot["user_id"] is not None else UNKNOWN_KEY),
+        ("merchant", normalize_merchant(snapshot["merchant"]) or UNKNOWN_KEY),
+    )
+
+def new_rollup_deltas():
+    return defaultdict(lambda: [0, 0.0, 0, 0.0])
+
+def add_rollup_deltas(deltas, snapshots, sign: int = 1):
+    for snapshot in snapshots:
+        # Expenses without a company or a date cannot be bucketed and never show up in analytics
+        if snapshot["company_id"] is None or snapshot["date"] is None:
+            continue
+
+        month = month_of(snapshot["date"])
+        amount = float(snapshot["amount"] or 0)
+        flagged = bool(snapshot["is_flagged"])
+
+        for dimension, key in dimension_keys(snapshot):
+            delta = deltas[(snapshot["company_id"], dimension, month, key)]
+            delta[0] += sign
+            delta[1] += sign * amount
+            if flagged:
+                delta[2] += sign
+                delta[3] += sign * amount
+
+    return deltas
+
+def record_expense_rollups(db: Session, added=(), removed=()):
+    # Runs inside the caller's transaction and does not commit, so rollups and expenses change together
+    deltas = new_rollup_deltas()
+    add_rollup_deltas(deltas, [rollup_snapshot(expense) for expense in removed], sign=-1)
+    add_rollup_deltas(deltas, [rollup_snapshot(expense) for expense in added])
+    apply_rollup_deltas(db, deltas)
+
+def apply_rollup_deltas(db: Session, deltas):
+    # Sorted so concurrent writers lock rollup rows in the same order instead of deadlocking
+    rows = [
+        dict(zip(ROLLUP_KEY, key), **dict(zip(ROLLUP_COUNTERS, delta)))
+        for key, delta in sorted(deltas.items())
+        if delta[0] or delta[2] or delta[1] or delta[3]
+    ]
+    if not rows:
+        return
+
+    statement = upsert_statement(db)
+    for start in range(0, len(rows), ROLLUP_WRITE_CHUNK_SIZE):
+        chunk = rows[start:start + ROLLUP_WRITE_CHUNK_SIZE]
+        if statement is not None:
+            db.execute(statement, chunk)
+        else:
+            for row in chunk:
+                increment_rollup(db, row)
+
+def upsert_statement(db: Session):
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        statement = postgresql.insert(ExpenseRollup)
+    elif dialect == "sqlite":
+        statement = sqlite.insert(ExpenseRollup)
+    else:
+        return None
+
+    table = ExpenseRollup.__table__
+    increments = {counter: table.c[counter] + statement.excluded[counter] for counter in ROLLUP_COUNTERS}
+    return statement.on_conflict_do_update(index_elements=list(ROLLUP_KEY), set_={**increments, "updated_at": func.now()})
+
+def increment_rollup(db: Session, row):
+    table = ExpenseRollup.__table__
+    statement = (
+        update(table)
+        .where(*[table.c[column] == row[column] for column in ROLLUP_KEY])
+        .values(**{counter: table.c[counter] + row[counter] for counter in ROLLUP_COUNTERS})
+    )
+    if not db.execute(statement).rowcount:
+        db.execute(table.insert().values(**row))
+
+def delete_company_rollups(db: Session, company_id: int):
+    db.execute(delete(ExpenseRollup).where(ExpenseRollup.company_id == company_id))
+
+def rekey_user_rollups(db: Session, user_id: int):
+    # delete_user keeps the user's expenses with no user, and those roll up under UNKNOWN_KEY
+    moved = db.execute(
+        delete(ExpenseRollup)
+        .where(ExpenseRollup.dimension == "user", ExpenseRollup.dim_key == str(user_id))
+        .returning(ExpenseRollup.company_id, ExpenseRollup.month, *[getattr(ExpenseRollup, counter) for counter in ROLLUP_COUNTERS])
+    ).all()
+
+    deltas = new_rollup_deltas()
+    for row in moved:
+        delta = deltas[(row.company_id, "user", row.month, UNKNOWN_KEY)]
+        for position, counter in enumerate(ROLLUP_COUNTERS):
+            delta[position] += getattr(row, counter)
+    apply_rollup_deltas(db, deltas)
+
+def rebuild_rollups(db: Session, company_id: int = None):
+    # Recomputes rollups from the expenses table, for one company or all of them, in one transaction
+    if db.get_bind().dialect.name == "postgresql":
+        # Writers upsert rollups in the same transaction as their expense changes, so holding this lock
+        # until commit means every expense is counted exactly once: either here or by its own writer afterwards
+        db.connection().exec_driver_sql("LOCK TABLE expense_rollups IN EXCLUSIVE MODE")
+
+    statement = delete(ExpenseRollup)
+    query = select(*[getattr(Expense, field) for field in ROLLUP_FIELDS])
+    if company_id is not None:
+        statement = statement.where(ExpenseRollup.company_id == company_id)
+        query = query.where(Expense.company_id == company_id)
+
+    db.execute(statement)
+
+    deltas = new_rollup_deltas()
+    expense_count = 0
+    for row in db.execute(query.execution_options(yield_per=ROLLUP_REBUILD_BATCH_SIZE)):
+        add_rollup_deltas(deltas, [rollup_snapshot(row._mapping)])
+        expense_count += 1
+
+    apply_rollup_deltas(db, deltas)
+    db.commit()
+    return {"expenses": expense_count, "rollups": len(deltas)}
+
+def rollup_query(db: Session, company_id: int, dimension: str, start_date=None, end_date=None):
+    query = db.query(
+        func.sum(ExpenseRollup.expense_count).label("expense_count"),
+        func.sum(ExpenseRollup.total_amount).label("total_amount"),
+        func.sum(ExpenseRollup.flagged_count).label("flagged_count"),
+        func.sum(ExpenseRollup.flagged_amount).label("flagged_amount"),
+    ).filter(ExpenseRollup.company_id == company_id, ExpenseRollup.dimension == dimension)
+
+    # Rollups are monthly, so date filters select whole months
+    if start_date:
+        query = query.filter(ExpenseRollup.month >= month_of(start_date))
+    if end_date:
+        query = query.filter(ExpenseRollup.month <= month_of(end_date))
+
+    return query
+
+def rollup_totals(row):
+    return {
+        "expense_count": int(row.expense_count or 0),
+        "total_amount": round(row.total_amount or 0, 2),
+        "flagged_count": int(row.flagged_count or 0),
+        "flagged_amount": round(row.flagged_amount or 0, 2),
+    }
+
+def get_spend_by(db: Session, company_id: int, dimension: str, start_date=None, end_date=None, limit: int = None):
+    query = (
+        rollup_query(db, company_id, dimension, start_date, end_date)
+        .add_columns(ExpenseRollup.dim_key)
+        .group_by(ExpenseRollup.dim_key)
+        .having(func.sum(ExpenseRollup.expense_count) > 0)
+        .order_by(func.sum(ExpenseRollup.total_amount).desc(), ExpenseRollup.dim_key)
+    )
+    if limit:
+        query = query.limit(limit)
+
+    return [{"key": row.dim_key, **rollup_totals(row)} for row in query.all()]
+
+def get_monthly_spend(db: Session, company_id: int, start_date=None, end_date=None):
+    query = (
+        rollup_query(db, company_id, "category", start_date, end_date)
+        .add_columns(ExpenseRollup.month)
+        .group_by(ExpenseRollup.month)
+        .having(func.sum(ExpenseRollup.expense_count) > 0)
+        .order_by(ExpenseRollup.month)
+    )
+    return [{"month": row.month, **rollup_totals(row)} for row in query.all()]
+
+def get_flagged_ratio(db: Session, company_id: int, start_date=None, end_date=None):
+    totals = rollup_totals(rollup_query(db, company_id, "category", start_date, end_date).one())
+    expense_count = totals["expense_count"]
+    total_amount = totals["total_amount"]
+    return {
+        "company_id": company_id,
+        **totals,
+        "flagged_ratio": round(totals["flagged_count"] / expense_count, 4) if expense_count else 0.0,
+        "flagged_amount_ratio": round(totals["flagged_amount"] / total_amount, 4) if total_amount else 0.0,
+    }
\ No newline at end of file
@@ -0,0 +1,142 @@
+from collections.abc import Mapping
+from sqlalchemy import delete, insert, select, tuple_, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from app.models import Expense, ExpenseStat
+from app.utils.anomaly import ANOMALY_MIN_SAMPLES, RunningStats
+from app.utils.policy_engine import enum_value
+
+# Each expense feeds two rows: its user's stats in its category and its company's stats in its category
+STAT_FIELDS = ("company_id", "user_id", "category", "amount")
+STAT_KEY = ("company_id", "category", "dimension", "dim_key")
+STAT_COLUMNS = (ExpenseStat.id, *(getattr(ExpenseStat, column) for column in STAT_KEY), ExpenseStat.sample_count, ExpenseStat.mean, ExpenseStat.m2, ExpenseStat.quantile_heights, ExpenseStat.quantile_positions)
+STAT_WRITE_CHUNK_SIZE = 1000
+STAT_REBUILD_BATCH_SIZE = 5000
+COMPANY_KEY = "all"
+
+def stat_snapshot(expense):
+    if isinstance(expense, Mapping):
+        return {field: expense.get(field) for field in STAT_FIELDS}
+    return {field: getattr(expense, field, None) for field in STAT_FIELDS}
+
+def stat_keys(snapshot):
+    # Uncategorized (pending) expenses and expenses without a company or amount are not counted
+    category = enum_value(snapshot["category"])
+    if snapshot["company_id"] is None or snapshot["amount"] is None or not isinstance(category, str) or not category:
+        return ()
+
+    keys = [(snapshot["company_id"], category, "company", COMPANY_KEY)]
+    if snapshot["user_id"] is not None:
+        keys.insert(0, (snapshot["company_id"], category, "user", str(snapshot["user_id"])))
+    return keys
+
+def select_stats(db: Session, keys, lock: bool = True):
+    key_columns = [getattr(ExpenseStat, column) for column in STAT_KEY]
+    statement = select(*STAT_COLUMNS).where(tuple_(*key_columns).in_(keys))
+    if lock:
+        # Ordered so concurrent writers lock stats rows in the same order instead of deadlocking
+        statement = statement.order_by(*key_columns).with_for_update()
+
+    return {
+        tuple(getattr(row, column) for column in STAT_KEY): (row.id, RunningStats.from_row(row))
+        for row in db.execute(statement)
+    }
+
+def load_expense_stats(db: Session, expenses, stats=None):
+    # Locks the stats rows the given expenses feed, creating empty ones as needed, and adds them to stats:
+    # a dict of key -> (row id, RunningStats) that apply_expense_stats updates and save_expense_stats writes
+    stats = {} if stats is None else stats
+    keys = sorted({key for expense in expenses for key in stat_keys(stat_snapshot(expense))} - set(stats))
+    if not keys:
+        return stats
+
+    found = select_stats(db, keys)
+    missing = [key for key in keys if key not in found]
+    if missing:
+        insert_stat_rows(db, missing)
+        found.update(select_stats(db, missing))
+
+    stats.update(found)
+    return stats
+
+def insert_stat_rows(db: Session, keys):
+    rows = [dict(zip(STAT_KEY, key), **RunningStats().as_values()) for key in keys]
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        statement = postgresql.insert(ExpenseStat).on_conflict_do_nothing(index_elements=list(STAT_KEY))
+    elif dialect == "sqlite":
+        statement = sqlite.insert(ExpenseStat).on_conflict_do_nothing(index_elements=list(STAT_KEY))
+    else:
+        statement = insert(ExpenseStat)
+    db.execute(statement, rows)
+
+def apply_expense_stats(stats, added=(), removed=()):
+    for expense in removed:
+        snapshot = stat_snapshot(expense)
+        for key in stat_keys(snapshot):
+            stats[key][1].remove(float(snapshot["amount"]))
+
+    for expense in added:
+        snapshot = stat_snapshot(expense)
+        for key in stat_keys(snapshot):
+            stats[key][1].push(float(snapshot["amount"]))
+
+def save_expense_stats(db: Session, stats):
+    rows = [{"id": row_id, **running.as_values()} for row_id, running in stats.values()]
+    for start in range(0, len(rows), STAT_WRITE_CHUNK_SIZE):
+        db.execute(update(ExpenseStat), rows[start:start + STAT_WRITE_CHUNK_SIZE])
+
+def record_expense_stats(db: Session, added=(), removed=(), stats=None):
+    # Runs inside the caller's transaction and does not commit, so stats and expenses change together
+    stats = load_expense_stats(db, [*added, *removed], stats)
+    if stats:
+        apply_expense_stats(stats, added, removed)
+        save_expense_stats(db, stats)
+
+def expense_baseline(stats, expense):
+    # The user's own history in the category once it is long enough to judge by, else the company's
+    for key in stat_keys(stat_snapshot(expense)):
+        entry = stats.get(key)
+        if entry is not None and entry[1].count >= ANOMALY_MIN_SAMPLES:
+            return entry[1]
+    return None
+
+def get_expense_baseline(db: Session, expense):
+    keys = stat_keys(stat_snapshot(expense))
+    return expense_baseline(select_stats(db, keys, lock=False), expense) if keys else None
+
+def delete_company_stats(db: Session, company_id: int):
+    db.execute(delete(ExpenseStat).where(ExpenseStat.company_id == company_id))
+
+def delete_user_stats(db: Session, user_id: int):
+    # Expenses without a user only feed their company's stats, which already count them
+    db.execute(delete(ExpenseStat).where(ExpenseStat.dimension == "user", ExpenseStat.dim_key == str(user_id)))
+
+def rebuild_expense_stats(db: Session, company_id: int = None):
+    # Recomputes stats from the expenses table in id order, for one company or all of them, in one transaction
+    if db.get_bind().dialect.name == "postgresql":
+        # Same reasoning as rebuild_rollups: writers update stats in their own transaction, so every
+        # expense is counted either here or by its writer once this lock is released
+        db.connection().exec_driver_sql("LOCK TABLE expense_stats IN EXCLUSIVE MODE")
+
+    statement = delete(ExpenseStat)
+    query = select(*[getattr(Expense, field) for field in STAT_FIELDS]).order_by(Expense.id)
+    if company_id is not None:
+        statement = statement.where(ExpenseStat.company_id == company_id)
+        query = query.where(Expense.company_id == company_id)
+
+    db.execute(statement)
+
+    stats = {}
+    expense_count = 0
+    for row in db.execute(query.execution_options(yield_per=STAT_REBUILD_BATCH_SIZE)):
+        for key in stat_keys(row._mapping):
+            stats.setdefault(key, RunningStats()).push(float(row.amount))
+        expense_count += 1
+
+    rows = [dict(zip(STAT_KEY, key), **running.as_values()) for key, running in sorted(stats.items())]
+    for start in range(0, len(rows), STAT_WRITE_CHUNK_SIZE):
+        db.execute(insert(ExpenseStat), rows[start:start + STAT_WRITE_CHUNK_SIZE])
+
+    db.commit()
+    return {"expenses": expense_count, "stats": len(rows)}
\ No newline at end of file
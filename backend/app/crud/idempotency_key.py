@@ -0,0 +1,95 @@
+import os
+import time
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import delete, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app.models import IdempotencyKey
+
+IDEMPOTENCY_TTL_SECONDS = int(os.getenv("IDEMPOTENCY_TTL_SECONDS", "86400"))
+IDEMPOTENCY_LOCK_SECONDS = int(os.getenv("IDEMPOTENCY_LOCK_SECONDS", "600"))  # a claim older than this was abandoned
+IDEMPOTENCY_PURGE_SECONDS = 3600
+
+last_purge = 0.0
+
+class IdempotencyKeyInProgressError(Exception):
+    pass
+
+class IdempotencyKeyReusedError(Exception):
+    pass
+
+def as_utc(value):
+    # SQLite hands timestamps back naive; they were written in UTC
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+def claim_idempotency_key(db: Session, scope: str, key: str, request_hash: str):
+    # Returns None when this request now owns the key and should run, or the stored record to replay
+    now = datetime.now(timezone.utc)
+    purge_expired_idempotency_keys(db)
+
+    db.add(IdempotencyKey(scope=scope, key=key, request_hash=request_hash, expires_at=now + timedelta(seconds=IDEMPOTENCY_LOCK_SECONDS)))
+    try:
+        db.commit()
+        return None
+    except IntegrityError:
+        db.rollback()
+
+    record = (
+        db.query(IdempotencyKey)
+        .filter(IdempotencyKey.scope == scope, IdempotencyKey.key == key)
+        .with_for_update()
+        .first()
+    )
+    if record is None:
+        # The holder released it between our insert and this read
+        raise IdempotencyKeyInProgressError("A request with this Idempotency-Key is still being processed")
+
+    if as_utc(record.expires_at) <= now:
+        # Expired keys, and claims left behind by a request that never finished, are taken over
+        record.request_hash = request_hash
+        record.status_code = None
+        record.response_body = None
+        record.response_headers = None
+        record.expires_at = now + timedelta(seconds=IDEMPOTENCY_LOCK_SECONDS)
+        db.commit()
+        return None
+
+    db.commit()
+    if record.request_hash != request_hash:
+        raise IdempotencyKeyReusedError("This Idempotency-Key was already used with a different request")
+    if record.status_code is None:
+        raise IdempotencyKeyInProgressError("A request with this Idempotency-Key is still being processed")
+    return record
+
+def store_idempotent_response(db: Session, scope: str, key: str, status_code: int, body, headers: dict):
+    db.execute(
+        update(IdempotencyKey)
+        .where(IdempotencyKey.scope == scope, IdempotencyKey.key == key)
+        .values(
+            status_code=status_code,
+            response_body=body,
+            response_headers=headers,
+            expires_at=datetime.now(timezone.utc) + timedelta(seconds=IDEMPOTENCY_TTL_SECONDS)
+        )
+    )
+    db.commit()
+
+def release_idempotency_key(db: Session, scope: str, key: str):
+    # The request failed, so a retry with the same key runs it again instead of waiting out the lock
+    db.rollback()
+    db.execute(delete(IdempotencyKey).where(
+        IdempotencyKey.scope == scope,
+        IdempotencyKey.key == key,
+        IdempotencyKey.status_code.is_(None)
+    ))
+    db.commit()
+
+def purge_expired_idempotency_keys(db: Session, force: bool = False):
+    global last_purge
+    if not force and time.monotonic() - last_purge < IDEMPOTENCY_PURGE_SECONDS:
+        return 0
+
+    last_purge = time.monotonic()
+    deleted = db.execute(delete(IdempotencyKey).where(IdempotencyKey.expires_at < datetime.now(timezone.utc))).rowcount
+    db.commit()
+    return deleted
\ No newline at end of file
@@ -0,0 +1,98 @@
+import os
+import uuid
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import and_, func, or_, update
+from sqlalchemy.orm import Session
+from app.models import ImportJob, ImportJobStatus
+
+# A running job whose worker has not committed a chunk for this long is presumed dead and can be claimed again
+IMPORT_LEASE_SECONDS = int(os.getenv("IMPORT_LEASE_SECONDS", "600"))
+
+class ImportJobLeaseLostError(Exception):
+    pass
+
+def create_import_job(db: Session, user_id: int, company_id: int, filename: str, file_path: str, job_id: str = None):
+    db_job = ImportJob(
+        id=job_id or uuid.uuid4().hex,
+        user_id=user_id,
+        company_id=company_id,
+        filename=filename,
+        file_path=file_path,
+        status=ImportJobStatus.QUEUED
+    )
+    db.add(db_job)
+    db.commit()
+    db.refresh(db_job)
+    return db_job
+
+def get_import_job(db: Session, job_id: str):
+    return db.query(ImportJob).filter(ImportJob.id == job_id).first()
+
+def claimable_import_job(now: datetime):
+    return or_(
+        ImportJob.status == ImportJobStatus.QUEUED,
+        and_(
+            ImportJob.status == ImportJobStatus.RUNNING,
+            or_(ImportJob.heartbeat_at.is_(None), ImportJob.heartbeat_at < now - timedelta(seconds=IMPORT_LEASE_SECONDS))
+        )
+    )
+
+def get_claimable_import_job_ids(db: Session):
+    return [
+        job_id
+        for (job_id,) in db.query(ImportJob.id)
+        .filter(claimable_import_job(datetime.now(timezone.utc)))
+        .order_by(ImportJob.created_at)
+    ]
+
+def claim_import_job(db: Session, job_id: str, worker_id: str):
+    # A single conditional UPDATE, so of several processes trying to run the same job only one gets it
+    now = datetime.now(timezone.utc)
+    claimed = db.execute(
+        update(ImportJob)
+        .where(ImportJob.id == job_id, claimable_import_job(now))
+        .values(
+            status=ImportJobStatus.RUNNING,
+            worker_id=worker_id,
+            heartbeat_at=now,
+            started_at=func.coalesce(ImportJob.started_at, now)
+        )
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    db.commit()
+    if not claimed:
+        return None
+    return db.query(ImportJob).filter(ImportJob.id == job_id).populate_existing().first()
+
+def record_import_job_chunk(db: Session, job_id: str, worker_id: str, progress: dict):
+    # Not committed here: process_csv commits it together with the chunk's rows. If another worker has
+    # taken the job over, raising here rolls the chunk back instead of inserting its rows twice.
+    updated = db.execute(
+        update(ImportJob)
+        .where(ImportJob.id == job_id, ImportJob.worker_id == worker_id, ImportJob.status == ImportJobStatus.RUNNING)
+        .values(
+            rows_processed=ImportJob.rows_processed + progress["rows"],
+            rows_inserted=ImportJob.rows_inserted + progress["inserted"],
+            rows_flagged=ImportJob.rows_flagged + progress["flagged"],
+            rows_failed=ImportJob.rows_failed + progress["failed"],
+            rows_duplicate=ImportJob.rows_duplicate + progress["duplicates"],
+            chunks_completed=progress["chunk"],
+            heartbeat_at=datetime.now(timezone.utc)
+        )
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    if not updated:
+        raise ImportJobLeaseLostError(f"Import job {job_id} was claimed by another worker")
+
+def finish_import_job(db: Session, job_id: str, worker_id: str, error: str = None):
+    db.execute(
+        update(ImportJob)
+        .where(ImportJob.id == job_id, ImportJob.worker_id == worker_id, ImportJob.status == ImportJobStatus.RUNNING)
+        .values(
+            status=ImportJobStatus.FAILED if error else ImportJobStatus.COMPLETED,
+            error=error,
+            finished_at=datetime.now(timezone.utc)
+        )
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
\ No newline at end of file
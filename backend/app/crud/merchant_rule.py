@@ -0,0 +1,50 @@
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+from app.models import CategoryEnum, Expense, MerchantRule
+from app.utils.category_cache import normalize_merchant
+from app.utils.classifier import local_classifier
+from app.utils.policy_engine import enum_value
+
+def recategorized_expense_ids(db: Session, company_id: int, expense_ids: list[int], category):
+    # The company's expenses whose category the edit would change; read before the edit is applied
+    category = CategoryEnum(enum_value(category))
+    return [
+        expense_id
+        for (expense_id,) in db.query(Expense.id).filter(
+            Expense.id.in_(expense_ids),
+            Expense.company_id == company_id,
+            or_(Expense.category.is_(None), Expense.category != category)
+        )
+    ]
+
+def confirm_expense_categories(db: Session, company_id: int, expense_ids: list[int], category, source: str = "admin"):
+    # A category set by hand becomes the answer for the company's future expenses from the same merchant
+    category = enum_value(category)
+    merchants = {
+        normalize_merchant(merchant)
+        for (merchant,) in db.query(Expense.merchant).filter(Expense.id.in_(expense_ids), Expense.company_id == company_id).distinct()
+    }
+    merchants.discard("")
+    if not merchants or not category:
+        return {}
+
+    existing = {
+        rule.merchant: rule
+        for rule in db.query(MerchantRule).filter(MerchantRule.company_id == company_id, MerchantRule.merchant.in_(merchants))
+    }
+    for merchant in merchants:
+        rule = existing.get(merchant)
+        if rule is None:
+            db.add(MerchantRule(company_id=company_id, merchant=merchant, category=category, source=source))
+        else:
+            rule.category = category
+            rule.source = source
+
+    db.commit()
+
+    rules = {(company_id, merchant): category for merchant in merchants}
+    local_classifier.add_merchant_rules(rules)
+    return rules
+
+def get_merchant_rules(db: Session, company_id: int):
+    return db.query(MerchantRule).filter(MerchantRule.company_id == company_id).order_by(MerchantRule.merchant).all()
\ No newline at end of file
@@ -1,24 +1,42 @@
+from sqlalchemy import delete, or_
 from sqlalchemy.orm import Session
 from app.models import Policy
-from app.schemas.policy import PolicyCreate, PolicyUpdate
+from app.schemas.policy import PolicyCreate, PolicyResponse, PolicyUpdate
+from app.utils.pagination import paginate
+from app.utils.policy_engine import policy_set_cache
+from app.utils.serialization import response_columns
+
+POLICY_ORDER = (Policy.id,)
+POLICY_RESPONSE_COLUMNS = response_columns(Policy, PolicyResponse)
 
 def create_policy(db: Session, policy: PolicyCreate):
     db_policy = Policy(**policy.dict())
     db.add(db_policy)
     db.commit()
     db.refresh(db_policy)
+    policy_set_cache.invalidate(db_policy.company_id)
     return db_policy
 
-def get_policies(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(Policy).offset(skip).limit(limit).all()
+def get_policies(db: Session, skip: int = 0, limit: int = 100, cursor=None):
+    return paginate(db.query(*POLICY_RESPONSE_COLUMNS), POLICY_ORDER, skip, limit, cursor).all()
+
+def get_company_policies(db: Session, company_id: int):
+    return (
+        db.query(Policy)
+        .filter(or_(Policy.company_id == company_id, Policy.company_id.is_(None)))
+        .order_by(Policy.id)
+        .all()
+    )
+
+def get_compiled_policies(db: Session, company_id: int):
+    return policy_set_cache.get(company_id, lambda: get_company_policies(db, company_id))
 
 def get_policy(db: Session, policy_id: int):
     return db.query(Policy).filter(Policy.id == policy_id).first()
 
-def update_policy(db: Session, policy_id: int, policy_data: dict):
-    db_policy = db.query(Policy).filter(Policy.id == policy_id).first()
-    if not db_policy:
-        return None
+def update_policy(db: Session, db_policy: Policy, policy_data: dict):
+    # Takes the row the caller already loaded, so an update costs one lookup
+    previous_company_id = db_policy.company_id
 
     for field, value in policy_data.items():
         if hasattr(db_policy, field):
@@ -26,13 +44,18 @@ def update_policy(db: Session, policy_id: int, policy_data: dict):
 
     db.commit()
     db.refresh(db_policy)
+    policy_set_cache.invalidate(previous_company_id)
+    if db_policy.company_id != previous_company_id:
+        policy_set_cache.invalidate(db_policy.company_id)
     return db_policy
 
 def delete_policy(db: Session, policy_id: int):
-    db_policy = db.query(Policy).filter(Policy.id == policy_id).first()
-    if not db_policy:
-        return False
+    # Returns the deleted row (its company_id), or None when there was no such policy
+    deleted = db.execute(delete(Policy).where(Policy.id == policy_id).returning(Policy.company_id)).first()
+    if not deleted:
+        db.rollback()
+        return None
 
-    db.delete(db_policy)
     db.commit()
-    return True
\ No newline at end of file
+    policy_set_cache.invalidate(deleted.company_id)
+    return deleted
\ No newline at end of file
@@ -1,17 +1,23 @@
 from firebase_admin import auth
+from sqlalchemy import delete, insert, update
 from sqlalchemy.orm import Session
-from app.models import User
-from app.schemas import UserCreate
+from app.core.auth import identity_cache
+from app.crud.expense_rollup import rekey_user_rollups
+from app.crud.expense_stat import delete_user_stats
+from app.models import Expense, ImportJob, User
+from app.schemas import UserCreate, UserResponse
+from app.utils.pagination import paginate
+
+USER_ORDER = (User.id,)
+USER_COLUMNS = tuple(User.__table__.c)
 
 def create_user(db: Session, user: UserCreate):
-    db_user = User(**user.dict())
-    db.add(db_user)
+    db_user = db.execute(insert(User).values(**user.dict()).returning(*USER_COLUMNS)).first()
     db.commit()
-    db.refresh(db_user)
     return db_user
 
-def get_users(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(User).offset(skip).limit(limit).all()
+def get_users(db: Session, skip: int = 0, limit: int = 100, cursor=None):
+    return paginate(db.query(*USER_COLUMNS), USER_ORDER, skip, limit, cursor).all()
 
 def get_user(db: Session, id: int):
     return db.query(User).filter(User.id == id).first()
@@ -19,29 +25,41 @@ def get_user(db: Session, id: int):
 def get_user_by_firebase_id(db: Session, firebase_id: str):
     return db.query(User).filter(User.firebase_id == firebase_id).first()
 
-def update_user(db: Session, id: int, user_data: dict):
-    db_user = db.query(User).filter(User.id == id).first()
-    if not db_user:
-        return None
+def get_user_identity(db: Session, firebase_id: str):
+    # Cached UserResponse for authenticated requests; update_user and delete_user invalidate it
+    def load():
+        db_user = get_user_by_firebase_id(db, firebase_id)
+        return UserResponse.model_validate(db_user) if db_user else None
+
+    return identity_cache.get(firebase_id, load)
 
-    for field, value in user_data.items():
-        if hasattr(db_user, field):
-            setattr(db_user, field, value)
+def update_user(db: Session, id: int, user_data: dict):
+    values = {field: value for field, value in user_data.items() if hasattr(User, field)}
+    if not values:
+        return db.query(*USER_COLUMNS).filter(User.id == id).first()
 
+    db_user = db.execute(update(User).where(User.id == id).values(**values).returning(*USER_COLUMNS)).first()
     db.commit()
-    db.refresh(db_user)
+    if db_user:
+        identity_cache.invalidate(db_user.firebase_id)
     return db_user
 
-def delete_user(db: Session, id: int, firebase_id: str):
+def delete_user(db: Session, id: int):
+    rekey_user_rollups(db, id)
+    delete_user_stats(db, id)
+    db.execute(update(Expense).where(Expense.user_id == id).values(user_id=None))
+    db.execute(update(ImportJob).where(ImportJob.user_id == id).values(user_id=None))
+    deleted = db.execute(delete(User).where(User.id == id).returning(User.firebase_id)).first()
+    if not deleted:
+        db.rollback()
+        return False
+
+    db.commit()
+    identity_cache.invalidate(deleted.firebase_id)
+
     try:
-        auth.delete_user(firebase_id)
+        auth.delete_user(deleted.firebase_id)
     except Exception as e:
         pass
 
-    db_user = db.query(User).filter(User.id == id).first()
-    if not db_user:
-        return False
-
-    db.delete(db_user)
-    db.commit()
     return True
\ No newline at end of file
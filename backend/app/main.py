@@ -1,11 +1,15 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 import firebase_admin
 from firebase_admin import credentials
 import os
 from dotenv import load_dotenv
 from app.core import Base, engine
-from app.api import company_router, expense_router, policy_router, user_router
+from app.api import analytics_router, company_router, expense_router, import_router, metrics_router, policy_router, user_router
+from app.utils.ai_client import ai_client
+from app.utils.pagination import InvalidCursorError, NEXT_CURSOR_HEADER
+from app.workers import resume_categorizations, resume_imports, start_import_watcher
 
 load_dotenv()
 
@@ -31,16 +35,31 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER],
 )
 
+app.include_router(analytics_router, prefix="/api", tags=["Analytics"])
 app.include_router(company_router, prefix="/api", tags=["Companies"])
 app.include_router(expense_router, prefix="/api", tags=["Expenses"])
+app.include_router(import_router, prefix="/api", tags=["Imports"])
+app.include_router(metrics_router, prefix="/api", tags=["Metrics"])
 app.include_router(policy_router, prefix="/api", tags=["Policies"])
 app.include_router(user_router, prefix="/api", tags=["Users"])
 
+@app.exception_handler(InvalidCursorError)
+async def invalid_cursor_handler(request: Request, exc: InvalidCursorError):
+    return JSONResponse(status_code=400, content={"detail": str(exc)})
+
 @app.on_event("startup")
 def on_startup():
     Base.metadata.create_all(bind=engine)
+    resume_imports()
+    start_import_watcher()
+    resume_categorizations()
+
+@app.on_event("shutdown")
+def on_shutdown():
+    ai_client.close()
 
 @app.get("/")
 async def read_root():
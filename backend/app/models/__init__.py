@@ -1,4 +1,10 @@
 from .company import Company
-from .expense import Expense, CategoryEnum
+from .expense import Expense, CategoryEnum, CategorizationStatus
 from .policy import Policy, PolicyType
-from .user import User
\ No newline at end of file
+from .user import User
+from .category_cache import CategoryCacheEntry
+from .import_job import ImportJob, ImportJobStatus
+from .expense_rollup import ExpenseRollup
+from .merchant_rule import MerchantRule
+from .idempotency_key import IdempotencyKey
+from .expense_stat import ExpenseStat
\ No newline at end of file
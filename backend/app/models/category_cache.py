@@ -0,0 +1,15 @@
+from sqlalchemy import Column, String, Integer, DateTime, Enum
+from sqlalchemy.sql import func
+from app.models.expense import CategoryEnum
+from app.core import Base
+
+class CategoryCacheEntry(Base):
+    __tablename__ = "category_cache"
+
+    id = Column(Integer, primary_key=True, index=True)
+    key = Column(String, unique=True, index=True)  # sha256 of the normalized merchant + description tokens
+    merchant = Column(String)  # normalized merchant, kept for debugging and manual cleanup
+    category = Column(Enum(CategoryEnum))
+    expires_at = Column(DateTime(timezone=True), index=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Integer, Float, DateTime, Boolean, ForeignKey, Enum, Text
+from sqlalchemy import Column, String, Integer, Float, DateTime, Boolean, ForeignKey, Enum, Text, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 import enum
@@ -13,6 +13,11 @@ class CategoryEnum(str, enum.Enum):
     SUPPLIES = "supplies"
     OTHER = "other"
 
+class CategorizationStatus(str, enum.Enum):
+    PENDING = "pending"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
 class Expense(Base):
     __tablename__ = "expenses"
 
@@ -29,8 +34,27 @@ class Expense(Base):
     is_approved = Column(Boolean, default=False)
     is_flagged = Column(Boolean, default=False)
     flag_reason = Column(String, nullable=True)
+    fingerprint = Column(String(32), nullable=True)  # see app/utils/duplicates.py
+    categorization_status = Column(Enum(CategorizationStatus), default=CategorizationStatus.COMPLETED, server_default=CategorizationStatus.COMPLETED.name)
+    categorization_claimed_at = Column(DateTime(timezone=True), nullable=True)  # lease of the worker categorizing it
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
     company = relationship("Company", back_populates="expenses")
-    user = relationship("User", back_populates="expenses")
\ No newline at end of file
+    user = relationship("User", back_populates="expenses")
+
+    # Matches the (date, id) ordering used by every expense listing; see scripts/benchmark_indexes.py
+    __table_args__ = (
+        Index("ix_expenses_date_id", "date", "id"),
+        Index("ix_expenses_company_id_date_id", "company_id", "date", "id"),
+        Index("ix_expenses_user_id_date_id", "user_id", "date", "id"),
+        Index("ix_expenses_user_id_fingerprint", "user_id", "fingerprint"),
+        Index("ix_expenses_flagged_date", "date", "id", postgresql_where=is_flagged.is_(True), sqlite_where=is_flagged.is_(True)),
+        Index("ix_expenses_flagged_user_id_date_id", "user_id", "date", "id", postgresql_where=is_flagged.is_(True), sqlite_where=is_flagged.is_(True)),
+        Index(
+            "ix_expenses_categorization_pending",
+            "id",
+            postgresql_where=categorization_status == CategorizationStatus.PENDING,
+            sqlite_where=categorization_status == CategorizationStatus.PENDING
+        ),
+    )
\ No newline at end of file
@@ -0,0 +1,22 @@
+from sqlalchemy import Column, String, Integer, Float, Date, DateTime, ForeignKey, UniqueConstraint
+from sqlalchemy.sql import func
+from app.core import Base
+
+class ExpenseRollup(Base):
+    __tablename__ = "expense_rollups"
+
+    id = Column(Integer, primary_key=True, index=True)
+    company_id = Column(Integer, ForeignKey("companies.id"), nullable=False)
+    dimension = Column(String, nullable=False)  # "category", "user" or "merchant"
+    dim_key = Column(String, nullable=False)  # category value, user id or normalized merchant
+    month = Column(Date, nullable=False)  # first day of the month the expenses are dated in
+    expense_count = Column(Integer, nullable=False, default=0)
+    total_amount = Column(Float, nullable=False, default=0)
+    flagged_count = Column(Integer, nullable=False, default=0)
+    flagged_amount = Column(Float, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    # Doubles as the upsert conflict target and the index every analytics query starts from
+    __table_args__ = (
+        UniqueConstraint("company_id", "dimension", "month", "dim_key", name="uq_expense_rollups_company_dimension_month_key"),
+    )
\ No newline at end of file
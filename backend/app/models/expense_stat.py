@@ -0,0 +1,22 @@
+from sqlalchemy import Column, String, Integer, Float, DateTime, JSON, ForeignKey, UniqueConstraint
+from sqlalchemy.sql import func
+from app.core import Base
+
+class ExpenseStat(Base):
+    __tablename__ = "expense_stats"
+
+    id = Column(Integer, primary_key=True, index=True)
+    company_id = Column(Integer, ForeignKey("companies.id"), nullable=False)
+    dimension = Column(String, nullable=False)  # "user" or "company"
+    dim_key = Column(String, nullable=False)  # user id, or "all" for the whole company
+    category = Column(String, nullable=False)
+    sample_count = Column(Integer, nullable=False, default=0)
+    mean = Column(Float, nullable=False, default=0)
+    m2 = Column(Float, nullable=False, default=0)  # sum of squared deviations from the mean (Welford)
+    quantile_heights = Column(JSON, nullable=False, default=list)  # P² marker heights
+    quantile_positions = Column(JSON, nullable=False, default=list)  # P² marker positions
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    __table_args__ = (
+        UniqueConstraint("company_id", "category", "dimension", "dim_key", name="uq_expense_stats_company_category_dimension_key"),
+    )
\ No newline at end of file
@@ -0,0 +1,20 @@
+from sqlalchemy import Column, String, Integer, DateTime, JSON, UniqueConstraint
+from sqlalchemy.sql import func
+from app.core import Base
+
+class IdempotencyKey(Base):
+    __tablename__ = "idempotency_keys"
+
+    id = Column(Integer, primary_key=True, index=True)
+    scope = Column(String, nullable=False)  # route and user the key was sent for
+    key = Column(String, nullable=False)
+    request_hash = Column(String(64), nullable=False)
+    status_code = Column(Integer, nullable=True)  # NULL while the first request is still running
+    response_body = Column(JSON, nullable=True)
+    response_headers = Column(JSON, nullable=True)
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        UniqueConstraint("scope", "key", name="uq_idempotency_keys_scope_key"),
+    )
\ No newline at end of file
@@ -0,0 +1,36 @@
+from sqlalchemy import Column, String, Integer, DateTime, ForeignKey, Enum
+from sqlalchemy.sql import func
+from sqlalchemy.orm import relationship
+from app.core import Base
+import enum
+
+class ImportJobStatus(str, enum.Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+class ImportJob(Base):
+    __tablename__ = "import_jobs"
+
+    id = Column(String, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"))
+    company_id = Column(Integer, ForeignKey("companies.id"))
+    filename = Column(String)
+    file_path = Column(String)  # spooled copy of the upload, removed once the job finishes
+    status = Column(Enum(ImportJobStatus), default=ImportJobStatus.QUEUED, index=True)
+    rows_processed = Column(Integer, default=0)  # CSV rows consumed by committed chunks; a resumed job skips these
+    rows_inserted = Column(Integer, default=0)
+    rows_flagged = Column(Integer, default=0)
+    rows_failed = Column(Integer, default=0)
+    rows_duplicate = Column(Integer, default=0)  # skipped because the user already had the same expense
+    chunks_completed = Column(Integer, default=0)
+    error = Column(String, nullable=True)
+    worker_id = Column(String, nullable=True)  # process running the job
+    heartbeat_at = Column(DateTime(timezone=True), nullable=True)  # last claim or committed chunk; see IMPORT_LEASE_SECONDS
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
+    user = relationship("User")
@@ -0,0 +1,19 @@
+from sqlalchemy import Column, String, Integer, DateTime, Enum, ForeignKey, UniqueConstraint
+from sqlalchemy.sql import func
+from app.models.expense import CategoryEnum
+from app.core import Base
+
+class MerchantRule(Base):
+    __tablename__ = "merchant_rules"
+
+    id = Column(Integer, primary_key=True, index=True)
+    company_id = Column(Integer, ForeignKey("companies.id"), nullable=False)  # rules only categorize this company's expenses
+    merchant = Column(String, index=True)  # normalized the same way as category cache keys
+    category = Column(Enum(CategoryEnum))
+    source = Column(String, default="admin")  # who confirmed the category
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
+    __table_args__ = (
+        UniqueConstraint("company_id", "merchant", name="uq_merchant_rules_company_merchant"),
+    )
\ No newline at end of file
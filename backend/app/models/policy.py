@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Integer, DateTime, Enum, JSON, ForeignKey
+from sqlalchemy import Column, String, Integer, DateTime, Enum, JSON, ForeignKey, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 import enum
@@ -23,4 +23,8 @@ class Policy(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
-    company = relationship("Company", back_populates="policies")
\ No newline at end of file
+    company = relationship("Company", back_populates="policies")
+
+    __table_args__ = (
+        Index("ix_policies_company_id_category", "company_id", "category"),
+    )
\ No newline at end of file
@@ -1,3 +1,4 @@
 from .company import CompanyCreate, CompanyUpdate, CompanyResponse
 from .expense import ExpenseCreate, ExpenseUpdate, ExpenseResponse
-from .user import UserCreate, UserUpdate, UserResponse
\ No newline at end of file
+from .user import UserCreate, UserUpdate, UserResponse
+from .import_job import ImportJobResponse
\ No newline at end of file
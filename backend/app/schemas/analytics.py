@@ -0,0 +1,19 @@
+from pydantic import BaseModel
+from datetime import date
+
+class SpendTotals(BaseModel):
+    expense_count: int = 0
+    total_amount: float = 0.0
+    flagged_count: int = 0
+    flagged_amount: float = 0.0
+
+class SpendBucket(SpendTotals):
+    key: str  # category value, user id or normalized merchant name
+
+class MonthlySpend(SpendTotals):
+    month: date
+
+class FlaggedRatioResponse(SpendTotals):
+    company_id: int
+    flagged_ratio: float = 0.0
+    flagged_amount_ratio: float = 0.0
\ No newline at end of file
@@ -12,6 +12,16 @@ class CategoryEnum(str, Enum):
     SUPPLIES = "supplies"
     OTHER = "other"
 
+class CategorizationStatus(str, Enum):
+    PENDING = "pending"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+class ExportFormat(str, Enum):
+    CSV = "csv"
+    NDJSON = "ndjson"
+    PARQUET = "parquet"
+
 class ExpenseBase(BaseModel):
     merchant: str
     amount: float
@@ -42,19 +52,63 @@ class ExpenseBulkUpdate(BaseModel):
     category: Optional[CategoryEnum] = None
     is_approved: Optional[bool] = None
 
+class ExpenseBulkReview(BaseModel):
+    ids: List[int]
+    is_approved: Optional[bool] = None
+    is_flagged: Optional[bool] = None
+    flag_reason: Optional[str] = None
+
+class ExpenseBulkUpdateResult(BaseModel):
+    updated: int
+
+class ExpenseReauditResult(BaseModel):
+    scanned: int
+    changed: int
+    flagged: int
+    cleared: int
+    chunks: int
+
 class ExpenseResponse(ExpenseBase):
     id: int
     user_id: int
     is_approved: bool
     is_flagged: bool
     flag_reason: Optional[str] = None
+    categorization_status: Optional[CategorizationStatus] = None
     created_at: datetime
     updated_at: Optional[datetime] = None
 
     class Config:
         from_attributes = True
 
+class ExpenseCategorizationResponse(BaseModel):
+    id: int
+    categorization_status: Optional[CategorizationStatus] = None
+    category: Optional[CategoryEnum] = None
+    is_approved: bool
+    is_flagged: bool
+    flag_reason: Optional[str] = None
+
+    class Config:
+        from_attributes = True
+
+class CSVChunkProgress(BaseModel):
+    chunk: int
+    rows: int
+    inserted: int
+    flagged: int
+    failed: int
+    duplicates: int = 0
+
+class CSVRowError(BaseModel):
+    row: int
+    error: str
+
 class CSVUploadResponse(BaseModel):
     total_processed: int
     successful: int
-    flagged: int
\ No newline at end of file
+    flagged: int
+    failed: int = 0
+    duplicates: int = 0
+    chunks: List[CSVChunkProgress] = []
+    errors: List[CSVRowError] = []
\ No newline at end of file
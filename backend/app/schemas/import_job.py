@@ -0,0 +1,44 @@
+from pydantic import BaseModel, computed_field
+from datetime import datetime, timezone
+from typing import Optional
+from enum import Enum
+
+class ImportJobStatus(str, Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+class ImportJobResponse(BaseModel):
+    id: str
+    user_id: Optional[int] = None
+    company_id: Optional[int] = None
+    filename: Optional[str] = None
+    status: ImportJobStatus
+    rows_processed: int = 0
+    rows_inserted: int = 0
+    rows_flagged: int = 0
+    rows_failed: int = 0
+    rows_duplicate: int = 0
+    chunks_completed: int = 0
+    error: Optional[str] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    created_at: Optional[datetime] = None
+
+    @computed_field
+    @property
+    def rows_per_second(self) -> float:
+        if not self.started_at:
+            return 0.0
+
+        started_at = self.started_at if self.started_at.tzinfo else self.started_at.replace(tzinfo=timezone.utc)
+        finished_at = self.finished_at or datetime.now(timezone.utc)
+        if not finished_at.tzinfo:
+            finished_at = finished_at.replace(tzinfo=timezone.utc)
+
+        elapsed = (finished_at - started_at).total_seconds()
+        return round(self.rows_processed / elapsed, 2) if elapsed > 0 else 0.0
+
+    class Config:
+        from_attributes = True
@@ -15,6 +15,7 @@ class PolicyBase(BaseModel):
     rule_type: str
     rule_value: Any
     policy_type: PolicyType
+    company_id: Optional[int] = None
 
 class PolicyCreate(PolicyBase):
     pass
@@ -26,6 +27,7 @@ class PolicyUpdate(BaseModel):
     rule_type: Optional[str] = None
     rule_value: Optional[Any] = None
     policy_type: Optional[PolicyType] = None
+    company_id: Optional[int] = None
 
 class PolicyResponse(PolicyBase):
     id: int
@@ -1,40 +1,149 @@
 import os
-import openai
+import re
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
-from app.core import categorize_expense_prompt
+from app.core import categorize_expense_prompt, categorize_expenses_batch_prompt
+from app.utils.ai_client import AIUnavailableError, ai_client
+from app.utils.category_cache import category_cache, cache_key
+from app.utils.classifier import local_classifier
 
 load_dotenv()
 
-openai.api_key = os.getenv("OPENAPI_KEY")
+AI_BATCH_SIZE = int(os.getenv("AI_BATCH_SIZE", "25"))
+AI_MAX_CONCURRENCY = int(os.getenv("AI_MAX_CONCURRENCY", "4"))
 
-def categorize_expense(expense_data):
+VALID_CATEGORIES = ["general", "travel", "food", "lodging", "transportation", "supplies", "other"]
+
+BATCH_LINE_PATTERN = re.compile(r"^\s*(\d+)\s*[:.)-]\s*([a-z]+)\s*$")
+
+def request_category(expense_data):
     prompt = categorize_expense_prompt(expense_data)
 
     try:
-        response = openai.chat.completions.create(
-            model="gpt-5-nano",
-            messages=[
-                {
-                "role": "system",
-                 "content": "You are an expense categorization assistant."
-                },
-                {"role": "user",
-                 "content": prompt
-                 }
-            ],
-            max_tokens=10,
-            temperature=0.1
-        )
-
-        category = response.choices[0].message.content.strip().lower()
-
-        # Ensure we only return valid categories - hallucination protection
-        valid_categories = ["general", "travel", "food", "lodging", "transportation", "supplies", "other"]
-        if category not in valid_categories:
-            return "general"
+        category = ai_client.complete(prompt, max_tokens=10).strip().lower()
+    except AIUnavailableError as e:
+        print(f"Error categorizing expense: {e}")
+        return None
+
+    # Ensure we only return valid categories - hallucination protection
+    if category not in VALID_CATEGORIES:
+        return None
 
+    return category
+
+def fallback_category(expense_data):
+    # The LLM failed or is switched off by the circuit breaker; the local model's best guess beats a blanket "general"
+    return local_classifier.best_guess(expense_data) or "general"
+
+def categorize_expense(expense_data):
+    # Merchant rules and keywords first, then earlier model answers, then the local model; the LLM only
+    # sees expenses none of those are confident about
+    category = local_classifier.match_rules(expense_data)
+    if category:
         return category
 
-    except Exception as e:
-        print(f"Error categorizing expense: {e}")
-        return "general"
\ No newline at end of file
+    cached = category_cache.get(expense_data)
+    if cached:
+        return cached
+
+    category, _ = local_classifier.predict(expense_data)
+    if category:
+        return category
+
+    category = request_category(expense_data)
+    if category is None:
+        return fallback_category(expense_data)
+
+    category_cache.set(expense_data, category)
+    return category
+
+def parse_batch_categories(content, batch_length):
+    categories = [None] * batch_length
+
+    for line in content.lower().splitlines():
+        match = BATCH_LINE_PATTERN.match(line)
+        if not match:
+            continue
+
+        index = int(match.group(1)) - 1
+        category = match.group(2)
+        if 0 <= index < batch_length and category in VALID_CATEGORIES:
+            categories[index] = category
+
+    return categories
+
+def categorize_expense_batch(expenses_data):
+    prompt = categorize_expenses_batch_prompt(expenses_data)
+
+    try:
+        content = ai_client.complete(prompt, max_tokens=8 * len(expenses_data) + 10)
+    except AIUnavailableError as e:
+        print(f"Error categorizing expense batch: {e}")
+        return [None] * len(expenses_data)
+
+    categories = parse_batch_categories(content, len(expenses_data))
+
+    # Rows the model skipped or mislabeled are retried one at a time
+    return [
+        category if category else request_category(expense_data)
+        for expense_data, category in zip(expenses_data, categories)
+    ]
+
+def categorize_expenses(expenses_data, batch_size=None, max_concurrency=None):
+    batch_size = batch_size or AI_BATCH_SIZE
+    max_concurrency = max_concurrency or AI_MAX_CONCURRENCY
+
+    expenses_data = list(expenses_data)
+    if not expenses_data:
+        return []
+
+    keys = [cache_key(expense_data) for expense_data in expenses_data]
+
+    # Same tiers as categorize_expense, applied once per distinct cache key
+    categories_by_key = {}
+    unmatched = {}
+    for key, expense_data in zip(keys, expenses_data):
+        if key in categories_by_key or key in unmatched:
+            continue
+        category = local_classifier.match_rules(expense_data)
+        if category:
+            categories_by_key[key] = category
+        else:
+            unmatched[key] = expense_data
+
+    if unmatched:
+        cached = category_cache.get_many(list(unmatched.values()))
+        categories_by_key.update((key, category) for key, category in zip(unmatched.keys(), cached) if category)
+
+    # Repeat merchants within one upload only need to be asked about once
+    uncached = {}
+    for key, expense_data in unmatched.items():
+        if key in categories_by_key:
+            continue
+        category, _ = local_classifier.predict(expense_data)
+        if category:
+            categories_by_key[key] = category
+        else:
+            uncached[key] = expense_data
+
+    if uncached:
+        uncached_keys = list(uncached.keys())
+        uncached_rows = list(uncached.values())
+        batches = [uncached_rows[i:i + batch_size] for i in range(0, len(uncached_rows), batch_size)]
+
+        with ThreadPoolExecutor(max_workers=min(max_concurrency, len(batches))) as executor:
+            results = executor.map(categorize_expense_batch, batches)
+
+        categories = [category for batch_categories in results for category in batch_categories]
+
+        category_cache.set_many([
+            (expense_data, category)
+            for expense_data, category in zip(uncached_rows, categories)
+            if category
+        ])
+        categories_by_key.update(zip(uncached_keys, categories))
+
+    return [
+        categories_by_key.get(key) or fallback_category(expense_data)
+        for key, expense_data in zip(keys, expenses_data)
+    ]
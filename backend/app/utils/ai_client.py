@@ -0,0 +1,198 @@
+import asyncio
+import os
+import random
+import threading
+import time
+from collections import deque
+import httpx
+import openai
+from openai import AsyncOpenAI
+from dotenv import load_dotenv
+
+load_dotenv()
+
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL") or None  # point at a stub server in development
+AI_MODEL = os.getenv("AI_MODEL", "gpt-5-nano")
+AI_TIMEOUT_SECONDS = float(os.getenv("AI_TIMEOUT_SECONDS", "10"))
+AI_CONNECT_TIMEOUT_SECONDS = float(os.getenv("AI_CONNECT_TIMEOUT_SECONDS", "3"))
+AI_DEADLINE_SECONDS = float(os.getenv("AI_DEADLINE_SECONDS", "20"))
+AI_MAX_RETRIES = int(os.getenv("AI_MAX_RETRIES", "2"))
+AI_RETRY_BASE_DELAY = float(os.getenv("AI_RETRY_BASE_DELAY", "0.25"))
+AI_RETRY_MAX_DELAY = float(os.getenv("AI_RETRY_MAX_DELAY", "4"))
+AI_MAX_CONNECTIONS = int(os.getenv("AI_MAX_CONNECTIONS", "20"))
+AI_BREAKER_FAILURE_THRESHOLD = int(os.getenv("AI_BREAKER_FAILURE_THRESHOLD", "5"))
+AI_BREAKER_RESET_SECONDS = float(os.getenv("AI_BREAKER_RESET_SECONDS", "30"))
+
+SYSTEM_PROMPT = "You are an expense categorization assistant."
+
+# Worth another attempt: the request may succeed if sent again a little later
+RETRYABLE_ERRORS = (openai.APITimeoutError, openai.APIConnectionError, openai.RateLimitError, openai.InternalServerError)
+
+class AIUnavailableError(Exception):
+    pass
+
+# Closed: calls go through. Open: calls fail immediately until reset_seconds pass.
+# Half open: a single probe call decides whether to close again or stay open.
+class CircuitBreaker:
+    def __init__(self, failure_threshold=AI_BREAKER_FAILURE_THRESHOLD, reset_seconds=AI_BREAKER_RESET_SECONDS):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.state == "closed":
+                return True
+
+            if self.state == "open" and time.monotonic() - self.opened_at >= self.reset_seconds:
+                self.state = "half_open"
+
+            if self.state == "half_open" and not self._probing:
+                self._probing = True
+                return True
+
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = "closed"
+            self.failures = 0
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == "half_open" or self.failures >= self.failure_threshold:
+                self.state = "open"
+                self.opened_at = time.monotonic()
+            self._probing = False
+
+class AIClient:
+    def __init__(self, breaker=None):
+        self.breaker = breaker or CircuitBreaker()
+        self._client = None
+        self._loop = None
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=1000)
+        self._counters = {"calls": 0, "successes": 0, "failures": 0, "retries": 0, "timeouts": 0, "short_circuited": 0}
+
+    def _count(self, name, amount=1):
+        with self._lock:
+            self._counters[name] += amount
+
+    def stats(self):
+        with self._lock:
+            counters = dict(self._counters)
+            latencies = sorted(self._latencies)
+
+        counters["error_rate"] = counters["failures"] / counters["calls"] if counters["calls"] else 0.0
+        counters["breaker_state"] = self.breaker.state
+        if latencies:
+            counters["latency_ms"] = {
+                "p50": round(latencies[len(latencies) // 2] * 1000, 1),
+                "p95": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000, 1),
+                "max": round(latencies[-1] * 1000, 1),
+            }
+        return counters
+
+    def _event_loop(self):
+        # One long-lived loop owns the AsyncOpenAI client and its pooled connections; sync callers
+        # on request and worker threads hand their calls to it
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(target=self._loop.run_forever, name="ai-client", daemon=True).start()
+            return self._loop
+
+    def _openai(self):
+        if self._client is None:
+            self._client = AsyncOpenAI(
+                api_key=os.getenv("OPENAPI_KEY"),
+                base_url=OPENAI_BASE_URL,
+                max_retries=0,
+                http_client=httpx.AsyncClient(
+                    limits=httpx.Limits(max_connections=AI_MAX_CONNECTIONS, max_keepalive_connections=AI_MAX_CONNECTIONS),
+                    timeout=httpx.Timeout(AI_TIMEOUT_SECONDS, connect=AI_CONNECT_TIMEOUT_SECONDS),
+                ),
+            )
+        return self._client
+
+    async def _complete(self, prompt, max_tokens, deadline):
+        if not self.breaker.allow():
+            self._count("short_circuited")
+            raise AIUnavailableError("AI circuit breaker is open")
+
+        self._count("calls")
+        expires_at = time.monotonic() + deadline
+        attempt = 0
+
+        try:
+            while True:
+                remaining = expires_at - time.monotonic()
+                start = time.monotonic()
+                try:
+                    response = await self._openai().chat.completions.create(
+                        model=AI_MODEL,
+                        messages=[
+                            {"role": "system", "content": SYSTEM_PROMPT},
+                            {"role": "user", "content": prompt}
+                        ],
+                        max_tokens=max_tokens,
+                        temperature=0.1,
+                        timeout=max(0.1, min(AI_TIMEOUT_SECONDS, remaining)),
+                    )
+                    with self._lock:
+                        self._latencies.append(time.monotonic() - start)
+                    self._count("successes")
+                    self.breaker.record_success()
+                    return response.choices[0].message.content or ""
+                except Exception as e:
+                    if isinstance(e, openai.APITimeoutError):
+                        self._count("timeouts")
+
+                    # Full jitter keeps many callers that failed together from retrying together
+                    delay = random.uniform(0, min(AI_RETRY_MAX_DELAY, AI_RETRY_BASE_DELAY * 2 ** attempt))
+                    retryable = isinstance(e, RETRYABLE_ERRORS) and attempt < AI_MAX_RETRIES
+                    if not retryable or time.monotonic() + delay >= expires_at:
+                        self._count("failures")
+                        # A rejected request still means the upstream is answering
+                        if isinstance(e, openai.BadRequestError):
+                            self.breaker.record_success()
+                        else:
+                            self.breaker.record_failure()
+                        raise AIUnavailableError(f"AI request failed: {e}") from e
+
+                    attempt += 1
+                    self._count("retries")
+                    await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            # The caller gave up waiting; count it so a stuck probe cannot hold the breaker half open
+            self._count("failures")
+            self.breaker.record_failure()
+            raise
+
+    def complete(self, prompt, max_tokens, deadline=AI_DEADLINE_SECONDS):
+        # Blocking call for sync code; never waits longer than the deadline
+        future = asyncio.run_coroutine_threadsafe(self._complete(prompt, max_tokens, deadline), self._event_loop())
+        try:
+            return future.result(timeout=deadline + 1)
+        except TimeoutError:
+            future.cancel()
+            raise AIUnavailableError("AI request exceeded its deadline")
+
+    def close(self):
+        with self._lock:
+            loop, client = self._loop, self._client
+            self._loop, self._client = None, None
+
+        if loop is None:
+            return
+        if client is not None:
+            asyncio.run_coroutine_threadsafe(client.close(), loop).result(timeout=5)
+        loop.call_soon_threadsafe(loop.stop)
+
+ai_client = AIClient()
\ No newline at end of file
@@ -0,0 +1,120 @@
+import math
+import os
+from bisect import insort
+
+ANOMALY_QUANTILE = float(os.getenv("ANOMALY_QUANTILE", "0.95"))
+ANOMALY_MIN_SAMPLES = int(os.getenv("ANOMALY_MIN_SAMPLES", "20"))
+ANOMALY_DEFAULT_Z_SCORE = 3.0
+ANOMALY_REASON_PREFIX = "Unusual amount: "
+
+# Desired marker positions of the P² estimator, as fractions of the way through the observations
+P2_INCREMENTS = (0.0, ANOMALY_QUANTILE / 2, ANOMALY_QUANTILE, (1 + ANOMALY_QUANTILE) / 2, 1.0)
+
+# Running statistics of one stream of amounts in constant space: count, mean and variance by Welford's
+# method, and the ANOMALY_QUANTILE quantile by the P² algorithm (Jain & Chlamtac), which keeps five
+# markers instead of the observations. Welford updates can be undone; the quantile markers cannot, so
+# amounts removed from the stream are only forgotten by the mean and variance.
+class RunningStats:
+    __slots__ = ("count", "mean", "m2", "heights", "positions")
+
+    def __init__(self, count=0, mean=0.0, m2=0.0, heights=None, positions=None):
+        self.count = count or 0
+        self.mean = mean or 0.0
+        self.m2 = m2 or 0.0
+        self.heights = list(heights or [])
+        self.positions = list(positions or [])
+
+    @classmethod
+    def from_row(cls, row):
+        return cls(row.sample_count, row.mean, row.m2, row.quantile_heights, row.quantile_positions)
+
+    def as_values(self):
+        return {
+            "sample_count": self.count,
+            "mean": self.mean,
+            "m2": self.m2,
+            "quantile_heights": self.heights,
+            "quantile_positions": self.positions,
+        }
+
+    @property
+    def std(self):
+        return math.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else 0.0
+
+    @property
+    def quantile(self):
+        if len(self.heights) < 5:
+            # Too few observations for the markers yet; they are the sorted observations themselves
+            return self.heights[min(len(self.heights) - 1, int(ANOMALY_QUANTILE * len(self.heights)))] if self.heights else None
+        return self.heights[2]
+
+    def push(self, amount):
+        self.count += 1
+        delta = amount - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (amount - self.mean)
+        self.push_quantile(amount)
+
+    def remove(self, amount):
+        if self.count <= 1:
+            self.count, self.mean, self.m2 = 0, 0.0, 0.0
+            return
+
+        previous_mean = (self.count * self.mean - amount) / (self.count - 1)
+        self.m2 = max(0.0, self.m2 - (amount - previous_mean) * (amount - self.mean))
+        self.mean = previous_mean
+        self.count -= 1
+
+    def push_quantile(self, amount):
+        heights, positions = self.heights, self.positions
+        if len(heights) < 5:
+            insort(heights, amount)
+            if len(heights) == 5:
+                positions[:] = [1, 2, 3, 4, 5]
+            return
+
+        if amount < heights[0]:
+            heights[0] = amount
+            cell = 0
+        elif amount >= heights[4]:
+            heights[4] = amount
+            cell = 3
+        else:
+            cell = next(i for i in range(4) if heights[i] <= amount < heights[i + 1])
+
+        for i in range(cell + 1, 5):
+            positions[i] += 1
+
+        observations = positions[4]
+        for i in (1, 2, 3):
+            offset = 1 + (observations - 1) * P2_INCREMENTS[i] - positions[i]
+            if (offset >= 1 and positions[i + 1] - positions[i] > 1) or (offset <= -1 and positions[i - 1] - positions[i] < -1):
+                step = 1 if offset > 0 else -1
+                height = self.parabolic(i, step)
+                if not heights[i - 1] < height < heights[i + 1]:
+                    height = heights[i] + step * (heights[i + step] - heights[i]) / (positions[i + step] - positions[i])
+                heights[i] = height
+                positions[i] += step
+
+    def parabolic(self, i, step):
+        heights, positions = self.heights, self.positions
+        return heights[i] + step / (positions[i + 1] - positions[i - 1]) * (
+            (positions[i] - positions[i - 1] + step) * (heights[i + 1] - heights[i]) / (positions[i + 1] - positions[i])
+            + (positions[i + 1] - positions[i] - step) * (heights[i] - heights[i - 1]) / (positions[i] - positions[i - 1])
+        )
+
+def anomaly_reason(stats, amount, z_score_max):
+    # An amount is an outlier when it is both z_score_max standard deviations above the mean and above
+    # the tracked quantile; the quantile guard keeps skewed spend (a few large but routine expenses) quiet
+    if stats is None or amount is None or stats.count < ANOMALY_MIN_SAMPLES:
+        return None
+
+    std = stats.std
+    quantile = stats.quantile
+    if not std or quantile is None:
+        return None
+
+    z_score = (amount - stats.mean) / std
+    if z_score > z_score_max and amount > quantile:
+        return f"{ANOMALY_REASON_PREFIX}{z_score:.1f} standard deviations above the usual {stats.mean:.2f}"
+    return None
\ No newline at end of file
@@ -0,0 +1,149 @@
+import hashlib
+import os
+import re
+import threading
+from datetime import datetime, timedelta, timezone
+from cachetools import TTLCache
+from sqlalchemy.exc import SQLAlchemyError
+from app.core import SessionLocal
+from app.models import CategoryCacheEntry
+
+CATEGORY_CACHE_SIZE = int(os.getenv("CATEGORY_CACHE_SIZE", "10000"))
+CATEGORY_CACHE_TTL_SECONDS = int(os.getenv("CATEGORY_CACHE_TTL_SECONDS", str(30 * 24 * 60 * 60)))
+
+NON_LETTERS = re.compile(r"[^a-z]+")
+DESCRIPTION_STOPWORDS = {"and", "the", "for", "with", "from", "to", "of", "at", "in", "on", "a", "an"}
+
+def normalize_merchant(merchant):
+    # "UBER *TRIP 8KX2" and "Uber Trip" should share an entry, so digits and punctuation are dropped
+    return " ".join(NON_LETTERS.sub(" ", (merchant or "").lower()).split())
+
+def description_tokens(description):
+    tokens = set(NON_LETTERS.sub(" ", (description or "").lower()).split())
+    return sorted(token for token in tokens if len(token) > 1 and token not in DESCRIPTION_STOPWORDS)
+
+def cache_key(expense_data):
+    merchant = normalize_merchant(expense_data.get("merchant"))
+    tokens = " ".join(description_tokens(expense_data.get("description")))
+    return hashlib.sha256(f"{merchant}|{tokens}".encode("utf-8")).hexdigest()
+
+class CategoryCache:
+    def __init__(self, maxsize=CATEGORY_CACHE_SIZE, ttl=CATEGORY_CACHE_TTL_SECONDS, session_factory=SessionLocal):
+        self.ttl = ttl
+        self.session_factory = session_factory
+        self._memory = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._lock = threading.Lock()
+        self._counters = {"memory_hits": 0, "db_hits": 0, "misses": 0, "writes": 0, "errors": 0}
+
+    def _count(self, name, amount=1):
+        with self._lock:
+            self._counters[name] += amount
+
+    def stats(self):
+        with self._lock:
+            counters = dict(self._counters)
+            counters["memory_size"] = len(self._memory)
+
+        lookups = counters["memory_hits"] + counters["db_hits"] + counters["misses"]
+        counters["hit_rate"] = (counters["memory_hits"] + counters["db_hits"]) / lookups if lookups else 0.0
+        return counters
+
+    def get(self, expense_data):
+        return self.get_many([expense_data])[0]
+
+    def get_many(self, expenses_data):
+        keys = [cache_key(expense_data) for expense_data in expenses_data]
+        found = {}
+
+        with self._lock:
+            for key in keys:
+                category = self._memory.get(key)
+                if category is not None:
+                    found[key] = category
+
+        memory_hits = sum(1 for key in keys if key in found)
+        missing = {key for key in keys if key not in found}
+
+        if missing:
+            db_found = self._load(missing)
+            with self._lock:
+                for key, category in db_found.items():
+                    self._memory[key] = category
+            found.update(db_found)
+
+        db_hits = sum(1 for key in keys if key in found) - memory_hits
+        self._count("memory_hits", memory_hits)
+        self._count("db_hits", db_hits)
+        self._count("misses", len(keys) - memory_hits - db_hits)
+
+        return [found.get(key) for key in keys]
+
+    def set(self, expense_data, category):
+        self.set_many([(expense_data, category)])
+
+    def set_many(self, entries):
+        rows = {}
+        for expense_data, category in entries:
+            rows[cache_key(expense_data)] = (normalize_merchant(expense_data.get("merchant")), category)
+
+        if not rows:
+            return
+
+        with self._lock:
+            for key, (_, category) in rows.items():
+                self._memory[key] = category
+
+        expires_at = datetime.now(timezone.utc) + timedelta(seconds=self.ttl)
+        db = self.session_factory()
+        try:
+            # Overwrite rather than merge so an expired entry is refreshed with the new answer
+            db.query(CategoryCacheEntry).filter(CategoryCacheEntry.key.in_(rows.keys())).delete(synchronize_session=False)
+            db.add_all([
+                CategoryCacheEntry(key=key, merchant=merchant, category=category, expires_at=expires_at)
+                for key, (merchant, category) in rows.items()
+            ])
+            db.commit()
+            self._count("writes", len(rows))
+        except SQLAlchemyError as e:
+            # A concurrent writer may have inserted the same key; the in-process tier still has it
+            db.rollback()
+            self._count("errors")
+            print(f"Error writing category cache: {e}")
+        finally:
+            db.close()
+
+    def _load(self, keys):
+        db = self.session_factory()
+        try:
+            entries = (
+                db.query(CategoryCacheEntry.key, CategoryCacheEntry.category)
+                .filter(CategoryCacheEntry.key.in_(keys))
+                .filter(CategoryCacheEntry.expires_at > datetime.now(timezone.utc))
+                .all()
+            )
+            return {key: category.value for key, category in entries}
+        except SQLAlchemyError as e:
+            self._count("errors")
+            print(f"Error reading category cache: {e}")
+            return {}
+        finally:
+            db.close()
+
+    def purge_expired(self):
+        db = self.session_factory()
+        try:
+            deleted = (
+                db.query(CategoryCacheEntry)
+                .filter(CategoryCacheEntry.expires_at <= datetime.now(timezone.utc))
+                .delete(synchronize_session=False)
+            )
+            db.commit()
+            return deleted
+        finally:
+            db.close()
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+
+category_cache = CategoryCache()
@@ -0,0 +1,209 @@
+import math
+import os
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+from sqlalchemy.exc import SQLAlchemyError
+from app.core import SessionLocal
+from app.core.prompts import CATEGORY_KEYWORDS
+from app.models import Expense, MerchantRule
+from app.utils.category_cache import normalize_merchant, description_tokens
+
+CLASSIFIER_MIN_CONFIDENCE = float(os.getenv("CLASSIFIER_MIN_CONFIDENCE", "0.9"))
+CLASSIFIER_TRAINING_LIMIT = int(os.getenv("CLASSIFIER_TRAINING_LIMIT", "50000"))
+CLASSIFIER_MIN_TRAINING_ROWS = int(os.getenv("CLASSIFIER_MIN_TRAINING_ROWS", "200"))
+CLASSIFIER_REFRESH_SECONDS = int(os.getenv("CLASSIFIER_REFRESH_SECONDS", "3600"))
+
+def expense_tokens(expense_data):
+    merchant = normalize_merchant(expense_data.get("merchant"))
+    tokens = [f"merchant:{word}" for word in merchant.split()]
+    if merchant:
+        tokens.append(f"merchant={merchant}")
+    tokens.extend(description_tokens(expense_data.get("description")))
+    return tokens
+
+# Tier one: every keyword compiled into a single alternation, longest first so "uber eats" wins over "uber"
+class KeywordMatcher:
+    def __init__(self, keywords):
+        self.categories = {}
+        for category, words in keywords.items():
+            for word in words:
+                self.categories[normalize_merchant(word)] = category
+
+        alternatives = sorted(self.categories, key=len, reverse=True)
+        self.pattern = re.compile(r"\b(?:" + "|".join(re.escape(word) for word in alternatives) + r")\b") if alternatives else None
+
+    def match(self, text):
+        if not self.pattern or not text:
+            return None
+
+        # Text that names two different categories ("Uber to the hotel") is left for the later tiers
+        categories = {self.categories[word] for word in self.pattern.findall(text)}
+        return categories.pop() if len(categories) == 1 else None
+
+# Tier two: multinomial naive Bayes over merchant words and description tokens
+class NaiveBayesModel:
+    def __init__(self, alpha=1.0):
+        self.alpha = alpha
+        self.log_priors = {}
+        self.log_likelihoods = {}
+        self.log_unseen = {}
+        self.vocabulary = set()
+        self.training_rows = 0
+
+    def fit(self, examples):
+        class_counts = Counter()
+        token_counts = defaultdict(Counter)
+
+        for tokens, category in examples:
+            class_counts[category] += 1
+            token_counts[category].update(tokens)
+            self.vocabulary.update(tokens)
+
+        self.training_rows = sum(class_counts.values())
+        vocabulary_size = len(self.vocabulary)
+
+        for category, count in class_counts.items():
+            total = sum(token_counts[category].values()) + self.alpha * vocabulary_size
+            self.log_priors[category] = math.log(count / self.training_rows)
+            self.log_unseen[category] = math.log(self.alpha / total)
+            self.log_likelihoods[category] = {
+                token: math.log((token_count + self.alpha) / total)
+                for token, token_count in token_counts[category].items()
+            }
+
+        return self
+
+    def predict(self, tokens):
+        tokens = [token for token in tokens if token in self.vocabulary]
+        if not tokens or not self.log_priors:
+            return None, 0.0
+
+        scores = {}
+        for category, log_prior in self.log_priors.items():
+            likelihoods = self.log_likelihoods[category]
+            unseen = self.log_unseen[category]
+            scores[category] = log_prior + sum(likelihoods.get(token, unseen) for token in tokens)
+
+        best = max(scores, key=scores.get)
+        total = sum(math.exp(score - scores[best]) for score in scores.values())
+        return best, 1.0 / total
+
+class LocalClassifier:
+    def __init__(self, keywords=CATEGORY_KEYWORDS, min_confidence=CLASSIFIER_MIN_CONFIDENCE, session_factory=SessionLocal):
+        self.keywords = KeywordMatcher(keywords)
+        self.min_confidence = min_confidence
+        self.session_factory = session_factory
+        self.merchant_rules = {}  # (company_id, merchant) -> category
+        self.model = None
+        self.loaded_at = None
+        self._lock = threading.Lock()
+        self._refreshing = False
+        self._counters = {"rule_hits": 0, "model_hits": 0, "low_confidence": 0, "refreshes": 0, "errors": 0}
+
+    def _count(self, name, amount=1):
+        with self._lock:
+            self._counters[name] += amount
+
+    def stats(self):
+        with self._lock:
+            counters = dict(self._counters)
+        counters["merchant_rules"] = len(self.merchant_rules)
+        counters["training_rows"] = self.model.training_rows if self.model else 0
+        return counters
+
+    def match_rules(self, expense_data):
+        self.refresh()
+
+        merchant = normalize_merchant(expense_data.get("merchant"))
+        category = (
+            self.merchant_rules.get((expense_data.get("company_id"), merchant))
+            or self.keywords.match(merchant)
+            or self.keywords.match(normalize_merchant(expense_data.get("description")))
+        )
+        if category:
+            self._count("rule_hits")
+        return category
+
+    def predict(self, expense_data):
+        model = self.model
+        if model is None:
+            return None, 0.0
+
+        category, confidence = model.predict(expense_tokens(expense_data))
+        if category and confidence >= self.min_confidence:
+            self._count("model_hits")
+            return category, confidence
+
+        self._count("low_confidence")
+        return None, confidence
+
+    def classify(self, expense_data):
+        # (category, confidence, tier); category is None when the LLM should decide
+        category = self.match_rules(expense_data)
+        if category:
+            return category, 1.0, "rule"
+
+        category, confidence = self.predict(expense_data)
+        if category:
+            return category, confidence, "model"
+
+        return None, confidence, None
+
+    def best_guess(self, expense_data):
+        # Used when the LLM is unavailable: the model's top answer however unsure it is
+        model = self.model
+        if model is None:
+            return None
+        category, _ = model.predict(expense_tokens(expense_data))
+        return category
+
+    def add_merchant_rules(self, rules):
+        self.merchant_rules = {**self.merchant_rules, **rules}
+
+    def train(self, examples):
+        examples = [(expense_tokens(expense_data), category) for expense_data, category in examples]
+        self.model = NaiveBayesModel().fit(examples) if len(examples) >= CLASSIFIER_MIN_TRAINING_ROWS else None
+        return self.model
+
+    def refresh(self, force=False):
+        # Rules and the model are reloaded in the background so no request waits on training
+        if self.session_factory is None:
+            return
+
+        with self._lock:
+            stale = self.loaded_at is None or time.monotonic() - self.loaded_at >= CLASSIFIER_REFRESH_SECONDS
+            if self._refreshing or not (force or stale):
+                return
+            self._refreshing = True
+
+        threading.Thread(target=self._reload, name="classifier-refresh", daemon=True).start()
+
+    def _reload(self):
+        try:
+            db = self.session_factory()
+            try:
+                rules = {(rule.company_id, rule.merchant): rule.category.value for rule in db.query(MerchantRule).all()}
+                rows = (
+                    db.query(Expense.merchant, Expense.description, Expense.category)
+                    .filter(Expense.category.isnot(None))
+                    .order_by(Expense.id.desc())
+                    .limit(CLASSIFIER_TRAINING_LIMIT)
+                    .all()
+                )
+            finally:
+                db.close()
+
+            self.merchant_rules = rules
+            self.train(({"merchant": merchant, "description": description}, category.value) for merchant, description, category in rows)
+            self._count("refreshes")
+        except SQLAlchemyError as e:
+            self._count("errors")
+            print(f"Error loading local classifier: {e}")
+        finally:
+            with self._lock:
+                self.loaded_at = time.monotonic()
+                self._refreshing = False
+
+local_classifier = LocalClassifier()
\ No newline at end of file
@@ -0,0 +1,57 @@
+import hashlib
+from sqlalchemy import select
+from app.models import Expense
+
+DUPLICATE_REASON_PREFIX = "Possible duplicate of expense "
+
+def expense_fingerprint(user_id, merchant, amount, date):
+    # Same user, merchant (case and spacing ignored), amount to the cent and calendar day
+    merchant = " ".join((merchant or "").lower().split())
+    cents = round((amount or 0) * 100)
+    day = date.date().isoformat() if hasattr(date, "date") else str(date)
+    return hashlib.blake2b(f"{user_id}|{merchant}|{cents}|{day}".encode("utf-8"), digest_size=16).hexdigest()
+
+def fingerprint_of(expense_data):
+    return expense_fingerprint(expense_data.get("user_id"), expense_data.get("merchant"), expense_data.get("amount"), expense_data.get("date"))
+
+def is_duplicate_reason(reason):
+    return bool(reason) and reason.startswith(DUPLICATE_REASON_PREFIX)
+
+# One per CSV import. Each chunk is checked with a single query on the (user_id, fingerprint) index, so the
+# cost follows the size of the file rather than the user's history. Earlier chunks of the import are already
+# committed when a chunk is checked, so a line repeated anywhere in the file is caught as well: the first
+# copy goes in and later ones count as duplicates, the same as re-uploading the file.
+class DuplicateDetector:
+    def __init__(self, db, user_id: int):
+        self.db = db
+        self.user_id = user_id
+
+    def split(self, expenses_data):
+        # Stamps each row with its fingerprint and returns (new rows, duplicate rows)
+        for expense_data in expenses_data:
+            expense_data["fingerprint"] = fingerprint_of(expense_data)
+
+        fingerprints = {expense_data["fingerprint"] for expense_data in expenses_data}
+        if not fingerprints:
+            return expenses_data, []
+
+        seen = set(self.db.scalars(
+            select(Expense.fingerprint).where(Expense.user_id == self.user_id, Expense.fingerprint.in_(fingerprints))
+        ))
+
+        new_rows, duplicates = [], []
+        for expense_data in expenses_data:
+            if expense_data["fingerprint"] in seen:
+                duplicates.append(expense_data)
+            else:
+                seen.add(expense_data["fingerprint"])
+                new_rows.append(expense_data)
+        return new_rows, duplicates
+
+def find_duplicate(db, expense_data):
+    return db.scalar(
+        select(Expense.id)
+        .where(Expense.user_id == expense_data.get("user_id"), Expense.fingerprint == expense_data["fingerprint"])
+        .order_by(Expense.id)
+        .limit(1)
+    )
\ No newline at end of file
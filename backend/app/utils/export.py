@@ -0,0 +1,112 @@
+import csv
+import enum
+import io
+import json
+from datetime import date, datetime
+import pyarrow as pa
+import pyarrow.parquet as pq
+from sqlalchemy import Boolean, DateTime, Float, Integer
+
+# Export writers take batches of plain rows and yield bytes as each batch is encoded, so a response
+# never holds more than one batch whatever the size of the export
+
+MEDIA_TYPES = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+def export_value(value):
+    if isinstance(value, enum.Enum):
+        return value.value
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+def csv_chunks(columns, batches):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow([column.name for column in columns])
+
+    for rows in batches:
+        writer.writerows(["" if value is None else export_value(value) for value in row] for row in rows)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate(0)
+
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+def ndjson_chunks(columns, batches):
+    names = [column.name for column in columns]
+    for rows in batches:
+        yield "".join(
+            json.dumps(dict(zip(names, map(export_value, row))), separators=(",", ":")) + "\n"
+            for row in rows
+        ).encode("utf-8")
+
+def arrow_type(column):
+    if isinstance(column.type, Boolean):
+        return pa.bool_()
+    if isinstance(column.type, Integer):
+        return pa.int64()
+    if isinstance(column.type, Float):
+        return pa.float64()
+    if isinstance(column.type, DateTime):
+        return pa.timestamp("us", tz="UTC" if column.type.timezone else None)
+    return pa.string()
+
+# ParquetWriter records absolute offsets in the footer, so the sink counts every byte it has handed
+# out instead of rewinding a buffer between row groups
+class ChunkSink:
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data):
+        data = bytes(data)
+        self.chunks.append(data)
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data = b"".join(self.chunks)
+        self.chunks.clear()
+        return data
+
+def parquet_chunks(columns, batches):
+    schema = pa.schema([pa.field(column.name, arrow_type(column)) for column in columns])
+    # Enum columns come back as Python enums and are stored by value
+    text_columns = [field.type == pa.string() for field in schema]
+
+    sink = ChunkSink()
+    writer = pq.ParquetWriter(pa.PythonFile(sink, mode="w"), schema, compression="zstd")
+    try:
+        for rows in batches:
+            # Each batch becomes one row group, built column by column from the transposed rows
+            values = list(zip(*rows))
+            arrays = [
+                pa.array(list(map(export_value, column_values)) if is_text else column_values, type=field.type)
+                for column_values, is_text, field in zip(values, text_columns, schema)
+            ]
+            writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+            yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()
+
+EXPORT_WRITERS = {
+    "csv": csv_chunks,
+    "ndjson": ndjson_chunks,
+    "parquet": parquet_chunks,
+}
\ No newline at end of file
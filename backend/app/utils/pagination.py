@@ -0,0 +1,63 @@
+import base64
+import json
+from datetime import datetime
+from sqlalchemy import tuple_
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+class InvalidCursorError(ValueError):
+    pass
+
+def encode_cursor(values):
+    payload = [{"dt": value.isoformat()} if isinstance(value, datetime) else value for value in values]
+    return base64.urlsafe_b64encode(json.dumps(payload, separators=(",", ":")).encode("utf-8")).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor: str):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        if not isinstance(payload, list):
+            raise ValueError("cursor payload must be a list")
+        return [datetime.fromisoformat(value["dt"]) if isinstance(value, dict) else value for value in payload]
+    except (ValueError, TypeError, KeyError, UnicodeError) as e:
+        raise InvalidCursorError(f"Invalid cursor: {e}")
+
+def cursor_value_matches(column, value):
+    python_type = column.type.python_type
+    if isinstance(value, bool):
+        return python_type is bool
+    if python_type is float:
+        return isinstance(value, (int, float))
+    return isinstance(value, python_type)
+
+def keyset_condition(columns, values, descending=False):
+    # Row-value comparison (a, b) < (x, y), which PostgreSQL and SQLite turn into a single index range
+    # scan. The expanded a < x OR (a = x AND b < y) cannot start a range scan, so deep pages get slower.
+    if len(columns) == 1:
+        return columns[0] < values[0] if descending else columns[0] > values[0]
+
+    row = tuple_(*columns)
+    cursor_row = tuple_(*values, types=[column.type for column in columns])
+    return row < cursor_row if descending else row > cursor_row
+
+def paginate(query, columns, skip: int = 0, limit: int = 100, cursor=None, descending=False):
+    # With a cursor the page starts right after it and skip is ignored, so deep pages cost the same as page one
+    query = query.order_by(*[column.desc() if descending else column.asc() for column in columns])
+
+    if cursor is not None:
+        if len(cursor) != len(columns):
+            raise InvalidCursorError("Cursor does not match this listing")
+        if not all(cursor_value_matches(column, value) for column, value in zip(columns, cursor)):
+            raise InvalidCursorError("Cursor does not match this listing")
+        query = query.filter(keyset_condition(columns, cursor, descending))
+    elif skip:
+        query = query.offset(skip)
+
+    return query.limit(limit)
+
+def next_cursor(items, columns, limit: int):
+    if not items or len(items) < limit:
+        return None
+
+    last = items[-1]
+    return encode_cursor([getattr(last, column.key) for column in columns])
@@ -0,0 +1,233 @@
+import os
+import threading
+from enum import Enum
+import numpy as np
+from cachetools import TTLCache
+from app.utils.anomaly import ANOMALY_DEFAULT_Z_SCORE, ANOMALY_REASON_PREFIX, anomaly_reason
+
+AMOUNT_REASON_PREFIX = "Amount exceeds maximum of "
+BLACKLIST_REASON = "Merchant is blacklisted"
+POLICY_CACHE_SIZE = int(os.getenv("POLICY_CACHE_SIZE", "10000"))
+POLICY_CACHE_TTL_SECONDS = int(os.getenv("POLICY_CACHE_TTL_SECONDS", "30"))
+
+class PolicyGroup:
+    __slots__ = ("hard_amount_max", "soft_amount_max", "hard_blacklist", "soft_blacklist", "hard_anomaly_z_score", "soft_anomaly_z_score")
+
+    def __init__(self):
+        self.hard_amount_max = None
+        self.soft_amount_max = None
+        self.hard_blacklist = set()
+        self.soft_blacklist = set()
+        self.hard_anomaly_z_score = None
+        self.soft_anomaly_z_score = None
+
+    def add(self, rule_type, rule_value, is_hard):
+        if rule_type == "amount_max":
+            try:
+                max_value = float(rule_value)
+            except (TypeError, ValueError):
+                return
+
+            # Only the strictest threshold of each kind can ever fire
+            if is_hard:
+                self.hard_amount_max = max_value if self.hard_amount_max is None else min(self.hard_amount_max, max_value)
+            else:
+                self.soft_amount_max = max_value if self.soft_amount_max is None else min(self.soft_amount_max, max_value)
+
+        elif rule_type == "merchant_blacklist":
+            merchants = [rule_value] if isinstance(rule_value, str) else (rule_value or [])
+            target = self.hard_blacklist if is_hard else self.soft_blacklist
+            target.update(normalize_merchant(merchant) for merchant in merchants if isinstance(merchant, str))
+
+        elif rule_type == "anomaly":
+            # rule_value is how many standard deviations above the usual amount count as an outlier
+            try:
+                z_score = ANOMALY_DEFAULT_Z_SCORE if rule_value in (None, "") else float(rule_value)
+            except (TypeError, ValueError):
+                return
+
+            if is_hard:
+                self.hard_anomaly_z_score = z_score if self.hard_anomaly_z_score is None else min(self.hard_anomaly_z_score, z_score)
+            else:
+                self.soft_anomaly_z_score = z_score if self.soft_anomaly_z_score is None else min(self.soft_anomaly_z_score, z_score)
+
+    @property
+    def has_anomaly_rules(self):
+        return self.hard_anomaly_z_score is not None or self.soft_anomaly_z_score is not None
+
+    def check(self, amount, merchant, hard, baseline=None):
+        amount_max = self.hard_amount_max if hard else self.soft_amount_max
+        if amount_max is not None and amount is not None and amount > amount_max:
+            return f"{AMOUNT_REASON_PREFIX}{amount_max}"
+
+        blacklist = self.hard_blacklist if hard else self.soft_blacklist
+        if merchant in blacklist:
+            return BLACKLIST_REASON
+
+        z_score = self.hard_anomaly_z_score if hard else self.soft_anomaly_z_score
+        if z_score is not None:
+            return anomaly_reason(baseline, amount, z_score)
+
+        return None
+
+# Policies grouped by (company_id, category); a company_id of None applies to every company
+class CompiledPolicySet:
+    def __init__(self, policies=()):
+        self.groups = {}
+        self.policy_count = 0
+
+        for policy in policies:
+            key = (policy.company_id, enum_value(policy.category))
+            group = self.groups.get(key)
+            if group is None:
+                group = self.groups[key] = PolicyGroup()
+            group.add(policy.rule_type, policy.rule_value, enum_value(policy.policy_type) == "hard")
+            self.policy_count += 1
+
+    def __len__(self):
+        return self.policy_count
+
+    def groups_for(self, company_id, category):
+        category = enum_value(category)
+        groups = []
+
+        group = self.groups.get((company_id, category))
+        if group is not None:
+            groups.append(group)
+
+        if company_id is not None:
+            global_group = self.groups.get((None, category))
+            if global_group is not None:
+                groups.append(global_group)
+
+        return groups
+
+    def needs_baseline(self, expense_data):
+        return any(group.has_anomaly_rules for group in self.groups_for(expense_data.get("company_id"), expense_data.get("category")))
+
+    def evaluate(self, expense_data, baseline=None):
+        # baseline is the RunningStats anomaly rules compare the amount against (see app/crud/expense_stat.py)
+        groups = self.groups_for(expense_data.get("company_id"), expense_data.get("category"))
+        if not groups:
+            return False, None, None
+
+        amount = expense_data.get("amount")
+        merchant = normalize_merchant(expense_data.get("merchant"))
+
+        for group in groups:
+            reason = group.check(amount, merchant, hard=True, baseline=baseline)
+            if reason:
+                return True, reason, False
+
+        for group in groups:
+            reason = group.check(amount, merchant, hard=False, baseline=baseline)
+            if reason:
+                return True, reason, None
+
+        return False, None, None
+
+    def evaluate_many(self, company_id, amounts, categories, merchants):
+        # Vectorized evaluate() over one company's expenses. amounts is a float array (NaN when missing),
+        # categories and merchants are arrays of raw values. Returns an array of outcome codes (-1 when
+        # nothing fires) and the (reason, is_hard) each code stands for, checking in the same order as evaluate().
+        # Anomaly rules are skipped: they score an expense against the statistics at the time it was written.
+        outcome = np.full(len(amounts), -1, dtype=np.int32)
+        outcomes = []
+
+        def record(mask, reason, is_hard):
+            mask &= outcome == -1
+            if mask.any():
+                outcome[mask] = len(outcomes)
+                outcomes.append((reason, is_hard))
+
+        category_values, category_codes = np.unique(np.array([enum_value(category) or "" for category in categories], dtype=str), return_inverse=True)
+        merchant_values, merchant_codes = np.unique(np.asarray(merchants, dtype=str), return_inverse=True)
+        normalized_merchants = np.char.lower(np.char.strip(merchant_values))
+
+        for code, category in enumerate(category_values):
+            groups = self.groups_for(company_id, str(category))
+            if not groups:
+                continue
+
+            in_category = category_codes == code
+            for hard in (True, False):
+                for group in groups:
+                    amount_max = group.hard_amount_max if hard else group.soft_amount_max
+                    if amount_max is not None:
+                        record(in_category & (amounts > amount_max), f"{AMOUNT_REASON_PREFIX}{amount_max}", hard)
+
+                    blacklist = group.hard_blacklist if hard else group.soft_blacklist
+                    if blacklist:
+                        blacklisted = np.isin(normalized_merchants, list(blacklist))[merchant_codes]
+                        record(in_category & blacklisted, BLACKLIST_REASON, hard)
+
+        return outcome, outcomes
+
+    def anomaly_rule_mask(self, company_id, categories):
+        # True where the expense's category still has an anomaly rule for this company
+        category_values, category_codes = np.unique(np.array([enum_value(category) or "" for category in categories], dtype=str), return_inverse=True)
+        has_rules = np.array(
+            [any(group.has_anomaly_rules for group in self.groups_for(company_id, str(category))) for category in category_values],
+            dtype=bool
+        )
+        return has_rules[category_codes]
+
+# Compiled sets are cached per company and tagged with the version they were built from.
+# Invalidating a company (or the global policies, company_id None) bumps its version, so a
+# set built concurrently from stale rows is never served. Versions live in this process only:
+# a policy write invalidates the process that made it, and other server processes pick the
+# change up when their entry expires, up to POLICY_CACHE_TTL_SECONDS later.
+class PolicySetCache:
+    def __init__(self, maxsize=POLICY_CACHE_SIZE, ttl=POLICY_CACHE_TTL_SECONDS):
+        self._lock = threading.Lock()
+        self._entries = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._versions = {}
+        self._global_version = 0
+
+    def _version(self, company_id):
+        return (self._global_version, self._versions.get(company_id, 0))
+
+    def get(self, company_id, loader):
+        with self._lock:
+            version = self._version(company_id)
+            entry = self._entries.get(company_id)
+            if entry is not None and entry[0] == version:
+                return entry[1]
+
+        policy_set = CompiledPolicySet(loader())
+
+        with self._lock:
+            if self._version(company_id) == version:
+                self._entries[company_id] = (version, policy_set)
+
+        return policy_set
+
+    def invalidate(self, company_id=None):
+        with self._lock:
+            if company_id is None:
+                self._global_version += 1
+                self._entries.clear()
+            else:
+                self._versions[company_id] = self._versions.get(company_id, 0) + 1
+                self._entries.pop(company_id, None)
+
+def enum_value(value):
+    return value.value if isinstance(value, Enum) else value
+
+def normalize_merchant(merchant):
+    return (merchant or "").strip().lower()
+
+def is_policy_reason(reasons):
+    # True where a flag_reason was written by the policy engine rather than by a reviewer
+    reasons = np.asarray(reasons, dtype=str)
+    return is_anomaly_reason(reasons) | np.char.startswith(reasons, AMOUNT_REASON_PREFIX) | (reasons == BLACKLIST_REASON)
+
+def is_anomaly_reason(reasons):
+    return np.char.startswith(np.asarray(reasons, dtype=str), ANOMALY_REASON_PREFIX)
+
+def compile_policies(policies):
+    if isinstance(policies, CompiledPolicySet):
+        return policies
+    return CompiledPolicySet(policies or ())
+
+policy_set_cache = PolicySetCache()
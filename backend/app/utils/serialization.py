@@ -0,0 +1,14 @@
+import orjson
+
+def response_columns(model, schema):
+    # Table columns for the fields of a response schema, in the schema's order
+    table_columns = model.__table__.c
+    return tuple(table_columns[name] for name in schema.model_fields if name in table_columns)
+
+def rows_json(rows):
+    # Rows selected with response_columns encode straight to JSON: orjson handles datetimes and enums
+    # natively and OPT_UTC_Z writes UTC offsets as "Z" like Pydantic does
+    if not rows:
+        return b"[]"
+    keys = rows[0]._fields
+    return orjson.dumps([dict(zip(keys, row)) for row in rows], option=orjson.OPT_UTC_Z)
\ No newline at end of file
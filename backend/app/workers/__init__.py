@@ -0,0 +1,3 @@
+from .imports import ImportStorageUnavailableError, enqueue_import, import_file_path, resume_imports, start_import_watcher
+from .reaudit import run_reaudit
+from .categorization import completion_waiters, enqueue_categorization, resume_categorizations
\ No newline at end of file
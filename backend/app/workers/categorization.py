@@ -0,0 +1,140 @@
+import asyncio
+import os
+import threading
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from sqlalchemy import update
+from app.core import SessionLocal
+from app.crud.expense import check_expense_against_policies, claim_categorization, get_pending_expense_ids, update_expense
+from app.crud.expense_stat import get_expense_baseline
+from app.crud.policy import get_compiled_policies
+from app.models import CategorizationStatus, Expense
+from app.utils.ai import categorize_expense
+from app.utils.duplicates import is_duplicate_reason
+
+CATEGORIZATION_WORKERS = int(os.getenv("CATEGORIZATION_WORKERS", "4"))
+
+executor = ThreadPoolExecutor(max_workers=CATEGORIZATION_WORKERS, thread_name_prefix="categorization-worker")
+
+# Long-poll requests park here until a worker in this process finishes their expense
+class CompletionWaiters:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._waiters = defaultdict(list)
+
+    async def wait(self, expense_id: int, timeout: float):
+        loop = asyncio.get_running_loop()
+        event = asyncio.Event()
+        waiter = (loop, event)
+
+        with self._lock:
+            self._waiters[expense_id].append(waiter)
+        try:
+            await asyncio.wait_for(event.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            with self._lock:
+                waiters = self._waiters.get(expense_id)
+                if waiters and waiter in waiters:
+                    waiters.remove(waiter)
+                    if not waiters:
+                        del self._waiters[expense_id]
+
+    def notify(self, expense_id: int):
+        with self._lock:
+            waiters = self._waiters.pop(expense_id, [])
+        for loop, event in waiters:
+            loop.call_soon_threadsafe(event.set)
+
+completion_waiters = CompletionWaiters()
+
+def enqueue_categorization(expense_id: int):
+    return executor.submit(run_categorization, expense_id)
+
+def run_categorization(expense_id: int):
+    db = SessionLocal()
+    try:
+        # Pending expenses already claimed by another worker (or this one) are left to it
+        if not claim_categorization(db, expense_id):
+            return
+
+        db_expense = db.query(Expense).filter(Expense.id == expense_id).first()
+        if not db_expense or db_expense.categorization_status != CategorizationStatus.PENDING:
+            return
+
+        expense_data = expense_snapshot(db_expense)
+        # Hand the connection back to the pool while the classifier runs
+        db.rollback()
+
+        try:
+            category = expense_data["category"] or categorize_expense(expense_data)
+
+            # The expense may have been edited or deleted while it was being categorized, so it is read
+            # again under a lock and checked as it is now
+            db_expense = (
+                db.query(Expense)
+                .filter(Expense.id == expense_id)
+                .with_for_update()
+                .populate_existing()
+                .first()
+            )
+            if not db_expense or db_expense.categorization_status != CategorizationStatus.PENDING:
+                db.rollback()
+                return
+
+            expense_data = expense_snapshot(db_expense)
+            # A category set by hand while the expense was queued or being categorized wins over the classifier
+            if not expense_data["category"]:
+                expense_data["category"] = category
+
+            policies = get_compiled_policies(db, db_expense.company_id)
+            baseline = get_expense_baseline(db, expense_data) if policies.needs_baseline(expense_data) else None
+            is_flagged, flag_reason, is_approved = check_expense_against_policies(expense_data, policies, baseline)
+            # A duplicate flag set at submission stands unless a policy has its own reason to flag
+            if not is_flagged and is_duplicate_reason(db_expense.flag_reason):
+                is_flagged, flag_reason, is_approved = True, db_expense.flag_reason, False
+            update_expense(db, expense_id, {
+                "category": expense_data["category"],
+                "is_flagged": is_flagged,
+                "flag_reason": flag_reason,
+                "is_approved": not is_flagged if is_approved is None else is_approved,
+                "categorization_status": CategorizationStatus.COMPLETED,
+            })
+        except Exception as e:
+            db.rollback()
+            print(f"Error categorizing expense {expense_id}: {e}")
+            db.execute(
+                update(Expense)
+                .where(Expense.id == expense_id, Expense.categorization_status == CategorizationStatus.PENDING)
+                .values(categorization_status=CategorizationStatus.FAILED)
+            )
+            db.commit()
+    finally:
+        db.close()
+        completion_waiters.notify(expense_id)
+
+def expense_snapshot(db_expense):
+    return {
+        "company_id": db_expense.company_id,
+        "user_id": db_expense.user_id,
+        "merchant": db_expense.merchant,
+        "amount": db_expense.amount,
+        "description": db_expense.description,
+        "category": db_expense.category,
+    }
+
+def resume_categorizations():
+    # Expenses still pending after a restart are queued again. Every server process does this at startup;
+    # run_categorization claims each expense first, so only one of them categorizes it.
+    db = SessionLocal()
+    try:
+        expense_ids = get_pending_expense_ids(db)
+    finally:
+        db.close()
+
+    for expense_id in expense_ids:
+        enqueue_categorization(expense_id)
+
+    return expense_ids
\ No newline at end of file
@@ -0,0 +1,118 @@
+import io
+import os
+import socket
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from app.core import SessionLocal
+from app.crud.expense import process_csv
+from app.crud.import_job import (
+    IMPORT_LEASE_SECONDS,
+    ImportJobLeaseLostError,
+    claim_import_job,
+    get_claimable_import_job_ids,
+    record_import_job_chunk,
+    finish_import_job
+)
+from app.crud.policy import get_compiled_policies
+from app.utils.ai import categorize_expense, categorize_expenses
+
+IMPORT_WORKERS = int(os.getenv("IMPORT_WORKERS", "2"))
+# Must survive restarts (not /tmp on most hosts), and be shared by every server process that runs imports
+IMPORT_UPLOAD_DIR = os.getenv("IMPORT_UPLOAD_DIR")
+
+# Identifies this process as the owner of the jobs it claims
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+executor = ThreadPoolExecutor(max_workers=IMPORT_WORKERS, thread_name_prefix="import-worker")
+watcher_started = threading.Event()
+
+class ImportStorageUnavailableError(Exception):
+    pass
+
+def import_file_path(job_id: str):
+    if not IMPORT_UPLOAD_DIR:
+        raise ImportStorageUnavailableError("Background imports need IMPORT_UPLOAD_DIR set to a persistent directory")
+
+    os.makedirs(IMPORT_UPLOAD_DIR, exist_ok=True)
+    return os.path.join(IMPORT_UPLOAD_DIR, f"{job_id}.csv")
+
+def enqueue_import(job_id: str):
+    return executor.submit(run_import, job_id)
+
+def run_import(job_id: str):
+    db = SessionLocal()
+    try:
+        # Queued or abandoned jobs only; a job another worker is still running is left to it
+        db_job = claim_import_job(db, job_id, WORKER_ID)
+        if not db_job:
+            return
+
+        try:
+            if db_job.user_id is None:
+                # delete_user keeps the job for its history but detaches it; there is no one to import for
+                raise ValueError("The user who uploaded this file was deleted")
+
+            policies = get_compiled_policies(db, db_job.company_id)
+            with io.open(db_job.file_path, encoding="utf-8", newline="") as csv_stream:
+                process_csv(
+                    db,
+                    db_job.user_id,
+                    db_job.company_id,
+                    csv_stream,
+                    policies,
+                    categorize_expense,
+                    categorize_expenses,
+                    on_chunk=lambda progress: record_import_job_chunk(db, job_id, WORKER_ID, progress),
+                    skip_rows=db_job.rows_processed,
+                    first_chunk=db_job.chunks_completed + 1
+                )
+        except ImportJobLeaseLostError as e:
+            # The new owner carries on from the last committed chunk and removes the file when done
+            db.rollback()
+            print(f"Stopped import job {job_id}: {e}")
+            return
+        except Exception as e:
+            db.rollback()
+            print(f"Error running import job {job_id}: {e}")
+            finish_import_job(db, job_id, WORKER_ID, error=str(e))
+        else:
+            finish_import_job(db, job_id, WORKER_ID)
+
+        try:
+            os.remove(db_job.file_path)
+        except OSError:
+            pass
+    finally:
+        db.close()
+
+def resume_imports():
+    # Queued jobs, and running jobs whose worker stopped committing chunks (a restart or a crash), are
+    # picked up again after their last committed chunk. run_import claims each one before running it.
+    db = SessionLocal()
+    try:
+        job_ids = get_claimable_import_job_ids(db)
+    finally:
+        db.close()
+
+    for job_id in job_ids:
+        enqueue_import(job_id)
+
+    return job_ids
+
+def start_import_watcher():
+    # Re-checks for abandoned jobs while the server runs, so jobs of a process that died are not left
+    # until the next restart
+    if watcher_started.is_set():
+        return
+    watcher_started.set()
+    threading.Thread(target=watch_imports, name="import-watcher", daemon=True).start()
+
+def watch_imports():
+    while True:
+        time.sleep(IMPORT_LEASE_SECONDS / 2)
+        try:
+            resume_imports()
+        except Exception as e:
+            print(f"Error resuming import jobs: {e}")
\ No newline at end of file
@@ -0,0 +1,13 @@
+from app.core import SessionLocal
+from app.crud.expense import reaudit_expenses
+
+def run_reaudit(company_id: int = None):
+    # Runs after a policy change, with its own session; company_id None re-audits every company
+    db = SessionLocal()
+    try:
+        return reaudit_expenses(db, company_id)
+    except Exception as e:
+        db.rollback()
+        print(f"Error re-auditing expenses for company {company_id}: {e}")
+    finally:
+        db.close()
\ No newline at end of file
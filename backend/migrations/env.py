@@ -5,7 +5,7 @@ from alembic import context
 import os
 from dotenv import load_dotenv
 from app.core.database import Base, engine
-from app.models import user, company, expense, policy
+from app.models import user, company, expense, policy, category_cache, import_job, expense_rollup, merchant_rule, idempotency_key, expense_stat
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
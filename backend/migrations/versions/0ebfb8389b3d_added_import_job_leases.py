@@ -0,0 +1,31 @@
+"""added import job leases
+
+Revision ID: 0ebfb8389b3d
+Revises: cd188b044621
+Create Date: 2026-10-19 10:27:36.918442
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0ebfb8389b3d'
+down_revision: Union[str, Sequence[str], None] = 'cd188b044621'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Jobs left running have no heartbeat, so the first worker to look claims them
+    op.add_column('import_jobs', sa.Column('worker_id', sa.String(), nullable=True))
+    op.add_column('import_jobs', sa.Column('heartbeat_at', sa.DateTime(timezone=True), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('import_jobs', 'heartbeat_at')
+    op.drop_column('import_jobs', 'worker_id')
@@ -0,0 +1,67 @@
+"""added expense fingerprints
+
+Revision ID: 160e03244953
+Revises: d7a92aab50d9
+Create Date: 2026-10-18 21:06:41.527903
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.utils.duplicates import expense_fingerprint
+
+
+# revision identifiers, used by Alembic.
+revision: str = '160e03244953'
+down_revision: Union[str, Sequence[str], None] = 'd7a92aab50d9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BACKFILL_BATCH_SIZE = 10000
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('expenses', sa.Column('fingerprint', sa.String(length=32), nullable=True))
+    op.add_column('import_jobs', sa.Column('rows_duplicate', sa.Integer(), server_default='0', nullable=True))
+
+    # Existing expenses get fingerprints too, so the first re-upload of an old statement is caught
+    expenses = sa.table('expenses',
+        sa.column('id', sa.Integer()),
+        sa.column('user_id', sa.Integer()),
+        sa.column('merchant', sa.String()),
+        sa.column('amount', sa.Float()),
+        sa.column('date', sa.DateTime()),
+        sa.column('fingerprint', sa.String()),
+    )
+    connection = op.get_bind()
+    last_id = 0
+    while True:
+        rows = connection.execute(
+            sa.select(expenses.c.id, expenses.c.user_id, expenses.c.merchant, expenses.c.amount, expenses.c.date)
+            .where(expenses.c.id > last_id)
+            .order_by(expenses.c.id)
+            .limit(BACKFILL_BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+
+        connection.execute(
+            expenses.update().where(expenses.c.id == sa.bindparam('expense_id')).values(fingerprint=sa.bindparam('new_fingerprint')),
+            [
+                {'expense_id': row.id, 'new_fingerprint': expense_fingerprint(row.user_id, row.merchant, row.amount, row.date)}
+                for row in rows
+            ]
+        )
+        last_id = rows[-1].id
+
+    op.create_index('ix_expenses_user_id_fingerprint', 'expenses', ['user_id', 'fingerprint'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_expenses_user_id_fingerprint', table_name='expenses')
+    op.drop_column('import_jobs', 'rows_duplicate')
+    op.drop_column('expenses', 'fingerprint')
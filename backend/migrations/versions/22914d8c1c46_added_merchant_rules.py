@@ -0,0 +1,41 @@
+"""added merchant rules
+
+Revision ID: 22914d8c1c46
+Revises: 6ba2eeee030a
+Create Date: 2026-10-18 18:02:14.671925
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '22914d8c1c46'
+down_revision: Union[str, Sequence[str], None] = '6ba2eeee030a'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('merchant_rules',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('merchant', sa.String(), nullable=True),
+    sa.Column('category', postgresql.ENUM('GENERAL', 'TRAVEL', 'FOOD', 'LODGING', 'TRANSPORTATION', 'SUPPLIES', 'OTHER', name='categoryenum', create_type=False), nullable=True),
+    sa.Column('source', sa.String(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_merchant_rules_id'), 'merchant_rules', ['id'], unique=False)
+    op.create_index(op.f('ix_merchant_rules_merchant'), 'merchant_rules', ['merchant'], unique=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_merchant_rules_merchant'), table_name='merchant_rules')
+    op.drop_index(op.f('ix_merchant_rules_id'), table_name='merchant_rules')
+    op.drop_table('merchant_rules')
@@ -0,0 +1,95 @@
+"""added expense stats
+
+Revision ID: 3c86676e1079
+Revises: 786a8372a1af
+Create Date: 2026-10-18 23:02:47.190254
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.utils.anomaly import RunningStats
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3c86676e1079'
+down_revision: Union[str, Sequence[str], None] = '786a8372a1af'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BACKFILL_BATCH_SIZE = 10000
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('expense_stats',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('company_id', sa.Integer(), nullable=False),
+    sa.Column('dimension', sa.String(), nullable=False),
+    sa.Column('dim_key', sa.String(), nullable=False),
+    sa.Column('category', sa.String(), nullable=False),
+    sa.Column('sample_count', sa.Integer(), nullable=False),
+    sa.Column('mean', sa.Float(), nullable=False),
+    sa.Column('m2', sa.Float(), nullable=False),
+    sa.Column('quantile_heights', sa.JSON(), nullable=False),
+    sa.Column('quantile_positions', sa.JSON(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.ForeignKeyConstraint(['company_id'], ['companies.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('company_id', 'category', 'dimension', 'dim_key', name='uq_expense_stats_company_category_dimension_key')
+    )
+    op.create_index(op.f('ix_expense_stats_id'), 'expense_stats', ['id'], unique=False)
+
+    # Backfill by replaying existing expenses in id order; keys match app/crud/expense_stat.py
+    expenses = sa.table('expenses',
+        sa.column('id', sa.Integer()),
+        sa.column('company_id', sa.Integer()),
+        sa.column('user_id', sa.Integer()),
+        sa.column('category', sa.String()),
+        sa.column('amount', sa.Float()),
+    )
+    connection = op.get_bind()
+    stats = {}
+    last_id = 0
+    while True:
+        rows = connection.execute(
+            sa.select(expenses.c.id, expenses.c.company_id, expenses.c.user_id, expenses.c.category, expenses.c.amount)
+            .where(expenses.c.id > last_id, expenses.c.company_id.isnot(None), expenses.c.category.isnot(None), expenses.c.amount.isnot(None))
+            .order_by(expenses.c.id)
+            .limit(BACKFILL_BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+
+        for row in rows:
+            category = row.category.lower()
+            stats.setdefault((row.company_id, category, 'company', 'all'), RunningStats()).push(row.amount)
+            if row.user_id is not None:
+                stats.setdefault((row.company_id, category, 'user', str(row.user_id)), RunningStats()).push(row.amount)
+        last_id = rows[-1].id
+
+    expense_stats = sa.table('expense_stats',
+        sa.column('company_id', sa.Integer()),
+        sa.column('category', sa.String()),
+        sa.column('dimension', sa.String()),
+        sa.column('dim_key', sa.String()),
+        sa.column('sample_count', sa.Integer()),
+        sa.column('mean', sa.Float()),
+        sa.column('m2', sa.Float()),
+        sa.column('quantile_heights', sa.JSON()),
+        sa.column('quantile_positions', sa.JSON()),
+    )
+    rows = [
+        dict(company_id=company_id, category=category, dimension=dimension, dim_key=dim_key, **running.as_values())
+        for (company_id, category, dimension, dim_key), running in sorted(stats.items())
+    ]
+    for start in range(0, len(rows), BACKFILL_BATCH_SIZE):
+        connection.execute(expense_stats.insert(), rows[start:start + BACKFILL_BATCH_SIZE])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_expense_stats_id'), table_name='expense_stats')
+    op.drop_table('expense_stats')
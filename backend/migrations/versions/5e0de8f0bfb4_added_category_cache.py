@@ -0,0 +1,44 @@
+"""added category cache
+
+Revision ID: 5e0de8f0bfb4
+Revises: 8d46548b9c09
+Create Date: 2026-10-18 09:12:41.503218
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5e0de8f0bfb4'
+down_revision: Union[str, Sequence[str], None] = '8d46548b9c09'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('category_cache',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('key', sa.String(), nullable=True),
+    sa.Column('merchant', sa.String(), nullable=True),
+    sa.Column('category', postgresql.ENUM('GENERAL', 'TRAVEL', 'FOOD', 'LODGING', 'TRANSPORTATION', 'SUPPLIES', 'OTHER', name='categoryenum', create_type=False), nullable=True),
+    sa.Column('expires_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_category_cache_id'), 'category_cache', ['id'], unique=False)
+    op.create_index(op.f('ix_category_cache_key'), 'category_cache', ['key'], unique=True)
+    op.create_index(op.f('ix_category_cache_expires_at'), 'category_cache', ['expires_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_category_cache_expires_at'), table_name='category_cache')
+    op.drop_index(op.f('ix_category_cache_key'), table_name='category_cache')
+    op.drop_index(op.f('ix_category_cache_id'), table_name='category_cache')
+    op.drop_table('category_cache')
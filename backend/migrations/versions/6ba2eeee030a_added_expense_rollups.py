@@ -0,0 +1,60 @@
+"""added expense rollups
+
+Revision ID: 6ba2eeee030a
+Revises: d5ea4c4e5127
+Create Date: 2026-10-18 17:05:31.448120
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6ba2eeee030a'
+down_revision: Union[str, Sequence[str], None] = 'd5ea4c4e5127'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('expense_rollups',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('company_id', sa.Integer(), nullable=False),
+    sa.Column('dimension', sa.String(), nullable=False),
+    sa.Column('dim_key', sa.String(), nullable=False),
+    sa.Column('month', sa.Date(), nullable=False),
+    sa.Column('expense_count', sa.Integer(), nullable=False),
+    sa.Column('total_amount', sa.Float(), nullable=False),
+    sa.Column('flagged_count', sa.Integer(), nullable=False),
+    sa.Column('flagged_amount', sa.Float(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.ForeignKeyConstraint(['company_id'], ['companies.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('company_id', 'dimension', 'month', 'dim_key', name='uq_expense_rollups_company_dimension_month_key')
+    )
+    op.create_index(op.f('ix_expense_rollups_id'), 'expense_rollups', ['id'], unique=False)
+
+    # Backfill from existing expenses; keys match app/crud/expense_rollup.py
+    for dimension, key in (
+        ('category', "COALESCE(lower(category::text), 'unknown')"),
+        ('user', "COALESCE(user_id::text, 'unknown')"),
+        ('merchant', "COALESCE(NULLIF(lower(btrim(merchant, E' \\t\\r\\n')), ''), 'unknown')"),
+    ):
+        op.execute(f"""
+            INSERT INTO expense_rollups (company_id, dimension, dim_key, month, expense_count, total_amount, flagged_count, flagged_amount)
+            SELECT company_id, '{dimension}', {key}, date_trunc('month', date)::date,
+                   count(*), COALESCE(sum(amount), 0),
+                   count(*) FILTER (WHERE is_flagged), COALESCE(sum(amount) FILTER (WHERE is_flagged), 0)
+            FROM expenses
+            WHERE company_id IS NOT NULL AND date IS NOT NULL
+            GROUP BY 1, 3, 4
+        """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_expense_rollups_id'), table_name='expense_rollups')
+    op.drop_table('expense_rollups')
@@ -0,0 +1,29 @@
+"""added company listing indexes
+
+Revision ID: 6c47f47b6695
+Revises: 739ce6dbc66c
+Create Date: 2026-10-18 13:41:05.617329
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6c47f47b6695'
+down_revision: Union[str, Sequence[str], None] = '739ce6dbc66c'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_expenses_company_id_date', 'expenses', ['company_id', 'date'], unique=False)
+    op.create_index(op.f('ix_users_company_id'), 'users', ['company_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_users_company_id'), table_name='users')
+    op.drop_index('ix_expenses_company_id_date', table_name='expenses')
@@ -0,0 +1,53 @@
+"""added import jobs
+
+Revision ID: 739ce6dbc66c
+Revises: c99fa5a11988
+Create Date: 2026-10-18 11:27:52.190374
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '739ce6dbc66c'
+down_revision: Union[str, Sequence[str], None] = 'c99fa5a11988'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('import_jobs',
+    sa.Column('id', sa.String(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=True),
+    sa.Column('company_id', sa.Integer(), nullable=True),
+    sa.Column('filename', sa.String(), nullable=True),
+    sa.Column('file_path', sa.String(), nullable=True),
+    sa.Column('status', sa.Enum('QUEUED', 'RUNNING', 'COMPLETED', 'FAILED', name='importjobstatus'), nullable=True),
+    sa.Column('rows_processed', sa.Integer(), nullable=True),
+    sa.Column('rows_inserted', sa.Integer(), nullable=True),
+    sa.Column('rows_flagged', sa.Integer(), nullable=True),
+    sa.Column('rows_failed', sa.Integer(), nullable=True),
+    sa.Column('chunks_completed', sa.Integer(), nullable=True),
+    sa.Column('error', sa.String(), nullable=True),
+    sa.Column('started_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('finished_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+    sa.ForeignKeyConstraint(['company_id'], ['companies.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_import_jobs_id'), 'import_jobs', ['id'], unique=False)
+    op.create_index(op.f('ix_import_jobs_status'), 'import_jobs', ['status'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_import_jobs_status'), table_name='import_jobs')
+    op.drop_index(op.f('ix_import_jobs_id'), table_name='import_jobs')
+    op.drop_table('import_jobs')
+    sa.Enum(name='importjobstatus').drop(op.get_bind(), checkfirst=True)
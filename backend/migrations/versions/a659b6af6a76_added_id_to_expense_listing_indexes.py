@@ -0,0 +1,43 @@
+"""added id to expense listing indexes
+
+Revision ID: a659b6af6a76
+Revises: 0ebfb8389b3d
+Create Date: 2026-10-19 15:08:12.406193
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a659b6af6a76'
+down_revision: Union[str, Sequence[str], None] = '0ebfb8389b3d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Listings order by date DESC, id DESC; with id last the filtered pages need no sort step.
+    # The new indexes are built before the old ones are dropped so listings never lose an index.
+    with op.get_context().autocommit_block():
+        op.create_index('ix_expenses_company_id_date_id', 'expenses', ['company_id', 'date', 'id'], unique=False, postgresql_concurrently=True)
+        op.create_index('ix_expenses_user_id_date_id', 'expenses', ['user_id', 'date', 'id'], unique=False, postgresql_concurrently=True)
+        op.create_index('ix_expenses_flagged_user_id_date_id', 'expenses', ['user_id', 'date', 'id'], unique=False, postgresql_where=sa.text('is_flagged IS true'), postgresql_concurrently=True)
+        op.drop_index('ix_expenses_flagged_user_id_date', table_name='expenses', postgresql_concurrently=True)
+        op.drop_index('ix_expenses_user_id_date', table_name='expenses', postgresql_concurrently=True)
+        op.drop_index('ix_expenses_company_id_date', table_name='expenses', postgresql_concurrently=True)
+    op.execute('ANALYZE expenses')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.create_index('ix_expenses_company_id_date', 'expenses', ['company_id', 'date'], unique=False, postgresql_concurrently=True)
+        op.create_index('ix_expenses_user_id_date', 'expenses', ['user_id', 'date'], unique=False, postgresql_concurrently=True)
+        op.create_index('ix_expenses_flagged_user_id_date', 'expenses', ['user_id', 'date'], unique=False, postgresql_where=sa.text('is_flagged IS true'), postgresql_concurrently=True)
+        op.drop_index('ix_expenses_flagged_user_id_date_id', table_name='expenses', postgresql_concurrently=True)
+        op.drop_index('ix_expenses_user_id_date_id', table_name='expenses', postgresql_concurrently=True)
+        op.drop_index('ix_expenses_company_id_date_id', table_name='expenses', postgresql_concurrently=True)
@@ -0,0 +1,27 @@
+"""added policy company category index
+
+Revision ID: c99fa5a11988
+Revises: 5e0de8f0bfb4
+Create Date: 2026-10-18 10:03:17.284905
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c99fa5a11988'
+down_revision: Union[str, Sequence[str], None] = '5e0de8f0bfb4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_policies_company_id_category', 'policies', ['company_id', 'category'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_policies_company_id_category', table_name='policies')
@@ -0,0 +1,40 @@
+"""scoped merchant rules to companies
+
+Revision ID: cd188b044621
+Revises: 3c86676e1079
+Create Date: 2026-10-19 09:41:12.503817
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'cd188b044621'
+down_revision: Union[str, Sequence[str], None] = '3c86676e1079'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Existing rules were recorded for every company from any edit and cannot be attributed to one
+    op.execute("DELETE FROM merchant_rules")
+    op.add_column('merchant_rules', sa.Column('company_id', sa.Integer(), nullable=False))
+    op.create_foreign_key('merchant_rules_company_id_fkey', 'merchant_rules', 'companies', ['company_id'], ['id'])
+    op.drop_index(op.f('ix_merchant_rules_merchant'), table_name='merchant_rules')
+    op.create_index(op.f('ix_merchant_rules_merchant'), 'merchant_rules', ['merchant'], unique=False)
+    op.create_unique_constraint('uq_merchant_rules_company_merchant', 'merchant_rules', ['company_id', 'merchant'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Rules of different companies may share a merchant, which the old unique index does not allow
+    op.execute("DELETE FROM merchant_rules")
+    op.drop_constraint('uq_merchant_rules_company_merchant', 'merchant_rules', type_='unique')
+    op.drop_index(op.f('ix_merchant_rules_merchant'), table_name='merchant_rules')
+    op.create_index(op.f('ix_merchant_rules_merchant'), 'merchant_rules', ['merchant'], unique=True)
+    op.drop_constraint('merchant_rules_company_id_fkey', 'merchant_rules', type_='foreignkey')
+    op.drop_column('merchant_rules', 'company_id')
@@ -0,0 +1,38 @@
+"""added expense query indexes
+
+Revision ID: d5ea4c4e5127
+Revises: 6c47f47b6695
+Create Date: 2026-10-18 14:22:48.903551
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd5ea4c4e5127'
+down_revision: Union[str, Sequence[str], None] = '6c47f47b6695'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Built concurrently so a large expenses table stays writable while the indexes build
+    with op.get_context().autocommit_block():
+        op.create_index('ix_expenses_date_id', 'expenses', ['date', 'id'], unique=False, postgresql_concurrently=True)
+        op.create_index('ix_expenses_user_id_date', 'expenses', ['user_id', 'date'], unique=False, postgresql_concurrently=True)
+        op.create_index('ix_expenses_flagged_date', 'expenses', ['date', 'id'], unique=False, postgresql_where=sa.text('is_flagged IS true'), postgresql_concurrently=True)
+        op.create_index('ix_expenses_flagged_user_id_date', 'expenses', ['user_id', 'date'], unique=False, postgresql_where=sa.text('is_flagged IS true'), postgresql_concurrently=True)
+    op.execute('ANALYZE expenses')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_expenses_flagged_user_id_date', table_name='expenses', postgresql_concurrently=True)
+        op.drop_index('ix_expenses_flagged_date', table_name='expenses', postgresql_concurrently=True)
+        op.drop_index('ix_expenses_user_id_date', table_name='expenses', postgresql_concurrently=True)
+        op.drop_index('ix_expenses_date_id', table_name='expenses', postgresql_concurrently=True)
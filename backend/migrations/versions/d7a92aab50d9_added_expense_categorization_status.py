@@ -0,0 +1,36 @@
+"""added expense categorization status
+
+Revision ID: d7a92aab50d9
+Revises: 22914d8c1c46
+Create Date: 2026-10-18 18:47:09.318452
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd7a92aab50d9'
+down_revision: Union[str, Sequence[str], None] = '22914d8c1c46'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+categorization_status = postgresql.ENUM('PENDING', 'COMPLETED', 'FAILED', name='categorizationstatus', create_type=False)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    categorization_status.create(op.get_bind(), checkfirst=True)
+    # Existing expenses were categorized inline, so they start out completed
+    op.add_column('expenses', sa.Column('categorization_status', categorization_status, server_default='COMPLETED', nullable=True))
+    op.create_index('ix_expenses_categorization_pending', 'expenses', ['id'], unique=False, postgresql_where=sa.text("categorization_status = 'PENDING'"))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_expenses_categorization_pending', table_name='expenses')
+    op.drop_column('expenses', 'categorization_status')
+    categorization_status.drop(op.get_bind(), checkfirst=True)
@@ -0,0 +1,30 @@
+"""added expense categorization claims
+
+Revision ID: d7b571bbaf9e
+Revises: a659b6af6a76
+Create Date: 2026-10-19 16:42:51.270318
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd7b571bbaf9e'
+down_revision: Union[str, Sequence[str], None] = 'a659b6af6a76'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Nullable without a default, so adding it does not rewrite the expenses table; unclaimed pending
+    # expenses are picked up by the first worker that looks
+    op.add_column('expenses', sa.Column('categorization_claimed_at', sa.DateTime(timezone=True), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('expenses', 'categorization_claimed_at')
@@ -0,0 +1,107 @@
+"""Measure how often each categorization tier answers, how accurate it is, and what it costs per row.
+
+Run from the backend directory, either against labeled expenses already in the database:
+
+    python scripts/benchmark_classifier.py --limit 50000
+
+or against a CSV with merchant, description and category columns:
+
+    python scripts/benchmark_classifier.py --csv labeled_expenses.csv
+
+The rows are shuffled and split into a training set for the naive Bayes tier and a held-out
+test set. Every test row goes through the keyword/merchant-rule tier and then the model tier;
+rows neither tier is confident about are counted as LLM fallbacks (no API calls are made).
+"""
+import argparse
+import csv
+import os
+import random
+import statistics
+import sys
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.classifier import CLASSIFIER_MIN_CONFIDENCE, LocalClassifier
+
+def load_csv(path):
+    with open(path, encoding="utf-8", newline="") as csv_file:
+        return [
+            ({"merchant": row.get("merchant", ""), "description": row.get("description", "")}, row["category"].strip().lower())
+            for row in csv.DictReader(csv_file)
+            if row.get("category")
+        ]
+
+def load_database(limit):
+    from app.core import SessionLocal
+    from app.models import Expense
+
+    db = SessionLocal()
+    try:
+        rows = (
+            db.query(Expense.merchant, Expense.description, Expense.category)
+            .filter(Expense.category.isnot(None))
+            .order_by(Expense.id.desc())
+            .limit(limit)
+            .all()
+        )
+    finally:
+        db.close()
+
+    return [({"merchant": merchant, "description": description}, category.value) for merchant, description, category in rows]
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--csv", help="labeled CSV instead of the expenses table")
+    parser.add_argument("--limit", type=int, default=50000, help="most recent expenses to load from the database")
+    parser.add_argument("--test-fraction", type=float, default=0.2)
+    parser.add_argument("--min-confidence", type=float, default=CLASSIFIER_MIN_CONFIDENCE)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    examples = load_csv(args.csv) if args.csv else load_database(args.limit)
+    if len(examples) < 10:
+        sys.exit("Need at least 10 labeled expenses")
+
+    random.Random(args.seed).shuffle(examples)
+    split = int(len(examples) * (1 - args.test_fraction))
+    training, testing = examples[:split], examples[split:]
+
+    classifier = LocalClassifier(min_confidence=args.min_confidence, session_factory=None)
+    start = time.perf_counter()
+    model = classifier.train(training)
+    training_seconds = time.perf_counter() - start
+
+    tiers = Counter()
+    correct = Counter()
+    latencies = []
+
+    for expense_data, expected in testing:
+        start = time.perf_counter()
+        category, _, tier = classifier.classify(expense_data)
+        latencies.append((time.perf_counter() - start) * 1_000_000)
+
+        tier = tier or "llm"
+        tiers[tier] += 1
+        if category == expected:
+            correct[tier] += 1
+
+    print(f"Training rows: {len(training)} ({'model trained' if model else 'too few rows, model tier disabled'}) in {training_seconds:.2f}s")
+    print(f"Test rows: {len(testing)}, min confidence {args.min_confidence}\n")
+
+    print(f"{'tier':<8} {'hit rate':>9} {'accuracy':>9}")
+    for tier in ("rule", "model", "llm"):
+        hits = tiers[tier]
+        accuracy = f"{correct[tier] / hits:.1%}" if hits and tier != "llm" else "-"
+        print(f"{tier:<8} {hits / len(testing):>9.1%} {accuracy:>9}")
+
+    print(f"\nPer-row latency (local tiers): median {statistics.median(latencies):.1f}us, "
+          f"p95 {percentile(latencies, 0.95):.1f}us, p99 {percentile(latencies, 0.99):.1f}us")
+
+if __name__ == "__main__":
+    main()
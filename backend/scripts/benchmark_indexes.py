@@ -0,0 +1,202 @@
+"""Compare expense query plans and latencies with and without the query indexes.
+
+Run from the backend directory against a scratch PostgreSQL database (never production):
+
+    BENCHMARK_DATABASE_URL=postgresql://... python scripts/benchmark_indexes.py --expenses 2000000
+
+The script creates the schema if needed, fills it with synthetic companies, users and
+expenses, then runs the same queries the CRUD layer issues twice: once with the indexes
+from migrations d5ea4c4e5127 and a659b6af6a76 (and the earlier listing indexes) dropped, and once with them
+rebuilt. For each query it prints the EXPLAIN ANALYZE plan and the median latency.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if os.getenv("BENCHMARK_DATABASE_URL"):
+    os.environ.setdefault("DATABASE_URL", os.environ["BENCHMARK_DATABASE_URL"])
+
+from sqlalchemy import create_engine, text
+from app.core import Base
+from app.models import Expense, Policy, User
+
+BENCHMARKED_INDEXES = [
+    index
+    for table in (Expense.__table__, Policy.__table__, User.__table__)
+    for index in table.indexes
+    if index.name in {
+        "ix_expenses_date_id",
+        "ix_expenses_company_id_date_id",
+        "ix_expenses_user_id_date_id",
+        "ix_expenses_flagged_date",
+        "ix_expenses_flagged_user_id_date_id",
+        "ix_policies_company_id_category",
+        "ix_users_company_id",
+    }
+]
+
+QUERIES = {
+    "user expenses, first page": """
+        SELECT * FROM expenses WHERE user_id = :user_id
+        ORDER BY date DESC, id DESC LIMIT 100
+    """,
+    # app/utils/pagination.py issues the row-value form; the expanded OR form is kept for comparison
+    # because it cannot start an index range scan, so its pages slow down the deeper the cursor is
+    "user expenses, keyset page": """
+        SELECT * FROM expenses WHERE user_id = :user_id
+          AND (date, id) < (:cursor_date, :cursor_id)
+        ORDER BY date DESC, id DESC LIMIT 100
+    """,
+    "user expenses, keyset page (OR form)": """
+        SELECT * FROM expenses WHERE user_id = :user_id
+          AND (date < :cursor_date OR (date = :cursor_date AND id < :cursor_id))
+        ORDER BY date DESC, id DESC LIMIT 100
+    """,
+    "company expenses, keyset page": """
+        SELECT * FROM expenses WHERE company_id = :company_id
+          AND (date, id) < (:cursor_date, :cursor_id)
+        ORDER BY date DESC, id DESC LIMIT 100
+    """,
+    "all expenses, deep keyset page": """
+        SELECT * FROM expenses WHERE (date, id) < (:deep_cursor_date, :cursor_id)
+        ORDER BY date DESC, id DESC LIMIT 100
+    """,
+    "all expenses, deep keyset page (OR form)": """
+        SELECT * FROM expenses
+        WHERE date < :deep_cursor_date OR (date = :deep_cursor_date AND id < :cursor_id)
+        ORDER BY date DESC, id DESC LIMIT 100
+    """,
+    "company expenses, date range": """
+        SELECT * FROM expenses WHERE company_id = :company_id
+          AND date >= :start_date AND date <= :end_date
+        ORDER BY date DESC, id DESC LIMIT 100
+    """,
+    "all expenses, deep offset page": """
+        SELECT * FROM expenses ORDER BY date DESC, id DESC OFFSET 50000 LIMIT 100
+    """,
+    "flagged expenses": """
+        SELECT * FROM expenses WHERE is_flagged IS true
+        ORDER BY date DESC, id DESC LIMIT 100
+    """,
+    "user flagged expenses": """
+        SELECT * FROM expenses WHERE is_flagged IS true AND user_id = :user_id
+        ORDER BY date DESC, id DESC LIMIT 100
+    """,
+    "company users": """
+        SELECT * FROM users WHERE company_id = :company_id ORDER BY id LIMIT 100
+    """,
+    "company policies": """
+        SELECT * FROM policies WHERE company_id = :company_id OR company_id IS NULL ORDER BY id
+    """,
+}
+
+PARAMS = {
+    "user_id": 42,
+    "company_id": 7,
+    "cursor_date": "2024-06-30",
+    "deep_cursor_date": "2023-02-01",
+    "cursor_id": 10 ** 9,
+    "start_date": "2024-03-01",
+    "end_date": "2024-03-31",
+}
+
+def seed(connection, companies, users, expenses, policies):
+    print(f"Seeding {companies} companies, {users} users, {expenses} expenses, {policies} policies...")
+    connection.execute(text("""
+        INSERT INTO companies (name)
+        SELECT 'Company ' || g FROM generate_series(1, :companies) g
+    """), {"companies": companies})
+    connection.execute(text("""
+        INSERT INTO users (company_id, firebase_id, username, email, login_method, role)
+        SELECT 1 + g % :companies, 'bench-' || g, 'bench-user-' || g, 'bench-' || g || '@example.com', 'email', 'EMPLOYEE'
+        FROM generate_series(1, :users) g
+    """), {"companies": companies, "users": users})
+    connection.execute(text("""
+        INSERT INTO expenses (company_id, user_id, merchant, amount, date, description, category, is_approved, is_flagged)
+        SELECT 1 + u % :companies, u, 'Merchant ' || (g % 5000), round((random() * 2000)::numeric, 2),
+               timestamp '2023-01-01' + (g % 730) * interval '1 day',
+               'synthetic expense',
+               (ARRAY['GENERAL','TRAVEL','FOOD','LODGING','TRANSPORTATION','SUPPLIES','OTHER'])[1 + g % 7]::categoryenum,
+               g % 20 <> 0, g % 20 = 0
+        FROM (SELECT g, 1 + (g * 7919) % :users AS u FROM generate_series(1, :expenses) g) s
+    """), {"companies": companies, "users": users, "expenses": expenses})
+    connection.execute(text("""
+        INSERT INTO policies (company_id, name, category, rule_type, rule_value, policy_type)
+        SELECT CASE WHEN g % 10 = 0 THEN NULL ELSE 1 + g % :companies END, 'Policy ' || g,
+               (ARRAY['GENERAL','TRAVEL','FOOD','LODGING','TRANSPORTATION','SUPPLIES','OTHER'])[1 + g % 7]::categoryenum,
+               'amount_max', to_json(100 + g % 900), CASE WHEN g % 2 = 0 THEN 'HARD' ELSE 'SOFT' END::policytype
+        FROM generate_series(1, :policies) g
+    """), {"companies": companies, "policies": policies})
+
+def run_queries(connection, repeats):
+    connection.execute(text("ANALYZE"))
+    results = {}
+
+    for name, sql in QUERIES.items():
+        plan = connection.execute(text(f"EXPLAIN (ANALYZE, BUFFERS) {sql}"), PARAMS).scalars().all()
+
+        timings = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            connection.execute(text(sql), PARAMS).fetchall()
+            timings.append((time.perf_counter() - start) * 1000)
+
+        results[name] = (statistics.median(timings), plan)
+
+    return results
+
+def print_results(label, results):
+    print(f"\n===== {label} =====")
+    for name, (median_ms, plan) in results.items():
+        print(f"\n--- {name}: median {median_ms:.2f} ms")
+        for line in plan:
+            print(f"    {line}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--companies", type=int, default=200)
+    parser.add_argument("--users", type=int, default=20000)
+    parser.add_argument("--expenses", type=int, default=2000000)
+    parser.add_argument("--policies", type=int, default=2000)
+    parser.add_argument("--repeats", type=int, default=20)
+    parser.add_argument("--reseed", action="store_true", help="truncate and regenerate the synthetic data")
+    args = parser.parse_args()
+
+    url = os.getenv("BENCHMARK_DATABASE_URL")
+    if not url or not url.startswith("postgresql"):
+        sys.exit("Set BENCHMARK_DATABASE_URL to a scratch PostgreSQL database")
+
+    engine = create_engine(url)
+    Base.metadata.create_all(bind=engine)
+
+    with engine.begin() as connection:
+        existing = connection.execute(text("SELECT count(*) FROM expenses")).scalar()
+        if args.reseed and existing:
+            connection.execute(text("TRUNCATE expenses, policies, users, companies RESTART IDENTITY CASCADE"))
+            existing = 0
+        if not existing:
+            seed(connection, args.companies, args.users, args.expenses, args.policies)
+
+    with engine.begin() as connection:
+        for index in BENCHMARKED_INDEXES:
+            index.drop(connection, checkfirst=True)
+        before = run_queries(connection, args.repeats)
+
+    with engine.begin() as connection:
+        for index in BENCHMARKED_INDEXES:
+            index.create(connection, checkfirst=True)
+        after = run_queries(connection, args.repeats)
+
+    print_results("Without query indexes", before)
+    print_results("With query indexes", after)
+
+    print("\n===== Summary (median ms) =====")
+    for name in QUERIES:
+        before_ms, after_ms = before[name][0], after[name][0]
+        print(f"{name:<42} {before_ms:>10.2f} {after_ms:>10.2f} {before_ms / after_ms if after_ms else 0:>8.1f}x")
+
+if __name__ == "__main__":
+    main()
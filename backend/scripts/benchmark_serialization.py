@@ -0,0 +1,121 @@
+"""Compare rows/sec of the old and new ways list routes turn expenses into a JSON response body.
+
+Run from the backend directory. By default it fills an in-memory SQLite database with
+synthetic expenses; point it at a scratch PostgreSQL database to include real driver costs:
+
+    python scripts/benchmark_serialization.py --page-sizes 100 1000 5000
+    BENCHMARK_DATABASE_URL=postgresql://... python scripts/benchmark_serialization.py
+
+"Pydantic" is what list routes did before: load Expense entities, validate the page against
+list[ExpenseResponse] with from_attributes, dump it to JSON-compatible Python and json.dumps
+it, as FastAPI does for response_model. "Rows + orjson" is the current path: select only the
+response columns and encode the rows with app.utils.serialization.rows_json. Both are timed
+with and without the query that loads the page.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", os.getenv("BENCHMARK_DATABASE_URL") or "sqlite://")
+
+from pydantic import TypeAdapter
+from sqlalchemy import create_engine, func, insert, select
+from sqlalchemy.orm import Session
+from app.core import Base
+from app.crud.expense import EXPENSE_ORDER, EXPENSE_RESPONSE_COLUMNS
+from app.models import CategoryEnum, Company, Expense, User
+from app.schemas.expense import ExpenseResponse
+from app.utils.serialization import rows_json
+
+CATEGORIES = list(CategoryEnum)
+
+def seed(db, expenses):
+    print(f"Seeding {expenses} expenses...")
+    company_id = db.execute(insert(Company).values(name=f"Benchmark {time.time()}").returning(Company.id)).scalar()
+    user_id = db.execute(insert(User).values(
+        company_id=company_id,
+        firebase_id=f"bench-{company_id}",
+        username=f"bench-{company_id}",
+        email=f"bench-{company_id}@example.com",
+        login_method="email"
+    ).returning(User.id)).scalar()
+
+    start = datetime(2024, 1, 1)
+    for offset in range(0, expenses, 10000):
+        db.execute(insert(Expense), [
+            {
+                "company_id": company_id,
+                "user_id": user_id,
+                "merchant": f"Merchant {i % 5000}",
+                "amount": round(i % 200000 / 100, 2),
+                "date": start + timedelta(minutes=i),
+                "description": "synthetic expense",
+                "category": CATEGORIES[i % len(CATEGORIES)],
+                "is_approved": i % 20 != 0,
+                "is_flagged": i % 20 == 0,
+                "flag_reason": "Amount exceeds policy" if i % 20 == 0 else None,
+            }
+            for i in range(offset, min(offset + 10000, expenses))
+        ])
+    db.commit()
+
+def page_query(columns, limit):
+    return select(*columns).order_by(*[column.desc() for column in EXPENSE_ORDER]).limit(limit)
+
+def pydantic_body(adapter, expenses):
+    return json.dumps(adapter.dump_python(adapter.validate_python(expenses, from_attributes=True), mode="json")).encode("utf-8")
+
+def measure(function, rows, repeats):
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return rows / statistics.median(timings)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--expenses", type=int, default=100000)
+    parser.add_argument("--page-sizes", type=int, nargs="+", default=[100, 1000, 5000])
+    parser.add_argument("--repeats", type=int, default=20)
+    args = parser.parse_args()
+
+    engine = create_engine(os.environ["DATABASE_URL"])
+    Base.metadata.create_all(bind=engine)
+    adapter = TypeAdapter(list[ExpenseResponse])
+
+    with Session(engine) as db:
+        if db.scalar(select(func.count(Expense.id))) < max(args.page_sizes):
+            seed(db, args.expenses)
+
+        print(f"\n{'page size':>9} {'path':<16} {'serialize rows/s':>17} {'query+serialize rows/s':>23}")
+        for limit in args.page_sizes:
+            entities = db.scalars(page_query((Expense,), limit)).all()
+            rows = db.execute(page_query(EXPENSE_RESPONSE_COLUMNS, limit)).all()
+            if json.loads(pydantic_body(adapter, entities)) != json.loads(rows_json(rows)):
+                sys.exit("The two paths produced different JSON")
+
+            def pydantic_path():
+                db.expunge_all()
+                pydantic_body(adapter, db.scalars(page_query((Expense,), limit)).all())
+
+            def rows_path():
+                rows_json(db.execute(page_query(EXPENSE_RESPONSE_COLUMNS, limit)).all())
+
+            results = {
+                "Pydantic": (measure(lambda: pydantic_body(adapter, entities), len(entities), args.repeats), measure(pydantic_path, len(entities), args.repeats)),
+                "Rows + orjson": (measure(lambda: rows_json(rows), len(rows), args.repeats), measure(rows_path, len(rows), args.repeats)),
+            }
+            for path, (serialize, total) in results.items():
+                print(f"{limit:>9} {path:<16} {serialize:>17,.0f} {total:>23,.0f}")
+
+            speedup = results["Rows + orjson"][1] / results["Pydantic"][1]
+            print(f"{'':>9} {'speedup':<16} {results['Rows + orjson'][0] / results['Pydantic'][0]:>16.1f}x {speedup:>22.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,35 @@
+"""Recompute the expense_stats table anomaly rules score against from the expenses table.
+
+Run from the backend directory:
+
+    python scripts/rebuild_expense_stats.py                  # every company
+    python scripts/rebuild_expense_stats.py --company-id 7   # one company
+
+Stats are kept up to date as expenses are written, so this is only needed after changing
+expenses outside the API, or to refresh quantile estimates after many edits and deletes
+(those only adjust the mean and variance incrementally).
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core import SessionLocal
+from app.crud.expense_stat import rebuild_expense_stats
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--company-id", type=int, default=None, help="only rebuild this company's stats")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        result = rebuild_expense_stats(db, args.company_id)
+    finally:
+        db.close()
+
+    print(f"Rebuilt {result['stats']} stats rows from {result['expenses']} expenses")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,34 @@
+"""Recompute the expense_rollups table from the expenses table.
+
+Run from the backend directory:
+
+    python scripts/rebuild_rollups.py                  # every company
+    python scripts/rebuild_rollups.py --company-id 7   # one company
+
+Rollups are kept up to date as expenses are written, so this is only needed after
+changing expenses outside the API (manual SQL, restores) or to check for drift.
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core import SessionLocal
+from app.crud.expense_rollup import rebuild_rollups
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--company-id", type=int, default=None, help="only rebuild this company's rollups")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        result = rebuild_rollups(db, args.company_id)
+    finally:
+        db.close()
+
+    print(f"Rebuilt {result['rollups']} rollup rows from {result['expenses']} expenses")
+
+if __name__ == "__main__":
+    main()
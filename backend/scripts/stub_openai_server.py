@@ -0,0 +1,78 @@
+"""Minimal stand-in for the OpenAI chat completions API, for exercising the AI client locally.
+
+Run it, then point the backend at it:
+
+    python scripts/stub_openai_server.py --port 8787 --latency 0.2 --failure-rate 0.1
+    OPENAI_BASE_URL=http://127.0.0.1:8787/v1 OPENAPI_KEY=stub uvicorn app.main:app
+
+Single-expense prompts are answered with --category. Batch prompts get one "<n>: <category>"
+line per numbered expense. --failure-rate answers that share of requests with HTTP 500 and
+--latency delays every answer, so timeouts, retries and the circuit breaker can be watched
+in GET /api/metrics.
+"""
+import argparse
+import json
+import random
+import re
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+EXPENSE_LINE = re.compile(r"^\s*(\d+)\. Merchant:", re.MULTILINE)
+
+def make_handler(args):
+    class StubHandler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            time.sleep(args.latency)
+
+            if not self.path.endswith("/chat/completions"):
+                return self.respond(404, {"error": {"message": "Not found"}})
+            if random.random() < args.failure_rate:
+                return self.respond(500, {"error": {"message": "Stub failure", "type": "server_error"}})
+
+            prompt = body["messages"][-1]["content"]
+            numbers = EXPENSE_LINE.findall(prompt)
+            content = "\n".join(f"{number}: {args.category}" for number in numbers) if numbers else args.category
+
+            self.respond(200, {
+                "id": "chatcmpl-stub",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": body.get("model", "stub"),
+                "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": content}}],
+                "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+            })
+
+        def respond(self, status, payload):
+            data = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *log_args):
+            if args.verbose:
+                super().log_message(format, *log_args)
+
+    return StubHandler
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8787)
+    parser.add_argument("--category", default="general")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds to wait before answering")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="share of requests answered with HTTP 500")
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(args))
+    print(f"Stub OpenAI API listening on http://{args.host}:{args.port}/v1")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
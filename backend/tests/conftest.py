@@ -0,0 +1,50 @@
+import os
+import sys
+import tempfile
+from contextlib import contextmanager
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# The app builds its engines from DATABASE_URL at import time, so point it at a scratch SQLite file first
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'test.db')}"
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from app.api import analytics_router, company_router, expense_router, import_router, metrics_router, policy_router, user_router
+from app.core import Base, SessionLocal, engine
+
+@pytest.fixture
+def db():
+    Base.metadata.create_all(bind=engine)
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+        Base.metadata.drop_all(bind=engine)
+
+@pytest.fixture
+def client(db):
+    # app.main also initializes Firebase, which the routes under test do not need
+    app = FastAPI()
+    for router in (analytics_router, company_router, expense_router, import_router, metrics_router, policy_router, user_router):
+        app.include_router(router, prefix="/api")
+    return TestClient(app)
+
+@pytest.fixture
+def count_queries():
+    @contextmanager
+    def counter():
+        statements = []
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(engine, "before_cursor_execute", record)
+        try:
+            yield statements
+        finally:
+            event.remove(engine, "before_cursor_execute", record)
+
+    return counter
\ No newline at end of file
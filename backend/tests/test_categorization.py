@@ -0,0 +1,47 @@
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import null
+from app.crud.expense import CATEGORIZATION_LEASE_SECONDS, claim_categorization, get_pending_expense_ids
+from app.models import CategorizationStatus, Expense
+from app.workers import categorization
+
+def seed(db):
+    expense = Expense(merchant="Cafe", amount=4.5, date=datetime(2024, 1, 1), category=null(), categorization_status=CategorizationStatus.PENDING)
+    db.add(expense)
+    db.commit()
+    return expense.id
+
+def test_only_one_worker_claims_a_pending_expense(db):
+    expense_id = seed(db)
+
+    assert get_pending_expense_ids(db) == [expense_id]
+    assert claim_categorization(db, expense_id)
+    assert not claim_categorization(db, expense_id)
+    assert get_pending_expense_ids(db) == []
+
+def test_abandoned_claims_expire(db):
+    expense_id = seed(db)
+    claim_categorization(db, expense_id)
+
+    expired = datetime.now(timezone.utc) - timedelta(seconds=CATEGORIZATION_LEASE_SECONDS + 1)
+    db.query(Expense).filter(Expense.id == expense_id).update({"categorization_claimed_at": expired})
+    db.commit()
+
+    assert get_pending_expense_ids(db) == [expense_id]
+    assert claim_categorization(db, expense_id)
+
+def test_expense_claimed_elsewhere_is_not_categorized_again(db, monkeypatch):
+    expense_id = seed(db)
+    calls = []
+    monkeypatch.setattr(categorization, "categorize_expense", lambda expense_data: calls.append(expense_data) or "food")
+
+    claim_categorization(db, expense_id)
+    categorization.run_categorization(expense_id)
+    assert calls == []
+
+    db.query(Expense).filter(Expense.id == expense_id).update({"categorization_claimed_at": None})
+    db.commit()
+    categorization.run_categorization(expense_id)
+
+    db.expire_all()
+    assert len(calls) == 1
+    assert db.get(Expense, expense_id).categorization_status == CategorizationStatus.COMPLETED
\ No newline at end of file
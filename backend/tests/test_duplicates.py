@@ -0,0 +1,38 @@
+from datetime import datetime
+from app.crud.expense import process_csv
+from app.models import Expense, User
+from app.utils.duplicates import expense_fingerprint
+
+CSV_HEADER = "merchant,amount,date,description\n"
+
+def seed(db):
+    user = User(firebase_id="user", username="user", email="user@example.com", login_method="email")
+    db.add(user)
+    db.commit()
+    return user.id
+
+def import_csv(db, user_id, lines, chunk_size=2):
+    return process_csv(db, user_id, None, CSV_HEADER + "".join(lines), [], lambda expense_data: "general", chunk_size=chunk_size)
+
+def test_rows_the_user_already_has_are_skipped(db):
+    user_id = seed(db)
+    date = datetime(2024, 1, 1)
+    db.add(Expense(user_id=user_id, merchant="Cafe", amount=4.5, date=date, category="general", fingerprint=expense_fingerprint(user_id, "Cafe", 4.5, date)))
+    db.commit()
+
+    stats = import_csv(db, user_id, ["  CAFE ,4.50,2024-01-01,x\n", "Cafe,4.50,2024-01-02,x\n"])
+
+    assert stats["duplicates"] == 1
+    assert db.query(Expense).filter(Expense.user_id == user_id).count() == 2
+
+def test_lines_repeated_within_the_file_are_skipped(db):
+    user_id = seed(db)
+    # Repeats inside one chunk and across chunks
+    lines = ["Cafe,4.50,2024-01-01,x\n", "cafe,4.5,2024-01-01,y\n", "Deli,8,2024-01-01,x\n", "Cafe,4.50,2024-01-01,z\n", "Deli,8,2024-01-02,x\n"]
+
+    stats = import_csv(db, user_id, lines)
+
+    assert stats["duplicates"] == 2
+    assert sorted((expense.merchant, expense.date.day) for expense in db.query(Expense)) == [("Cafe", 1), ("Deli", 1), ("Deli", 2)]
+
+    assert import_csv(db, user_id, lines)["duplicates"] == len(lines)
\ No newline at end of file
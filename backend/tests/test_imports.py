@@ -0,0 +1,43 @@
+from app.models import Company, ImportJob, User
+from app.workers.imports import run_import
+
+def seed(db, tmp_path):
+    company = Company(name="Acme")
+    db.add(company)
+    db.flush()
+
+    user = User(company_id=company.id, firebase_id="user", username="user", email="user@example.com", login_method="email")
+    db.add(user)
+    db.flush()
+
+    file_path = tmp_path / "expenses.csv"
+    file_path.write_text("merchant,amount,date,description\nShop,10,2024-01-01,x\n")
+    db.add(ImportJob(id="job", company_id=company.id, user_id=user.id, filename="expenses.csv", file_path=str(file_path)))
+    db.commit()
+    return company.id, user.id
+
+def test_job_of_deleted_user_is_still_readable(client, db, tmp_path):
+    _, user_id = seed(db, tmp_path)
+    assert client.delete(f"/api/users/{user_id}").status_code == 200
+
+    response = client.get("/api/imports/job")
+    assert response.status_code == 200
+    assert response.json()["user_id"] is None
+
+def test_job_of_deleted_company_is_still_readable(client, db, tmp_path):
+    company_id, _ = seed(db, tmp_path)
+    assert client.delete(f"/api/companies/{company_id}").status_code == 200
+
+    response = client.get("/api/imports/job")
+    assert response.status_code == 200
+    assert response.json()["company_id"] is None
+
+def test_job_of_deleted_user_fails(client, db, tmp_path):
+    _, user_id = seed(db, tmp_path)
+    client.delete(f"/api/users/{user_id}")
+
+    run_import("job")
+
+    job = client.get("/api/imports/job").json()
+    assert job["status"] == "failed"
+    assert job["rows_inserted"] == 0
\ No newline at end of file
@@ -0,0 +1,36 @@
+from datetime import datetime
+import pytest
+from sqlalchemy.dialects import postgresql
+from app.crud.expense import EXPENSE_ORDER, get_expenses
+from app.models import Expense
+from app.utils.pagination import InvalidCursorError, decode_cursor, encode_cursor, keyset_condition, next_cursor
+
+def test_keyset_condition_is_a_row_value_comparison():
+    condition = keyset_condition(EXPENSE_ORDER, [datetime(2024, 1, 1), 5], descending=True)
+    sql = str(condition.compile(dialect=postgresql.dialect()))
+
+    assert sql.startswith("(expenses.date, expenses.id) < (")
+    assert " OR " not in sql
+
+def test_cursor_pages_follow_the_listing_order(db):
+    # Several expenses share each date, so pages have to break ties on id
+    db.add_all([Expense(merchant=f"Shop {i}", amount=i, date=datetime(2024, 1, i % 3 + 1)) for i in range(10)])
+    db.commit()
+
+    expected = [expense.id for expense in get_expenses(db, limit=100)]
+    seen, cursor = [], None
+    while True:
+        page = get_expenses(db, limit=3, cursor=cursor)
+        seen.extend(expense.id for expense in page)
+        token = next_cursor(page, EXPENSE_ORDER, 3)
+        if token is None:
+            break
+        cursor = decode_cursor(token)
+
+    assert seen == expected
+
+@pytest.mark.parametrize("values", [["2024-01-01", 5], [{"dt": "2024-01-01T00:00:00"}, "5"], [{"dt": "2024-01-01T00:00:00"}, True]])
+def test_cursor_with_wrong_types_is_rejected(db, values):
+    cursor = decode_cursor(encode_cursor(values))
+    with pytest.raises(InvalidCursorError):
+        get_expenses(db, cursor=cursor)
\ No newline at end of file
@@ -0,0 +1,28 @@
+import time
+from app.models import Policy
+from app.utils.policy_engine import PolicySetCache
+
+def cap(value):
+    return Policy(id=1, company_id=1, category="general", rule_type="amount_max", rule_value=value, policy_type="hard")
+
+def test_entries_expire_without_an_invalidation():
+    # Another server process changed the policy; this one never sees invalidate() for it
+    rows = [cap(100)]
+    cache = PolicySetCache(ttl=0.05)
+
+    assert cache.get(1, lambda: rows).evaluate({"company_id": 1, "category": "general", "amount": 50})[0] is False
+
+    rows = [cap(10)]
+    assert cache.get(1, lambda: rows).evaluate({"company_id": 1, "category": "general", "amount": 50})[0] is False
+
+    time.sleep(0.1)
+    assert cache.get(1, lambda: rows).evaluate({"company_id": 1, "category": "general", "amount": 50})[0] is True
+
+def test_invalidate_drops_the_entry_at_once():
+    rows = [cap(100)]
+    cache = PolicySetCache()
+    cache.get(1, lambda: rows)
+
+    rows = [cap(10)]
+    cache.invalidate(1)
+    assert cache.get(1, lambda: rows).evaluate({"company_id": 1, "category": "general", "amount": 50})[0] is True
\ No newline at end of file
@@ -0,0 +1,117 @@
+from datetime import datetime
+from app.crud.expense_rollup import rebuild_rollups
+from app.crud.expense_stat import rebuild_expense_stats
+from app.models import Company, Expense, ExpenseRollup, ExpenseStat, ImportJob, Policy, User
+
+# Statements each route issues. Every count is independent of how many rows the company or user owns,
+# so the fixtures below give them several children of each kind.
+
+def seed(db):
+    company = Company(name="Acme")
+    db.add(company)
+    db.flush()
+
+    admin = User(company_id=company.id, firebase_id="admin", username="admin", email="admin@example.com", login_method="email", role="admin")
+    users = [
+        User(company_id=company.id, firebase_id=f"user-{i}", username=f"user-{i}", email=f"user-{i}@example.com", login_method="email")
+        for i in range(3)
+    ]
+    db.add_all([admin, *users])
+    db.flush()
+
+    for user in users:
+        db.add_all([
+            Expense(company_id=company.id, user_id=user.id, merchant=f"Shop {i}", amount=10 + i, date=datetime(2024, 1, i + 1), category="general")
+            for i in range(3)
+        ])
+        db.add(ImportJob(id=f"job-{user.id}", company_id=company.id, user_id=user.id, filename="expenses.csv"))
+
+    db.add(Policy(company_id=company.id, name="Cap", category="general", rule_type="amount_max", rule_value=100, policy_type="soft"))
+    db.commit()
+    rebuild_rollups(db)
+    rebuild_expense_stats(db)
+    return company.id, admin.id, users[0].id
+
+def test_patch_company(client, db, count_queries):
+    company_id, _, _ = seed(db)
+    with count_queries() as statements:
+        response = client.patch(f"/api/companies/{company_id}", json={"industry": "Retail"})
+
+    assert response.status_code == 200
+    assert response.json()["industry"] == "Retail"
+    assert len(statements) == 1
+
+def test_patch_company_with_admin_check(client, db, count_queries):
+    company_id, admin_id, _ = seed(db)
+    with count_queries() as statements:
+        response = client.patch(f"/api/companies/{company_id}?current_user_id={admin_id}", json={"industry": "Retail"})
+
+    assert response.status_code == 200
+    assert len(statements) == 2
+
+def test_delete_company(client, db, count_queries):
+    company_id, _, _ = seed(db)
+    with count_queries() as statements:
+        response = client.delete(f"/api/companies/{company_id}")
+
+    assert response.status_code == 200
+    # rollups, stats, users, expenses, import jobs, policies, merchant rules and the company itself
+    assert len(statements) == 8
+    assert db.query(Expense).filter(Expense.company_id.isnot(None)).count() == 0
+    assert db.query(Policy).count() == 0
+
+def test_delete_user(client, db, count_queries):
+    _, _, user_id = seed(db)
+    with count_queries() as statements:
+        response = client.delete(f"/api/users/{user_id}")
+
+    assert response.status_code == 200
+    # rollups moved to the unknown user (delete, then one upsert), stats, expenses, import jobs and the user
+    assert len(statements) == 6
+    assert db.query(Expense).filter(Expense.user_id == user_id).count() == 0
+
+    user_rollups = {row.dim_key: row.total_amount for row in db.query(ExpenseRollup).filter(ExpenseRollup.dimension == "user")}
+    assert str(user_id) not in user_rollups
+    assert user_rollups["unknown"] == 10 + 11 + 12
+    assert db.query(ExpenseStat).filter(ExpenseStat.dimension == "user", ExpenseStat.dim_key == str(user_id)).count() == 0
+
+def test_patch_user(client, db, count_queries):
+    _, _, user_id = seed(db)
+    with count_queries() as statements:
+        response = client.patch(f"/api/users/{user_id}", json={"username": "renamed"})
+
+    assert response.status_code == 200
+    assert response.json()["username"] == "renamed"
+    assert len(statements) == 1
+
+def test_get_company_users(client, db, count_queries):
+    company_id, _, _ = seed(db)
+    with count_queries() as statements:
+        response = client.get(f"/api/companies/{company_id}/users")
+
+    assert response.status_code == 200
+    assert len(response.json()) == 4
+    assert len(statements) == 1
+def test_patch_policy(client, db, count_queries):
+    seed(db)
+    policy_id = db.query(Policy.id).scalar()
+    with count_queries() as statements:
+        response = client.patch(f"/api/policies/{policy_id}", json={"name": "Renamed"})
+
+    assert response.status_code == 200
+    assert response.json()["name"] == "Renamed"
+    # lookup, update and the refresh of updated_at
+    assert len(statements) == 3
+
+def test_delete_policy(client, db, count_queries):
+    seed(db)
+    policy_id = db.query(Policy.id).scalar()
+    with count_queries() as statements:
+        response = client.delete(f"/api/policies/{policy_id}")
+
+    assert response.status_code == 200
+    # The re-audit that follows runs its own queries; the route itself only issues the DELETE
+    assert [statement for statement in statements if "policies.id = ?" in statement] == [
+        "DELETE FROM policies WHERE policies.id = ? RETURNING company_id"
+    ]
+    assert client.delete(f"/api/policies/{policy_id}").status_code == 404
\ No newline at end of file
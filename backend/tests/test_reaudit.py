@@ -0,0 +1,51 @@
+from datetime import datetime
+from app.models import Company, Expense, Policy, User
+
+def seed(db):
+    company = Company(name="Acme")
+    db.add(company)
+    db.flush()
+
+    user = User(company_id=company.id, firebase_id="user", username="user", email="user@example.com", login_method="email")
+    db.add(user)
+    db.flush()
+
+    policy = Policy(company_id=company.id, name="Cap", category="general", rule_type="amount_max", rule_value=100, policy_type="soft")
+    db.add(policy)
+    db.add_all([
+        Expense(company_id=company.id, user_id=user.id, merchant="Shop", amount=amount, date=datetime(2024, 1, 1), category="general", is_approved=True)
+        for amount in (10, 20, 50)
+    ])
+    db.add(Expense(
+        company_id=company.id, user_id=user.id, merchant="Shop", amount=150, date=datetime(2024, 1, 2), category="general",
+        is_flagged=True, flag_reason="Amount exceeds maximum of 100.0", is_approved=False
+    ))
+    db.commit()
+    return policy.id
+
+def approvals(db):
+    db.expire_all()
+    return {expense.amount: (expense.is_flagged, expense.is_approved) for expense in db.query(Expense)}
+
+def test_tightening_to_a_hard_rule_unapproves(client, db):
+    policy_id = seed(db)
+    response = client.patch(f"/api/policies/{policy_id}", json={"rule_value": 15, "policy_type": "hard"})
+
+    assert response.status_code == 200
+    assert approvals(db) == {10: (False, True), 20: (True, False), 50: (True, False), 150: (True, False)}
+
+def test_hard_rule_with_unchanged_reason_unapproves(client, db):
+    policy_id = seed(db)
+    db.query(Expense).filter(Expense.amount == 150).update({"is_approved": True})
+    db.commit()
+
+    client.patch(f"/api/policies/{policy_id}", json={"policy_type": "hard"})
+
+    assert approvals(db)[150] == (True, False)
+
+def test_loosening_approves_cleared_expenses(client, db):
+    policy_id = seed(db)
+    client.patch(f"/api/policies/{policy_id}", json={"rule_value": 15, "policy_type": "hard"})
+    client.patch(f"/api/policies/{policy_id}", json={"rule_value": 1000, "policy_type": "soft"})
+
+    assert approvals(db) == {10: (False, True), 20: (False, True), 50: (False, True), 150: (False, True)}
\ No newline at end of file
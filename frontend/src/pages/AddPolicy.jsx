@@ -34,6 +34,14 @@ const AddPolicy = () => {
       }
     }
 
+    if (ruleType === 'anomaly') {
+      const num = Number(ruleValue);
+      if (isNaN(num) || num <= 0) {
+        toast.error('For Unusual Amount, the rule value must be a number of standard deviations greater than 0');
+        return;
+      }
+    }
+
     createPolicy({
       name: form.name.value,
       description: form.description.value,
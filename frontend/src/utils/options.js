@@ -12,6 +12,7 @@ export const RULE_TYPES = [
   { value: "amount_max", label: "Amount Max" },
   { value: "merchant_blacklist", label: "Merchant Blacklist" },
   { value: "item_type", label: "Item Type" },
+  { value: "anomaly", label: "Unusual Amount" },
 ];
 
 export const POLICY_TYPES = [